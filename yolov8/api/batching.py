@@ -0,0 +1,309 @@
+"""
+Dynamic Micro-Batching Scheduler
+Coalesces concurrent /predict requests into a single batched forward pass
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, List, Optional, Set, Tuple
+
+import numpy as np
+
+from api.executor import InferenceExecutor, InferenceOverloaded, InferenceTimeout
+from api.metrics import BATCH_SIZE, STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Job:
+    images: List[np.ndarray]
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class BatchStats:
+    """Per-batch occupancy and queue-wait statistics"""
+
+    def __init__(self, max_batch_size: int, window: int = 1024):
+        self.max_batch_size = max_batch_size
+        self.total_batches = 0
+        self.total_images = 0
+        self.total_errors = 0
+        self.total_rejected = 0
+        self.total_timeouts = 0
+        self._batch_sizes: Deque[int] = deque(maxlen=window)
+        self._queue_waits_ms: Deque[float] = deque(maxlen=window)
+        self._inference_ms: Deque[float] = deque(maxlen=window)
+
+    def record(self, batch_size: int, queue_waits_ms: List[float], inference_ms: float):
+        self.total_batches += 1
+        self.total_images += batch_size
+        self._batch_sizes.append(batch_size)
+        self._queue_waits_ms.extend(queue_waits_ms)
+        self._inference_ms.append(inference_ms)
+
+    def snapshot(self) -> dict:
+        sizes = np.array(self._batch_sizes, dtype=np.float64)
+        waits = np.array(self._queue_waits_ms, dtype=np.float64)
+        infer = np.array(self._inference_ms, dtype=np.float64)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "total_batches": self.total_batches,
+            "total_images": self.total_images,
+            "total_errors": self.total_errors,
+            "total_rejected": self.total_rejected,
+            "total_timeouts": self.total_timeouts,
+            "mean_batch_size": round(float(sizes.mean()), 2) if sizes.size else 0.0,
+            "mean_occupancy": round(float(sizes.mean()) / self.max_batch_size, 4) if sizes.size else 0.0,
+            "queue_wait_ms": _percentiles(waits),
+            "inference_ms": _percentiles(infer),
+        }
+
+
+def _percentiles(values: np.ndarray) -> dict:
+    if not values.size:
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {
+        "mean": round(float(values.mean()), 2),
+        "p50": round(float(np.percentile(values, 50)), 2),
+        "p95": round(float(np.percentile(values, 95)), 2),
+        "max": round(float(values.max()), 2),
+    }
+
+
+class BatchScheduler:
+    """
+    Request-coalescing inference scheduler
+
+    - Requests enqueue one or more decoded images and await a future
+    - Once an executor slot is free, the loop collects up to max_batch_size
+      images, waiting at most max_wait_ms after the first job arrives
+    - A multi-image job (ensemble) is never split across batches
+    - Batches run on the InferenceExecutor and results are fanned back out
+    - A full queue rejects new work (InferenceOverloaded) and each request
+      gives up after timeout_s (InferenceTimeout)
+    """
+
+    def __init__(
+        self,
+        executor: InferenceExecutor,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        max_queue_size: int = 64,
+        timeout_s: Optional[float] = 30.0
+    ):
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+        self.max_queue_size = max_queue_size
+        self.timeout_s = timeout_s if timeout_s and timeout_s > 0 else None
+        self.stats = BatchStats(self.max_batch_size)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._dispatches: Set[asyncio.Task] = set()
+        # Job taken off the queue that did not fit in the previous batch
+        self._carry: Optional[_Job] = None
+        self._queued_images = 0
+        # Set by swap_executor to wake a loop idling on the retired executor's slot
+        self._swapped: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of images waiting for a batch"""
+        return self._queued_images
+
+    async def start(self):
+        """Start the batching loop (call from the app startup event)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._swapped = asyncio.Event()
+        self.executor.start()
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Batch scheduler started (max_batch_size={self.max_batch_size}, "
+            f"max_wait_ms={self.max_wait_s * 1000:.1f}, max_queue_size={self.max_queue_size})"
+        )
+
+    async def stop(self):
+        """Stop the batching loop and fail any pending requests"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches, return_exceptions=True)
+        if self._queue is not None:
+            pending = [self._carry] if self._carry is not None else []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            for job in pending:
+                if not job.future.done():
+                    job.future.set_exception(RuntimeError("Batch scheduler stopped"))
+            self._carry = None
+            self._queued_images = 0
+        self.executor.shutdown()
+
+    def swap_executor(self, executor: InferenceExecutor) -> InferenceExecutor:
+        """
+        Route new batches to another (started) executor, returns the previous one
+
+        Batches already dispatched finish on the previous executor; the caller should
+        `await previous.drain()` before shutting it down. An idle loop holding a slot
+        on the previous executor gives it up right away.
+        """
+        previous, self.executor = self.executor, executor
+        if self._swapped is not None:
+            self._swapped.set()
+        return previous
+
+    async def submit(self, image: np.ndarray) -> Tuple[np.ndarray, dict, str]:
+        """Queue one decoded image and wait for its probability vector"""
+        probs, class_names, model_version = await self.submit_many([image])
+        return probs[0], class_names, model_version
+
+    async def submit_many(self, images: List[np.ndarray]) -> Tuple[np.ndarray, dict, str]:
+        """Queue several decoded images as one job, returns (probs [N, C], class_names, model_version)"""
+        if not self.running:
+            raise RuntimeError("Batch scheduler is not running")
+        if self.max_queue_size and self._queued_images + len(images) > self.max_queue_size:
+            self.stats.total_rejected += 1
+            raise InferenceOverloaded(f"Inference queue full ({self._queued_images} images pending)")
+
+        loop = asyncio.get_running_loop()
+        job = _Job(images=list(images), future=loop.create_future(), enqueued_at=time.perf_counter())
+        self._queued_images += len(job.images)
+        self._queue.put_nowait(job)
+        try:
+            return await asyncio.wait_for(job.future, self.timeout_s)
+        except asyncio.TimeoutError:
+            # wait_for cancels the future, so a batch that has not started will skip it
+            self.stats.total_timeouts += 1
+            raise InferenceTimeout(f"Inference did not finish within {self.timeout_s}s")
+
+    def _take(self, batch: List[_Job], job: _Job, size: int) -> int:
+        """Add a job to the batch if it fits, otherwise hold it for the next batch"""
+        if batch and size + len(job.images) > self.max_batch_size:
+            self._carry = job
+            return size
+        batch.append(job)
+        self._queued_images -= len(job.images)
+        return size + len(job.images)
+
+    async def _next_job(self) -> Optional[_Job]:
+        """Wait for the first job of a batch; None if the executor was swapped meanwhile"""
+        getter = asyncio.ensure_future(self._queue.get())
+        swapped = asyncio.ensure_future(self._swapped.wait())
+        try:
+            done, _ = await asyncio.wait({getter, swapped}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            swapped.cancel()
+            if not getter.done():
+                getter.cancel()
+        return getter.result() if getter in done else None
+
+    async def _collect(self) -> List[_Job]:
+        """Take the next job, then keep filling the batch until full or the wait expires"""
+        loop = asyncio.get_running_loop()
+        batch: List[_Job] = []
+        if self._carry is not None:
+            job, self._carry = self._carry, None
+        else:
+            job = await self._next_job()
+            if job is None:
+                return batch
+        size = self._take(batch, job, 0)
+        deadline = loop.time() + self.max_wait_s
+
+        while size < self.max_batch_size and self._carry is None:
+            # Drain whatever is already queued without yielding
+            while size < self.max_batch_size and self._carry is None and not self._queue.empty():
+                size = self._take(batch, self._queue.get_nowait(), size)
+            remaining = deadline - loop.time()
+            if size >= self.max_batch_size or self._carry is not None or remaining <= 0:
+                break
+            getter = asyncio.ensure_future(self._queue.get())
+            done, _ = await asyncio.wait({getter}, timeout=remaining)
+            if getter in done:
+                size = self._take(batch, getter.result(), size)
+            else:
+                getter.cancel()
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            # Hold a worker slot before collecting, so batches grow while all workers are busy
+            self._swapped.clear()
+            executor = self.executor
+            await executor.acquire()
+            if executor is not self.executor:
+                # Swapped while waiting for a slot: the retired executor takes no new batches
+                executor.release()
+                continue
+            try:
+                batch = await self._collect()
+            except BaseException:
+                executor.release()
+                raise
+            # Swapped while collecting: run the batch on the current executor, not the retired one
+            while batch and executor is not self.executor:
+                executor.release()
+                executor = self.executor
+                try:
+                    await executor.acquire()
+                except BaseException:
+                    for job in batch:
+                        if not job.future.done():
+                            job.future.set_exception(RuntimeError("Batch scheduler stopped"))
+                    raise
+            # Requests that timed out or were cancelled while queued do not need a forward pass
+            batch = [job for job in batch if not job.future.done()]
+            if not batch:
+                executor.release()
+                continue
+
+            task = asyncio.create_task(self._dispatch(executor, batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, executor: InferenceExecutor, batch: List[_Job]):
+        started = time.perf_counter()
+        queue_waits_ms = [(started - job.enqueued_at) * 1000 for job in batch]
+        images = [image for job in batch for image in job.images]
+        try:
+            probs, class_names, model_version, timings = await executor.run(images)
+        except Exception as e:
+            self.stats.total_errors += 1
+            logger.error(f"Batch inference failed (size={len(batch)}): {e}")
+            for job in batch:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            return
+        finally:
+            executor.release()
+
+        self.stats.record(len(images), queue_waits_ms, (time.perf_counter() - started) * 1000)
+        BATCH_SIZE.observe(len(images))
+        for wait_ms in queue_waits_ms:
+            STAGE_SECONDS.observe(wait_ms / 1000, "queue_wait")
+        for stage, seconds in timings.items():
+            STAGE_SECONDS.observe(seconds, stage)
+        offset = 0
+        for job in batch:
+            rows = probs[offset:offset + len(job.images)]
+            offset += len(job.images)
+            if not job.future.done():
+                job.future.set_result((rows, class_names, model_version))
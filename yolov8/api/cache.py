@@ -0,0 +1,101 @@
+"""
+Prediction Cache
+Bounded LRU cache of probability vectors keyed by upload content hash + model version
+"""
+
+import hashlib
+import sys
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+# (probs [C], class_names)
+CachedPrediction = Tuple[np.ndarray, dict]
+
+
+class PredictionCache:
+    """
+    LRU cache for repeat uploads (app retries, overlapping ensemble photo sets)
+
+    - Key: blake2b of the raw upload bytes + model version, so a model change
+      never serves stale probabilities
+    - Bounded by entry count and, optionally, total bytes of cached arrays
+    - Only used from the event loop thread, so no locking is needed
+    """
+
+    def __init__(self, max_entries: int = 4096, max_bytes: int = 0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedPrediction]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def content_digest(data) -> str:
+        """Hash of the upload bytes (bytes / memoryview)"""
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    @staticmethod
+    def make_key(digest: str, model_version: str) -> str:
+        """Combine a content digest with the model version that produced the prediction"""
+        return f"{model_version}:{digest}"
+
+    @staticmethod
+    def _entry_size(value: CachedPrediction) -> int:
+        probs, _ = value
+        return probs.nbytes + sys.getsizeof(probs)
+
+    def get(self, key: str) -> Optional[CachedPrediction]:
+        if not self.enabled:
+            return None
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: CachedPrediction):
+        if not self.enabled:
+            return
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        self._entries[key] = value
+        self._bytes += self._entry_size(value)
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= self._entry_size(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,156 @@
+"""
+Inference Executor
+Runs model batches off the event loop on a bounded thread or process pool
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from backends import InferenceBackend, load_backend, preprocess
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KINDS = ("thread", "process")
+
+
+class InferenceOverloaded(Exception):
+    """The inference queue is full; the client should retry later"""
+
+
+class InferenceTimeout(Exception):
+    """The request did not get a result within the per-request timeout"""
+
+
+def set_torch_threads(num_threads: int):
+    """Pin torch intra-op threads for this process"""
+    if num_threads <= 0:
+        return
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+    except ImportError:
+        pass
+
+
+def run_batch(backend: InferenceBackend, images: List[np.ndarray]) -> Tuple[np.ndarray, dict, str, dict]:
+    """
+    Run one forward pass over a list of decoded images
+
+    Returns (probs [N, C], class_names, model_version, stage timings in seconds)
+    """
+    start = time.perf_counter()
+    batch = preprocess(images, backend.imgsz)
+    preprocessed = time.perf_counter()
+    probs = backend.predict_tensor(batch)
+    timings = {"preprocess": preprocessed - start, "inference": time.perf_counter() - preprocessed}
+    return probs, backend.names, backend.version, timings
+
+
+# ------------------------------------------------------------
+# Process pool worker (one model per worker process)
+# ------------------------------------------------------------
+
+_worker_model: Optional[InferenceBackend] = None
+
+
+def _init_process_worker(model_path: str, backend: str, num_threads: int, version: Optional[str]):
+    global _worker_model
+    set_torch_threads(num_threads)
+    _worker_model = load_backend(model_path, backend, num_threads, version)
+
+
+def _run_in_process_worker(images: List[np.ndarray]) -> Tuple[np.ndarray, dict, str, dict]:
+    return run_batch(_worker_model, images)
+
+
+class InferenceExecutor:
+    """
+    Bounded executor for model batches
+
+    - thread: shares the in-process model, torch intra-op threads pinned per worker
+    - process: one model per worker process, no GIL contention between batches
+    - At most `workers` batches run at once; callers wait for a slot via acquire()
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        workers: int,
+        runner: Callable[[List[np.ndarray]], Tuple[np.ndarray, dict, str, dict]],
+        model_path: str,
+        torch_threads: Optional[int] = None,
+        backend: str = "auto",
+        model_version: Optional[str] = None
+    ):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown executor kind: {kind} (expected one of {EXECUTOR_KINDS})")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.runner = runner
+        self.model_path = model_path
+        self.backend = backend
+        self.model_version = model_version
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // self.workers)
+        self.in_flight = 0
+        self._pool: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def start(self):
+        if self._pool is not None:
+            return
+        if self.kind == "process":
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process_worker,
+                initargs=(self.model_path, self.backend, self.torch_threads, self.model_version)
+            )
+        else:
+            # torch.set_num_threads is process-wide, so thread workers share the budget
+            set_torch_threads(self.torch_threads)
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="infer")
+        self._slots = asyncio.Semaphore(self.workers)
+        logger.info(
+            f"Inference executor started (kind={self.kind}, workers={self.workers}, "
+            f"torch_threads={self.torch_threads})"
+        )
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    async def acquire(self):
+        """Wait for a free worker slot"""
+        await self._slots.acquire()
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._slots.release()
+
+    async def drain(self, poll_s: float = 0.05):
+        """Wait until no batch holds a slot (used before shutting down a retired executor)"""
+        while self.in_flight:
+            await asyncio.sleep(poll_s)
+
+    async def run(self, images: List[np.ndarray]) -> Tuple[np.ndarray, dict, str, dict]:
+        """Run one batch on the pool (caller must hold a slot)"""
+        loop = asyncio.get_running_loop()
+        fn = _run_in_process_worker if self.kind == "process" else self.runner
+        return await loop.run_in_executor(self._pool, fn, images)
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "torch_threads": self.torch_threads,
+            "in_flight": self.in_flight,
+        }
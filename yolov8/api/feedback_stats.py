@@ -0,0 +1,264 @@
+"""
+Feedback Statistics
+Feedback counts kept up to date on submit and periodically reconciled with a full S3 listing
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from api.storage import FeedbackSpool, _write_atomic
+
+logger = logging.getLogger(__name__)
+
+# S3 key -> (corrected_class, original_class, day)
+Entry = Tuple[str, str, str]
+
+UNKNOWN = "unknown"
+STATE_VERSION = 1
+
+
+def day_from_key(key: str, last_modified: Optional[datetime] = None) -> str:
+    """feedback/<class>/YYYYmmdd_HHMMSS_<name> -> YYYY-mm-dd (LastModified for other names)"""
+    name = key.rsplit("/", 1)[-1]
+    if len(name) >= 8 and name[:8].isdigit():
+        return f"{name[:4]}-{name[4:6]}-{name[6:8]}"
+    return last_modified.date().isoformat() if last_modified is not None else UNKNOWN
+
+
+class FeedbackStats:
+    """
+    Per-class, per-day and original -> corrected feedback counts
+
+    - record() adds a submission in O(1); counts are keyed by S3 key, so a
+      submission seen again in a listing is never counted twice
+    - reconcile() rebuilds everything from the spool (not yet uploaded) plus a
+      paginated listing of every class prefix, run concurrently. The original
+      class lives in S3 object metadata, so it is HEADed once per unseen key
+    - Only the spool flusher leader reconciles. It writes every entry, original
+      class included, to a shared state file next to the spool, so a new leader
+      starts from it and HEADs only keys it has never seen
+    - Other gunicorn workers load that file whenever it changes, keeping their
+      own submissions on top until the leader's file includes them;
+      `reconciled_at` in the snapshot says how fresh the full picture is
+    """
+
+    def __init__(
+        self,
+        classes: List[str],
+        client_factory: Callable[[], object],
+        bucket: str,
+        prefix: str = "feedback",
+        concurrency: int = 8,
+        state_path: Optional[Path] = None
+    ):
+        self.classes = list(classes)
+        self.client_factory = client_factory
+        self.bucket = bucket
+        self.prefix = prefix
+        self.concurrency = max(1, concurrency)
+        self.state_path = state_path
+        self.by_class: Counter = Counter()
+        self.by_day: Counter = Counter()
+        self.transitions: Counter = Counter()
+        self.reconciled_at: Optional[datetime] = None
+        self.reconcile_s: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._entries: Dict[str, Entry] = {}
+        self._recent: Optional[Dict[str, Entry]] = None
+        # Submissions made here that the loaded state file does not include yet
+        self._local: Dict[str, Entry] = {}
+        self._state_mtime: Optional[int] = None
+
+    def record(self, key: str, original_class: str, corrected_class: str):
+        """Count one accepted submission (event loop thread)"""
+        entry = (corrected_class, original_class, day_from_key(key))
+        if self._recent is not None:
+            # A reconcile is running; keep this so the rebuilt counts include it
+            self._recent[key] = entry
+        self._local[key] = entry
+        self._add(key, entry)
+
+    def _add(self, key: str, entry: Entry):
+        if key in self._entries:
+            return
+        self._entries[key] = entry
+        corrected, original, day = entry
+        self.by_class[corrected] += 1
+        self.by_day[day] += 1
+        self.transitions[(original, corrected)] += 1
+
+    def _rebuild(self, entries: Dict[str, Entry]):
+        # Keep local submissions the new entries do not include yet
+        self._local = {key: entry for key, entry in self._local.items() if key not in entries}
+        entries.update(self._local)
+        self._entries = {}
+        self.by_class, self.by_day, self.transitions = Counter(), Counter(), Counter()
+        for key, entry in entries.items():
+            self._add(key, entry)
+
+    # ------------------------------------------------------------
+    # Reconciliation (runs on worker threads, touches no shared state)
+    # ------------------------------------------------------------
+
+    def _list_class(self, class_name: str) -> List[Tuple[str, str, Optional[datetime]]]:
+        paginator = self.client_factory().get_paginator("list_objects_v2")
+        objects = []
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{self.prefix}/{class_name}/"):
+            for obj in page.get("Contents", []):
+                objects.append((class_name, obj["Key"], obj.get("LastModified")))
+        return objects
+
+    def _head_original(self, key: str) -> str:
+        try:
+            response = self.client_factory().head_object(Bucket=self.bucket, Key=key)
+        except ClientError:
+            return UNKNOWN
+        return response.get("Metadata", {}).get("original-class", UNKNOWN)
+
+    def collect(self, spool: FeedbackSpool, known_originals: Dict[str, str]) -> Dict[str, Entry]:
+        """Full key -> entry map: spool first, then the bucket (so an item uploaded in between is still seen)"""
+        entries: Dict[str, Entry] = {}
+        for item_id in spool.list_ids():
+            item = spool.load(item_id)
+            if item is None:
+                continue
+            corrected = item.metadata.get("corrected_class") or item.key.split("/")[1]
+            day = day_from_key(item.key, datetime.fromtimestamp(item.created_at))
+            entries[item.key] = (corrected, item.metadata.get("original_class", UNKNOWN), day)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="feedback-stats") as pool:
+            objects = [obj for listing in pool.map(self._list_class, self.classes) for obj in listing]
+            missing = [key for _, key, _ in objects if key not in known_originals and key not in entries]
+            originals = dict(zip(missing, pool.map(self._head_original, missing)))
+
+        for class_name, key, last_modified in objects:
+            if key not in entries:
+                original = known_originals.get(key) or originals.get(key, UNKNOWN)
+                entries[key] = (class_name, original, day_from_key(key, last_modified))
+        return entries
+
+    async def reconcile(self, spool: FeedbackSpool):
+        """Rebuild all counts from the spool and a full bucket listing"""
+        loop = asyncio.get_running_loop()
+        known_originals = {key: entry[1] for key, entry in self._entries.items()}
+        self._recent = {}
+        start = time.perf_counter()
+        try:
+            entries = await loop.run_in_executor(None, self.collect, spool, known_originals)
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning(f"Feedback stats reconcile failed: {e}")
+            return
+        finally:
+            recent, self._recent = self._recent, None
+
+        for key, entry in recent.items():
+            entries.setdefault(key, entry)
+        self._rebuild(entries)
+        self.reconciled_at = datetime.now()
+        self.reconcile_s = round(time.perf_counter() - start, 3)
+        self.last_error = None
+        logger.info(f"Feedback stats reconciled: {len(entries)} items in {self.reconcile_s:.2f}s")
+
+    # ------------------------------------------------------------
+    # Shared state file (written by the leader, read by everyone)
+    # ------------------------------------------------------------
+
+    def _read_state(self) -> Optional[dict]:
+        """State file contents, or None when missing or unchanged since the last read"""
+        try:
+            mtime = self.state_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime == self._state_mtime:
+            return None
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        self._state_mtime = mtime
+        return state
+
+    def _write_state(self, state: dict):
+        _write_atomic(self.state_path, json.dumps(state, ensure_ascii=False).encode("utf-8"))
+        self._state_mtime = self.state_path.stat().st_mtime_ns
+
+    async def load_state(self):
+        """Adopt the leader's entries if the state file changed"""
+        if self.state_path is None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            state = await loop.run_in_executor(None, self._read_state)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read feedback stats state {self.state_path}: {e}")
+            return
+        if state is None or state.get("version") != STATE_VERSION:
+            return
+        self._rebuild({key: tuple(entry) for key, entry in state["entries"].items()})
+        reconciled_at = state.get("reconciled_at")
+        self.reconciled_at = datetime.fromisoformat(reconciled_at) if reconciled_at else None
+        self.reconcile_s = state.get("reconcile_s")
+        self.last_error = state.get("error")
+
+    async def save_state(self):
+        if self.state_path is None:
+            return
+        state = {
+            "version": STATE_VERSION,
+            "entries": self._entries,
+            "reconciled_at": self.reconciled_at.isoformat() if self.reconciled_at else None,
+            "reconcile_s": self.reconcile_s,
+            "error": self.last_error,
+        }
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._write_state, state)
+        except OSError as e:
+            logger.warning(f"Could not write feedback stats state {self.state_path}: {e}")
+
+    async def run(
+        self,
+        spool: FeedbackSpool,
+        interval_s: float,
+        is_leader: Callable[[], bool] = lambda: True,
+        poll_s: float = 10.0
+    ):
+        """
+        Leader: reconcile now and then every interval_s seconds, publishing the state file.
+        Others: reload the state file every poll_s seconds.
+        A worker that becomes leader loads the file first, so only new keys are HEADed.
+        """
+        next_reconcile = 0.0
+        while True:
+            if not is_leader():
+                await self.load_state()
+            elif time.monotonic() >= next_reconcile:
+                if self.reconciled_at is None:
+                    await self.load_state()
+                await self.reconcile(spool)
+                await self.save_state()
+                next_reconcile = time.monotonic() + interval_s
+            await asyncio.sleep(min(poll_s, interval_s))
+
+    def snapshot(self, days: int = 30) -> dict:
+        recent_days = sorted(self.by_day.items(), reverse=True)[:max(0, days)]
+        return {
+            "by_class": dict(self.by_class),
+            "by_day": dict(sorted(recent_days)),
+            "transitions": [
+                {"original_class": original, "corrected_class": corrected, "count": count}
+                for (original, corrected), count in self.transitions.most_common()
+            ],
+            "total": len(self._entries),
+            "reconciled_at": self.reconciled_at.isoformat() if self.reconciled_at else None,
+            "reconcile_s": self.reconcile_s,
+            "error": self.last_error,
+        }
@@ -3,22 +3,42 @@ FastAPI Server for Tower/Antenna Classification
 Flutter PWA + Mobile Web Support
 """
 
+import time
+
+# Taken before the heavy imports below for the startup timing breakdown
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import hmac
 import os
+import sys
 import uuid
-import shutil
+from contextlib import asynccontextmanager
+from functools import partial
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import datetime
 import logging
 
-import boto3
-from botocore.exceptions import ClientError
 import numpy as np
-from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Form
+from fastapi import Depends, FastAPI, File, UploadFile, HTTPException, Header, Query, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
-from ultralytics import YOLO
+
+# Allow `uvicorn main:app` from inside api/ as well as `api.main:app` from the project root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backends import InferenceBackend, describe_model, detect_backend, load_backend
+from api.batching import BatchScheduler
+from api.cache import PredictionCache
+from api.executor import InferenceExecutor, InferenceOverloaded, InferenceTimeout, run_batch
+from api.feedback_stats import FeedbackStats
+from api.metrics import PREDICTIONS, REGISTRY as METRICS, STAGE_SECONDS, MetricsMiddleware
+from api.storage import FeedbackSpool, SpoolFlusher, content_type_for, create_s3_client
+from api.uploads import UploadBufferPool, decode_image, in_memory, read_into, upload_size
+from api.warmup import StartupProfile, parse_batch_sizes, run_warmup
+from registry import ModelRegistry
 
 # ============================================================
 # Configuration
@@ -26,14 +46,36 @@ from ultralytics import YOLO
 
 # Model path (update this to your trained model path)
 # 학습 후 생성되는 모델 경로: runs/classify/tower_classifier/weights/best.pt
+# .pt (PyTorch), .onnx (ONNX Runtime), .xml / *_openvino_model (OpenVINO) 지원
 MODEL_PATH = os.getenv(
     "MODEL_PATH",
     "C:/Users/user/Desktop/26/ksa/yolov8/runs/classify/tower_classifier/weights/best.pt"
 )
 
-# Temporary upload directory
+# Inference backend: auto (by MODEL_PATH extension), torch, onnx, openvino
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "auto")
+
+# Versioned model registry (models/<version>/ + ACTIVE pointer); when set, the ACTIVE
+# version overrides MODEL_PATH and every worker polls the pointer to follow swaps
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "")
+MODEL_REGISTRY_POLL_S = float(os.getenv("MODEL_REGISTRY_POLL_S", "10"))
+
+# Token for /admin endpoints (X-Admin-Token header); admin endpoints are disabled when unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Uploads are decoded in memory; set DEBUG_SAVE_UPLOADS=1 to also keep a copy on disk
+DEBUG_SAVE_UPLOADS = os.getenv("DEBUG_SAVE_UPLOADS", "0") == "1"
 UPLOAD_DIR = Path("temp_uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+if DEBUG_SAVE_UPLOADS:
+    UPLOAD_DIR.mkdir(exist_ok=True)
+
+# Prediction cache for repeat uploads (0 entries disables; 0 MB = no byte limit)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "4096"))
+PREDICTION_CACHE_MAX_MB = float(os.getenv("PREDICTION_CACHE_MAX_MB", "0"))
+
+# Upload bodies up to this size stay in memory instead of being spooled to a temp file
+# 0 keeps Starlette's multipart spool threshold (1 MB); larger uploads are then read off the event loop
+UPLOAD_SPOOL_MAX_SIZE = int(os.getenv("UPLOAD_SPOOL_MAX_SIZE", "0"))
 
 # Allowed image extensions
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
@@ -41,6 +83,38 @@ ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
 # S3 Configuration for feedback storage
 S3_BUCKET_NAME = os.getenv("FEEDBACK_S3_BUCKET", "tower-classification-feedback")
 S3_REGION = os.getenv("AWS_REGION", "ap-northeast-2")
+# Local S3 stand-in for development / tests (e.g. http://localhost:9000 for MinIO, moto_server)
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "16"))
+# Feedback is written to a crash-safe local spool, then flushed to S3 in the background
+FEEDBACK_SPOOL_DIR = Path(os.getenv("FEEDBACK_SPOOL_DIR", "feedback_spool"))
+FEEDBACK_UPLOAD_CONCURRENCY = int(os.getenv("FEEDBACK_UPLOAD_CONCURRENCY", "4"))
+FEEDBACK_FLUSH_BATCH = int(os.getenv("FEEDBACK_FLUSH_BATCH", "32"))
+FEEDBACK_MAX_BACKOFF_S = float(os.getenv("FEEDBACK_MAX_BACKOFF_S", "300"))
+# /feedback/stats: full S3 reconcile interval and parallel list / head calls
+FEEDBACK_STATS_REFRESH_S = float(os.getenv("FEEDBACK_STATS_REFRESH_S", "300"))
+FEEDBACK_STATS_CONCURRENCY = int(os.getenv("FEEDBACK_STATS_CONCURRENCY", "8"))
+# Old local fallback directory; its files are imported into the spool on startup
+FEEDBACK_LOCAL_DIR = Path("feedback_local")
+
+# Micro-batching: max images per forward pass and max time to wait for a batch to fill
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "10"))
+# /predict/ensemble images per request; the scheduler never splits a job, so this can exceed BATCH_MAX_SIZE
+ENSEMBLE_MAX_IMAGES = 10
+
+# Inference executor: "thread" (shared model) or "process" (one model per worker)
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+TORCH_THREADS = int(os.getenv("TORCH_THREADS", "0"))  # inference threads per worker, 0 = cpu_count / workers
+# Backpressure: pending images beyond this are rejected with 503; per-request timeout -> 504
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "64"))
+INFERENCE_TIMEOUT_S = float(os.getenv("INFERENCE_TIMEOUT_S", "30"))
+
+# Warm-up at startup: batch sizes (comma separated, empty = powers of two up to BATCH_MAX_SIZE
+# plus the largest single job, an ENSEMBLE_MAX_IMAGES ensemble)
+WARMUP_BATCH_SIZES = parse_batch_sizes(os.getenv("WARMUP_BATCH_SIZES", ""), BATCH_MAX_SIZE, ENSEMBLE_MAX_IMAGES)
+WARMUP_ROUNDS = int(os.getenv("WARMUP_ROUNDS", "2"))
 
 # Logger setup
 logging.basicConfig(level=logging.INFO)
@@ -95,6 +169,7 @@ class SinglePredictionResponse(BaseModel):
     top5: List[Top5Prediction]
     is_confident: bool
     processing_time_ms: float
+    model_version: str
 
 
 class IndividualPrediction(BaseModel):
@@ -113,6 +188,7 @@ class EnsemblePredictionResponse(BaseModel):
     individual_predictions: List[IndividualPrediction]
     is_confident: bool
     processing_time_ms: float
+    model_version: str
 
 
 class HealthResponse(BaseModel):
@@ -120,6 +196,9 @@ class HealthResponse(BaseModel):
     model_loaded: bool
     model_path: str
     timestamp: str
+    model_version: Optional[str] = None
+    ready: bool = False
+    startup: Optional[dict] = None
 
 
 class ClassListResponse(BaseModel):
@@ -160,32 +239,262 @@ app.add_middleware(
     max_age=3600,
 )
 
+# Request counts / latency / in-flight per route for /metrics
+app.add_middleware(MetricsMiddleware, routes_app=app)
+
 # ============================================================
 # Model Loading
 # ============================================================
 
-model: Optional[YOLO] = None
+model: Optional[InferenceBackend] = None
+model_registry = ModelRegistry(MODEL_REGISTRY_DIR) if MODEL_REGISTRY_DIR else None
+
+startup_profile = StartupProfile(_IMPORT_STARTED)
+startup_profile.record("import_s", time.perf_counter() - _IMPORT_STARTED)
+_IMPORT_PID = os.getpid()
+
+
+def active_model() -> Tuple[str, Optional[str]]:
+    """(model path, registry version) to serve: the registry ACTIVE version if set, else MODEL_PATH"""
+    if model_registry is not None:
+        try:
+            version = model_registry.active_version()
+            if version:
+                return str(model_registry.resolve(version)), version
+        except (FileNotFoundError, ValueError) as e:
+            logger.error(f"Registry ACTIVE version unusable, falling back to MODEL_PATH: {e}")
+    return MODEL_PATH, None
 
 
 def load_model():
-    """Load the YOLO model"""
+    """
+    Load the model with the configured inference backend
+
+    With the process executor only the path and version are resolved here;
+    the pool workers load the weights, so the parent never holds a copy
+    """
     global model
     if model is None:
-        if not Path(MODEL_PATH).exists():
-            raise FileNotFoundError(f"Model not found: {MODEL_PATH}")
-        model = YOLO(MODEL_PATH)
-        print(f"Model loaded from: {MODEL_PATH}")
+        model_path, version = active_model()
+        if not Path(model_path).exists():
+            raise FileNotFoundError(f"Model not found: {model_path}")
+        if inference_executor.kind == "process":
+            model = describe_model(model_path, INFERENCE_BACKEND, version)
+            # Workers started after this reuse the version instead of each hashing the file
+            inference_executor.model_version = model.version
+            print(f"Model resolved: {model_path} (backend: {model.name}, version: {model.version}, "
+                  f"loaded by {inference_executor.workers} pool workers)")
+            return model
+        start = time.perf_counter()
+        model = load_backend(model_path, INFERENCE_BACKEND, inference_executor.torch_threads, version)
+        startup_profile.record("model_load_s", time.perf_counter() - start)
+        print(f"Model loaded from: {model_path} (backend: {model.name}, version: {model.version})")
     return model
 
 
+def run_model_batch(images: List[np.ndarray]) -> tuple:
+    """Run one forward pass over a list of decoded images, returns (probs [N, C], class_names, model_version, timings)"""
+    return run_batch(load_model(), images)
+
+
+_initial_model_path, _initial_version = active_model()
+inference_executor = InferenceExecutor(
+    INFERENCE_EXECUTOR,
+    INFERENCE_WORKERS,
+    run_model_batch,
+    _initial_model_path,
+    TORCH_THREADS,
+    INFERENCE_BACKEND,
+    _initial_version
+)
+scheduler = BatchScheduler(
+    inference_executor,
+    BATCH_MAX_SIZE,
+    BATCH_MAX_WAIT_MS,
+    INFERENCE_QUEUE_SIZE,
+    INFERENCE_TIMEOUT_S
+)
+
+
+# ============================================================
+# Preload & Readiness
+# ============================================================
+
+# Set once the model is loaded and a warm-up batch has run in this worker
+ready = False
+
+
+def preload_model() -> bool:
+    """
+    Load the model in the gunicorn master before workers fork (run_server.py --workers)
+
+    Torch weights loaded here are shared copy-on-write by every forked worker.
+    Only done for the torch backend with the thread executor: ONNX Runtime / OpenVINO
+    sessions own native thread pools that are not fork-safe, and the process executor
+    loads its own copies. No inference runs here so no intra-op threads exist at fork.
+    """
+    backend = INFERENCE_BACKEND if INFERENCE_BACKEND != "auto" else detect_backend(active_model()[0])
+    if backend != "torch" or inference_executor.kind != "thread":
+        logger.info(f"Skipping preload (backend={backend}, executor={inference_executor.kind})")
+        return False
+    load_model()
+    return True
+
+
+async def warm_up():
+    """Run warm-up batches at every configured size, then mark this worker ready"""
+    global ready
+    try:
+        await run_warmup(inference_executor, WARMUP_BATCH_SIZES, WARMUP_ROUNDS, startup_profile)
+        startup_profile.mark_ready()
+        ready = True
+        logger.info(f"Warm-up finished, worker {os.getpid()} is ready: {startup_profile.snapshot()}")
+    except Exception as e:
+        logger.error(f"Warm-up failed, worker stays not ready: {e}")
+
+
 @app.on_event("startup")
 async def startup_event():
-    """Load model on startup"""
+    """Load the model (process executor: resolve its version), start the batch scheduler and warm up in the background"""
+    if os.getpid() != _IMPORT_PID:
+        # Forked from a preloading gunicorn master: import / weight load times are the master's,
+        # ready_s counts from this worker's start so recycled workers report their own latency
+        startup_profile.started = time.perf_counter()
+        startup_profile.timings["preloaded"] = model is not None
     try:
         load_model()
         print("Server started successfully!")
     except Exception as e:
         print(f"Warning: Could not load model on startup: {e}")
+    global _swap_lock
+    _swap_lock = asyncio.Lock()
+    await scheduler.start()
+    await feedback_flusher.start(FEEDBACK_LOCAL_DIR)
+    global _feedback_stats_task
+    _feedback_stats_task = asyncio.create_task(
+        feedback_stats.run(feedback_spool, FEEDBACK_STATS_REFRESH_S, lambda: feedback_flusher.leader)
+    )
+    asyncio.create_task(boot())
+
+
+async def boot():
+    """Warm up (/health answers immediately; /ready stays 503 until done), then follow the registry"""
+    if model is not None or inference_executor.kind == "process":
+        await warm_up()
+    if model_registry is not None:
+        await watch_registry()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the batch scheduler and the feedback flusher (unsent feedback stays in the spool)"""
+    await scheduler.stop()
+    await feedback_flusher.stop()
+    if _feedback_stats_task is not None:
+        _feedback_stats_task.cancel()
+
+
+# ============================================================
+# Model Registry & Hot Swap
+# ============================================================
+
+_swap_lock: Optional[asyncio.Lock] = None
+swap_status = {"state": "idle", "version": None, "error": None}
+
+
+async def swap_model(version: str):
+    """
+    Load a registry version, warm it up on a new executor and swap it in
+
+    - The new model serves nothing until its warm-up batches have run
+    - The scheduler switches executors between batches; batches already
+      dispatched finish on the old executor, which is then drained and shut down
+    - Cache entries are keyed by model version, so old predictions are never served
+    """
+    global model, inference_executor, ready
+    async with _swap_lock:
+        if model is not None and model.version == version:
+            return
+        loop = asyncio.get_running_loop()
+        swap_status.update(
+            state="loading", version=version, error=None,
+            previous_version=model.version if model is not None else None,
+            started_at=datetime.now().isoformat()
+        )
+        new_executor = None
+        try:
+            model_path = str(model_registry.resolve(version))
+            if INFERENCE_EXECUTOR == "process":
+                # The new pool's workers load the weights; the parent only needs the version
+                backend = describe_model(model_path, INFERENCE_BACKEND, version)
+            else:
+                backend = await loop.run_in_executor(
+                    None, load_backend, model_path, INFERENCE_BACKEND, inference_executor.torch_threads, version
+                )
+            new_executor = InferenceExecutor(
+                INFERENCE_EXECUTOR,
+                INFERENCE_WORKERS,
+                partial(run_batch, backend),
+                model_path,
+                TORCH_THREADS,
+                INFERENCE_BACKEND,
+                version
+            )
+            new_executor.start()
+            swap_status["state"] = "warming"
+            profile = StartupProfile()
+            await run_warmup(new_executor, WARMUP_BATCH_SIZES, WARMUP_ROUNDS, profile)
+        except Exception as e:
+            if new_executor is not None:
+                await loop.run_in_executor(None, new_executor.shutdown)
+            swap_status.update(
+                state="failed", error=str(e), finished_at=datetime.now().isoformat(), failed_at=time.monotonic()
+            )
+            logger.error(f"Model swap to {version} failed, still serving the previous model: {e}")
+            return
+
+        previous = scheduler.swap_executor(new_executor)
+        model = backend
+        inference_executor = new_executor
+        ready = True
+        prediction_cache.clear()
+        swap_status["state"] = "draining"
+        logger.info(f"Swapped to model version {version}, draining previous executor")
+
+        await previous.drain()
+        await loop.run_in_executor(None, previous.shutdown)
+        swap_status.update(state="done", warmup=profile.snapshot(), finished_at=datetime.now().isoformat())
+
+
+async def watch_registry():
+    """Follow the registry ACTIVE pointer so every worker, including recycled ones, serves the same version"""
+    while True:
+        try:
+            version = model_registry.active_version()
+            # A version that failed to load is retried after a few poll intervals, not every poll
+            failed = (
+                swap_status["state"] == "failed" and swap_status["version"] == version
+                and time.monotonic() - swap_status["failed_at"] < MODEL_REGISTRY_POLL_S * 6
+            )
+            if version and not failed and (model is None or model.version != version):
+                await swap_model(version)
+        except Exception as e:
+            logger.error(f"Model registry watch failed: {e}")
+        await asyncio.sleep(MODEL_REGISTRY_POLL_S)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Check the X-Admin-Token header against ADMIN_TOKEN"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (set ADMIN_TOKEN)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def require_registry() -> ModelRegistry:
+    if model_registry is None:
+        raise HTTPException(status_code=404, detail="Model registry is not configured (set MODEL_REGISTRY_DIR)")
+    return model_registry
 
 
 # ============================================================
@@ -198,68 +507,194 @@ def validate_image(file: UploadFile) -> bool:
     return ext in ALLOWED_EXTENSIONS
 
 
-async def save_upload_file(file: UploadFile) -> Path:
-    """Save uploaded file to temp directory"""
-    ext = Path(file.filename).suffix.lower()
-    unique_filename = f"{uuid.uuid4()}{ext}"
-    file_path = UPLOAD_DIR / unique_filename
+upload_buffers = UploadBufferPool()
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE, int(PREDICTION_CACHE_MAX_MB * 1024 * 1024))
+
+
+def _keep_uploads_in_memory():
+    """
+    Raise Starlette's multipart spool threshold so typical photos never hit a temp file
 
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    Opt-in (UPLOAD_SPOOL_MAX_SIZE > 0). Only applied on Starlette versions that expose
+    MultiPartParser.spool_max_size as the spool threshold; otherwise the default is kept.
+    """
+    if UPLOAD_SPOOL_MAX_SIZE <= 0:
+        return
+    import starlette
+    from starlette.formparsers import MultiPartParser
+    if not isinstance(getattr(MultiPartParser, "spool_max_size", None), int):
+        logger.warning(
+            f"UPLOAD_SPOOL_MAX_SIZE ignored: Starlette {starlette.__version__} has no "
+            "MultiPartParser.spool_max_size, keeping its default"
+        )
+        return
+    MultiPartParser.spool_max_size = UPLOAD_SPOOL_MAX_SIZE
+
+
+_keep_uploads_in_memory()
+
+
+# Last feedback spool scan; refreshed off the event loop once per /metrics scrape
+_spool_stats = {"depth": 0, "bytes": 0, "oldest_age_s": 0.0}
+
+
+async def refresh_spool_stats() -> dict:
+    """Scan the feedback spool directory on a worker thread (it grows while S3 is down)"""
+    global _spool_stats
+    _spool_stats = await asyncio.get_running_loop().run_in_executor(None, feedback_spool.stats)
+    return _spool_stats
+
+
+def _register_state_metrics():
+    """Expose existing scheduler / executor / cache state at scrape time (no hot-path cost)"""
+    METRICS.callback("tower_api_ready", "1 once the model is warmed up", "gauge", lambda: int(ready))
+    METRICS.callback(
+        "tower_api_model_info", "Model version served by this worker", "gauge",
+        lambda: {(model.version, model.name): 1} if model is not None else {},
+        ["version", "backend"]
+    )
+    METRICS.callback(
+        "tower_api_inference_queue_images", "Images waiting for a batch", "gauge", lambda: scheduler.queue_depth
+    )
+    METRICS.callback(
+        "tower_api_inference_in_flight", "Batches running on the executor", "gauge",
+        lambda: inference_executor.in_flight
+    )
+    METRICS.callback(
+        "tower_api_inference_rejected_total", "Requests rejected because the queue was full", "counter",
+        lambda: scheduler.stats.total_rejected
+    )
+    METRICS.callback(
+        "tower_api_inference_timeouts_total", "Requests that hit INFERENCE_TIMEOUT_S", "counter",
+        lambda: scheduler.stats.total_timeouts
+    )
+    METRICS.callback(
+        "tower_api_prediction_cache_total", "Prediction cache lookups", "counter",
+        lambda: {("hit",): prediction_cache.hits, ("miss",): prediction_cache.misses},
+        ["result"]
+    )
+    METRICS.callback(
+        "tower_api_feedback_spool_depth", "Feedback items in the local spool waiting for S3", "gauge",
+        lambda: _spool_stats["depth"]
+    )
+    METRICS.callback(
+        "tower_api_feedback_spool_bytes", "Image bytes in the local feedback spool", "gauge",
+        lambda: _spool_stats["bytes"]
+    )
+    METRICS.callback(
+        "tower_api_feedback_spool_oldest_age_seconds", "Age of the oldest unsent feedback item", "gauge",
+        lambda: _spool_stats["oldest_age_s"]
+    )
+    METRICS.callback(
+        "tower_api_feedback_uploads_total", "Feedback S3 upload attempts by outcome (this worker)", "counter",
+        lambda: {
+            ("uploaded",): feedback_flusher.uploaded,
+            ("failed",): feedback_flusher.failed_attempts,
+        },
+        ["result"]
+    )
+    METRICS.callback(
+        "tower_api_prediction_cache_entries", "Entries in the prediction cache", "gauge",
+        lambda: len(prediction_cache)
+    )
 
+
+_register_state_metrics()
+
+
+def save_debug_upload(data, filename: str) -> Path:
+    """Write a copy of the upload to temp directory (DEBUG_SAVE_UPLOADS only)"""
+    ext = Path(filename).suffix.lower()
+    file_path = UPLOAD_DIR / f"{uuid.uuid4()}{ext}"
+    file_path.write_bytes(data)
     return file_path
 
 
-def cleanup_file(file_path: Path):
-    """Remove temporary file"""
+@asynccontextmanager
+async def read_upload(file: UploadFile):
+    """
+    Read an upload into a pooled buffer
+
+    Yields a memoryview over the bytes; it is only valid inside the block.
+    Bodies Starlette spooled to a temp file are read on a worker thread so
+    disk I/O never blocks the event loop; in-memory bodies are copied inline.
+    """
+    loop = asyncio.get_running_loop()
+    spooled = not in_memory(file)
+    size = await loop.run_in_executor(None, upload_size, file) if spooled else upload_size(file)
+    buf = upload_buffers.acquire(size)
     try:
-        if file_path.exists():
-            file_path.unlink()
-    except Exception:
-        pass
+        with STAGE_SECONDS.time("upload_read"):
+            if spooled:
+                data = await loop.run_in_executor(None, read_into, file, buf, size)
+            else:
+                data = read_into(file, buf, size)
+        if DEBUG_SAVE_UPLOADS:
+            save_debug_upload(data, file.filename)
+        yield data
+    finally:
+        upload_buffers.release(buf)
 
 
-def get_s3_client():
-    """Get boto3 S3 client"""
-    return boto3.client('s3', region_name=S3_REGION)
+async def decode_upload(file: UploadFile, model_version: str) -> tuple:
+    """
+    Read an upload and look it up in the prediction cache
 
+    Returns (content_digest, cached_prediction, image); on a hit the image is not
+    decoded, on a miss it is decoded from memory off the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    async with read_upload(file) as data:
+        digest = None
+        if prediction_cache.enabled:
+            digest = prediction_cache.content_digest(data)
+            cached = prediction_cache.get(prediction_cache.make_key(digest, model_version))
+            if cached is not None:
+                return digest, cached, None
+        try:
+            with STAGE_SECONDS.time("decode"):
+                image = await loop.run_in_executor(None, decode_image, data)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Could not decode image: {file.filename}")
+        return digest, None, image
 
-def upload_to_s3(file_path: Path, s3_key: str) -> bool:
-    """Upload file to S3 bucket"""
-    try:
-        s3_client = get_s3_client()
-        s3_client.upload_file(
-            str(file_path),
-            S3_BUCKET_NAME,
-            s3_key,
-            ExtraArgs={
-                'ContentType': 'image/jpeg'
-            }
-        )
-        logger.info(f"Uploaded to S3: s3://{S3_BUCKET_NAME}/{s3_key}")
-        return True
-    except ClientError as e:
-        logger.error(f"S3 upload failed: {e}")
-        return False
-    except Exception as e:
-        logger.error(f"S3 upload error: {e}")
-        return False
 
+_s3_client = None
 
-def predict_single_image(image_path: Path) -> dict:
-    """Run prediction on a single image"""
-    mdl = load_model()
-    results = mdl(str(image_path), verbose=False)
-    result = results[0]
 
-    probs = result.probs
-    top1_idx = probs.top1
-    top1_conf = float(probs.top1conf.item())
-    top5_indices = probs.top5
-    top5_confs = [float(c) for c in probs.top5conf.tolist()]
+def get_s3_client():
+    """Shared boto3 S3 client (created once, pooled connections)"""
+    global _s3_client
+    if _s3_client is None:
+        _s3_client = create_s3_client(S3_REGION, S3_ENDPOINT_URL, S3_MAX_POOL_CONNECTIONS)
+    return _s3_client
+
+
+feedback_spool = FeedbackSpool(FEEDBACK_SPOOL_DIR)
+feedback_flusher = SpoolFlusher(
+    feedback_spool,
+    get_s3_client,
+    S3_BUCKET_NAME,
+    concurrency=FEEDBACK_UPLOAD_CONCURRENCY,
+    batch_size=FEEDBACK_FLUSH_BATCH,
+    max_backoff_s=FEEDBACK_MAX_BACKOFF_S
+)
+feedback_stats = FeedbackStats(
+    list(CLASS_NAMES_KR.keys()),
+    get_s3_client,
+    S3_BUCKET_NAME,
+    concurrency=FEEDBACK_STATS_CONCURRENCY,
+    state_path=feedback_spool.root / ".feedback_stats.json"
+)
+_feedback_stats_task: Optional[asyncio.Task] = None
+
+
+def build_prediction(probs: np.ndarray, class_names: dict, model_version: str) -> dict:
+    """Build a prediction dict from one probability vector"""
+    top1_idx = int(np.argmax(probs))
+    top1_conf = float(probs[top1_idx])
+    top5_indices = np.argsort(probs)[::-1][:5]
 
-    class_names = result.names
     top1_class = class_names[top1_idx]
     top1_class_kr = CLASS_NAMES_KR.get(top1_class, top1_class)
     short_name = SHORT_NAMES.get(top1_class_kr, top1_class_kr)
@@ -272,17 +707,53 @@ def predict_single_image(image_path: Path) -> dict:
         "top5": [
             {
                 "rank": i + 1,
-                "class_name": class_names[idx],
-                "class_name_kr": CLASS_NAMES_KR.get(class_names[idx], class_names[idx]),
-                "confidence": conf
+                "class_name": class_names[int(idx)],
+                "class_name_kr": CLASS_NAMES_KR.get(class_names[int(idx)], class_names[int(idx)]),
+                "confidence": float(probs[idx])
             }
-            for i, (idx, conf) in enumerate(zip(top5_indices, top5_confs))
+            for i, idx in enumerate(top5_indices)
         ],
-        "all_probs": probs.data.cpu().numpy(),
-        "class_names_dict": class_names
+        "all_probs": probs,
+        "class_names_dict": class_names,
+        "model_version": model_version
     }
 
 
+async def submit_inference(images: List[np.ndarray]) -> tuple:
+    """Run decoded images as a single job through the batch scheduler, returns (probs, class_names, model_version)"""
+    try:
+        return await scheduler.submit_many(images)
+    except InferenceOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except InferenceTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+
+async def predict_uploads(files: List[UploadFile]) -> List[dict]:
+    """
+    Predict uploaded images
+
+    - Uploads are read and decoded concurrently
+    - Cache hits skip decode and inference
+    - Misses run as one batch and are cached under the version that served them
+    """
+    model_version = load_model().version
+    prepared = await asyncio.gather(*(decode_upload(file, model_version) for file in files))
+
+    outputs = [None if cached is None else (*cached, model_version) for _, cached, _ in prepared]
+    misses = [i for i, output in enumerate(outputs) if output is None]
+    if misses:
+        probs, class_names, served_version = await submit_inference([prepared[i][2] for i in misses])
+        for i, row in zip(misses, probs):
+            outputs[i] = (row, class_names, served_version)
+            digest = prepared[i][0]
+            if digest is not None:
+                prediction_cache.put(prediction_cache.make_key(digest, served_version), (row, class_names))
+
+    with STAGE_SECONDS.time("postprocess"):
+        return [build_prediction(row, class_names, version) for row, class_names, version in outputs]
+
+
 def ensemble_predictions(predictions: List[dict], method: str = "mean") -> dict:
     """Combine multiple predictions using ensemble method"""
     if not predictions:
@@ -337,20 +808,99 @@ async def root():
     return {
         "status": "healthy",
         "model_loaded": model is not None,
-        "model_path": MODEL_PATH,
+        "model_path": model.model_path if model is not None else MODEL_PATH,
         "timestamp": datetime.now().isoformat()
     }
 
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint with readiness and the startup timing breakdown"""
     return {
         "status": "healthy",
         "model_loaded": model is not None,
-        "model_path": MODEL_PATH,
+        "model_path": model.model_path if model is not None else MODEL_PATH,
+        "timestamp": datetime.now().isoformat(),
+        "model_version": model.version if model is not None else None,
+        "ready": ready,
+        "startup": {
+            "pid": os.getpid(),
+            "warmup_batch_sizes": WARMUP_BATCH_SIZES,
+            "warmup_rounds": WARMUP_ROUNDS,
+            **startup_profile.snapshot()
+        }
+    }
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once the model is loaded and warmed up, 503 before"""
+    body = {
+        "ready": ready,
+        "model_loaded": model is not None,
+        "pid": os.getpid(),
         "timestamp": datetime.now().isoformat()
     }
+    return JSONResponse(status_code=200 if ready else 503, content=body)
+
+
+@app.get("/admin/models", dependencies=[Depends(require_admin)])
+async def list_models():
+    """Registered model versions, the ACTIVE pointer, the version this worker serves and swap progress"""
+    registry = require_registry()
+    return {
+        "active_version": registry.active_version(),
+        "serving_version": model.version if model is not None else None,
+        "versions": registry.list_versions(),
+        "swap": swap_status,
+        "pid": os.getpid()
+    }
+
+
+@app.post("/admin/models/{version}/activate", status_code=202, dependencies=[Depends(require_admin)])
+async def activate_model(version: str):
+    """
+    Make a registered version active
+
+    Updates the registry ACTIVE pointer and starts loading + warming the model in the
+    background on this worker; other workers follow within MODEL_REGISTRY_POLL_S.
+    Poll GET /admin/models for swap progress.
+    """
+    registry = require_registry()
+    try:
+        registry.set_active(version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    asyncio.create_task(swap_model(version))
+    return {"accepted": True, "version": version, "swap": swap_status}
+
+
+@app.get("/stats")
+async def get_stats():
+    """Inference scheduler statistics (batch occupancy, queue wait)"""
+    spool_stats = await refresh_spool_stats()
+    return {
+        "scheduler": {
+            "running": scheduler.running,
+            "queue_depth": scheduler.queue_depth,
+            "max_wait_ms": BATCH_MAX_WAIT_MS,
+            **scheduler.stats.snapshot()
+        },
+        "executor": inference_executor.stats(),
+        "upload_buffers": upload_buffers.stats(),
+        "prediction_cache": prediction_cache.stats(),
+        "feedback_spool": {**spool_stats, **feedback_flusher.stats()},
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics (per-process; scrape each worker when running multiple workers)"""
+    await refresh_spool_stats()
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @app.get("/classes", response_model=ClassListResponse)
@@ -393,11 +943,9 @@ async def predict_single(
             detail=f"Invalid file type. Allowed: {ALLOWED_EXTENSIONS}"
         )
 
-    file_path = None
     try:
-        # Save and process
-        file_path = await save_upload_file(file)
-        result = predict_single_image(file_path)
+        result = (await predict_uploads([file]))[0]
+        PREDICTIONS.inc("/predict", result["class_name"])
 
         processing_time = (time.time() - start_time) * 1000
 
@@ -411,16 +959,15 @@ async def predict_single(
             },
             "top5": result["top5"],
             "is_confident": result["confidence"] >= conf_threshold,
-            "processing_time_ms": round(processing_time, 2)
+            "processing_time_ms": round(processing_time, 2),
+            "model_version": result["model_version"]
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    finally:
-        if file_path:
-            cleanup_file(file_path)
-
 
 @app.post("/predict/ensemble", response_model=EnsemblePredictionResponse)
 async def predict_ensemble(
@@ -441,8 +988,8 @@ async def predict_ensemble(
     if len(files) < 1:
         raise HTTPException(status_code=400, detail="At least 1 image required")
 
-    if len(files) > 10:
-        raise HTTPException(status_code=400, detail="Maximum 10 images allowed")
+    if len(files) > ENSEMBLE_MAX_IMAGES:
+        raise HTTPException(status_code=400, detail=f"Maximum {ENSEMBLE_MAX_IMAGES} images allowed")
 
     # Validate all files
     for file in files:
@@ -452,19 +999,13 @@ async def predict_ensemble(
                 detail=f"Invalid file type: {file.filename}. Allowed: {ALLOWED_EXTENSIONS}"
             )
 
-    file_paths = []
-    predictions = []
     individual_results = []
 
     try:
-        # Save and process each file
-        for file in files:
-            file_path = await save_upload_file(file)
-            file_paths.append(file_path)
-
-            result = predict_single_image(file_path)
-            predictions.append(result)
+        # Decode all images concurrently, then run cache misses as one batch
+        predictions = await predict_uploads(files)
 
+        for file, result in zip(files, predictions):
             individual_results.append({
                 "filename": file.filename,
                 "prediction": result["class_name"],
@@ -473,7 +1014,9 @@ async def predict_ensemble(
             })
 
         # Ensemble predictions
-        ensemble_result = ensemble_predictions(predictions, method)
+        with STAGE_SECONDS.time("ensemble"):
+            ensemble_result = ensemble_predictions(predictions, method)
+        PREDICTIONS.inc("/predict/ensemble", ensemble_result["class_name"])
 
         processing_time = (time.time() - start_time) * 1000
 
@@ -490,16 +1033,16 @@ async def predict_ensemble(
             "top5": ensemble_result["top5"],
             "individual_predictions": individual_results,
             "is_confident": ensemble_result["confidence"] >= conf_threshold,
-            "processing_time_ms": round(processing_time, 2)
+            "processing_time_ms": round(processing_time, 2),
+            # More than one version only if a swap landed between cache hits and the batch
+            "model_version": ",".join(sorted({p["model_version"] for p in predictions}))
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    finally:
-        for file_path in file_paths:
-            cleanup_file(file_path)
-
 
 @app.post("/feedback", response_model=FeedbackResponse)
 async def submit_feedback(
@@ -511,7 +1054,7 @@ async def submit_feedback(
     Submit feedback for model improvement
 
     - User can correct classification results
-    - Images are stored in S3 for future retraining
+    - Images are spooled to local disk (fsync) and flushed to S3 in the background
     - Storage path: feedback/{corrected_class}/{timestamp}_{filename}
     """
     # Validate file
@@ -529,10 +1072,10 @@ async def submit_feedback(
             detail=f"Invalid corrected_class. Valid options: {valid_classes}"
         )
 
-    file_path = None
     try:
-        # Save uploaded file temporarily
-        file_path = await save_upload_file(file)
+        # Keep the upload in memory
+        async with read_upload(file) as data:
+            content = bytes(data)
 
         # Generate S3 key
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -540,91 +1083,67 @@ async def submit_feedback(
         ext = Path(file.filename).suffix.lower()
         s3_key = f"feedback/{corrected_class}/{timestamp}_{original_filename}{ext}"
 
-        # Upload to S3
-        upload_success = upload_to_s3(file_path, s3_key)
-
-        if upload_success:
-            logger.info(f"Feedback saved: {original_class} -> {corrected_class}, S3: {s3_key}")
-            return {
-                "success": True,
-                "message": "피드백이 저장되었습니다. 모델 개선에 활용됩니다.",
-                "s3_key": s3_key,
-                "original_class": original_class,
-                "corrected_class": corrected_class,
-                "timestamp": datetime.now().isoformat()
-            }
-        else:
-            # S3 upload failed - save locally as fallback
-            local_feedback_dir = Path("feedback_local") / corrected_class
-            local_feedback_dir.mkdir(parents=True, exist_ok=True)
-            local_path = local_feedback_dir / f"{timestamp}_{original_filename}{ext}"
-            shutil.copy(file_path, local_path)
-
-            logger.warning(f"S3 failed, saved locally: {local_path}")
-            return {
-                "success": True,
-                "message": "피드백이 로컬에 저장되었습니다. (S3 연결 실패)",
-                "s3_key": None,
-                "original_class": original_class,
-                "corrected_class": corrected_class,
-                "timestamp": datetime.now().isoformat()
-            }
+        # Durably spool the image; the response waits for the fsync, not for S3
+        metadata = {
+            "original_class": original_class,
+            "corrected_class": corrected_class,
+            "filename": file.filename,
+        }
+        await asyncio.get_running_loop().run_in_executor(
+            None, feedback_spool.append, s3_key, content, content_type_for(file.filename), metadata
+        )
+        feedback_flusher.notify()
+        feedback_stats.record(s3_key, original_class, corrected_class)
+        logger.info(f"Feedback spooled: {original_class} -> {corrected_class}, S3: {s3_key}")
+
+        return {
+            "success": True,
+            "message": "피드백이 저장되었습니다. 모델 개선에 활용됩니다.",
+            "s3_key": s3_key,
+            "original_class": original_class,
+            "corrected_class": corrected_class,
+            "timestamp": datetime.now().isoformat()
+        }
 
     except Exception as e:
         logger.error(f"Feedback submission error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-    finally:
-        if file_path:
-            cleanup_file(file_path)
-
 
 @app.get("/feedback/stats")
-async def get_feedback_stats():
+async def get_feedback_stats(days: int = Query(30, ge=0, le=366, description="Days of per-day counts")):
     """
     Get feedback statistics
 
-    - Shows count of feedback images per class
+    - Shows count of feedback images per class, per day and per original -> corrected class
+    - Served from counters updated on every submission and reconciled with a
+      full S3 listing every FEEDBACK_STATS_REFRESH_S seconds by the spool
+      flusher leader; other workers read its shared snapshot (see reconciled_at)
     - Useful for monitoring data collection progress
     """
-    try:
-        s3_client = get_s3_client()
-
-        stats = {}
-        for class_name in CLASS_NAMES_KR.keys():
-            prefix = f"feedback/{class_name}/"
-            try:
-                response = s3_client.list_objects_v2(
-                    Bucket=S3_BUCKET_NAME,
-                    Prefix=prefix
-                )
-                count = response.get('KeyCount', 0)
-                stats[class_name] = {
-                    "count": count,
-                    "class_name_kr": CLASS_NAMES_KR[class_name]
-                }
-            except ClientError:
-                stats[class_name] = {
-                    "count": 0,
-                    "class_name_kr": CLASS_NAMES_KR[class_name],
-                    "error": "S3 접근 실패"
-                }
-
-        return {
-            "success": True,
-            "bucket": S3_BUCKET_NAME,
-            "stats": stats,
-            "total_feedback": sum(s.get("count", 0) for s in stats.values()),
-            "timestamp": datetime.now().isoformat()
+    snapshot = feedback_stats.snapshot(days)
+    spool_stats = await refresh_spool_stats()
+    stats = {
+        class_name: {
+            "count": snapshot["by_class"].get(class_name, 0),
+            "class_name_kr": class_name_kr
         }
+        for class_name, class_name_kr in CLASS_NAMES_KR.items()
+    }
 
-    except Exception as e:
-        logger.error(f"Feedback stats error: {e}")
-        return {
-            "success": False,
-            "message": str(e),
-            "timestamp": datetime.now().isoformat()
-        }
+    return {
+        "success": snapshot["error"] is None or snapshot["reconciled_at"] is not None,
+        "bucket": S3_BUCKET_NAME,
+        "stats": stats,
+        "total_feedback": snapshot["total"],
+        "by_day": snapshot["by_day"],
+        "transitions": snapshot["transitions"],
+        "pending_upload": spool_stats["depth"],
+        "reconciled_at": snapshot["reconciled_at"],
+        "reconcile_s": snapshot["reconcile_s"],
+        "message": snapshot["error"],
+        "timestamp": datetime.now().isoformat()
+    }
 
 
 # ============================================================
@@ -0,0 +1,276 @@
+"""
+Prometheus Metrics
+Minimal counters / gauges / histograms rendered in the Prometheus text format (no extra dependency)
+"""
+
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from starlette.routing import Match
+
+LabelValues = Tuple[str, ...]
+
+# Latency buckets (seconds): 1 ms .. 10 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter; label values are passed positionally"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    """Value that goes up and down"""
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; observe() is a bisect plus two additions"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def time(self, *labels: str) -> "_Timer":
+        """Context manager observing the elapsed seconds of its block"""
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: LabelValues):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class CallbackMetric(_Metric):
+    """Gauge / counter read from existing state at scrape time (no hot-path cost)"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        callback: Callable[[], object],
+        labelnames: Sequence[str] = ()
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        # callback returns a number, or {label values tuple: number} for labelled metrics
+        value = self.callback()
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}" for labels, v in items]
+
+
+class MetricsRegistry:
+    """Holds metrics in registration order and renders the exposition text"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        callback: Callable[[], object],
+        labelnames: Sequence[str] = ()
+    ) -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, kind, callback, labelnames))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            body = metric.render()
+            if body:
+                lines.extend(metric.header())
+                lines.extend(body)
+        return "\n".join(lines) + "\n"
+
+
+# ============================================================
+# API metrics (observed from the event loop thread only, so no locking)
+# ============================================================
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "tower_api_stage_seconds",
+    "Latency of each request stage (upload_read, decode, queue_wait, preprocess, inference, "
+    "postprocess, ensemble, s3_upload)",
+    ["stage"]
+)
+REQUESTS = REGISTRY.counter(
+    "tower_api_requests_total", "HTTP requests by endpoint, method and status", ["endpoint", "method", "status"]
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "tower_api_request_seconds", "HTTP request latency by endpoint", ["endpoint"]
+)
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "tower_api_requests_in_flight", "HTTP requests currently being handled", ["endpoint"]
+)
+BATCH_SIZE = REGISTRY.histogram(
+    "tower_api_batch_size", "Images per forward pass", buckets=BATCH_SIZE_BUCKETS
+)
+PREDICTIONS = REGISTRY.counter(
+    "tower_api_predictions_total", "Top-1 predictions by endpoint and class", ["endpoint", "class_name"]
+)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware counting requests per route template and status
+
+    Route templates (e.g. /admin/models/{version}/activate) keep label cardinality
+    bounded; paths that match no route are counted as "other".
+    """
+
+    def __init__(self, app, routes_app=None, skip_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.routes_app = routes_app
+        self.skip_paths = set(skip_paths)
+
+    def _endpoint(self, scope) -> str:
+        for route in getattr(self.routes_app, "routes", ()):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", "other")
+        return "other"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = self._endpoint(scope)
+        status: Optional[int] = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc(endpoint)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec(endpoint)
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint)
+            REQUESTS.inc(endpoint, scope["method"], str(status or 500))
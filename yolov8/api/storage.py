@@ -0,0 +1,392 @@
+"""
+Feedback Storage
+Pooled S3 client, crash-safe local spool and a background S3 flusher so /feedback never blocks on S3
+"""
+
+import asyncio
+import json
+import logging
+import mimetypes
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import boto3
+from botocore.config import Config
+
+from api.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+S3_METADATA_FIELDS = ("original_class", "corrected_class")
+
+
+def create_s3_client(
+    region: str,
+    endpoint_url: Optional[str] = None,
+    max_pool_connections: int = 16,
+    connect_timeout: float = 5.0,
+    read_timeout: float = 30.0
+):
+    """
+    Build one S3 client for the whole process (boto3 clients are thread-safe)
+
+    endpoint_url points the client at a local S3 stand-in (MinIO, moto server).
+    """
+    config = Config(
+        region_name=region,
+        max_pool_connections=max_pool_connections,
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        retries={"max_attempts": 3, "mode": "standard"},
+        tcp_keepalive=True
+    )
+    return boto3.client("s3", endpoint_url=endpoint_url or None, config=config)
+
+
+def content_type_for(filename: str) -> str:
+    return mimetypes.guess_type(filename)[0] or "image/jpeg"
+
+
+def _fsync_dir(path: Path):
+    """Persist a rename in `path` (no-op where directories cannot be opened, e.g. Windows)"""
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_atomic(path: Path, data: bytes):
+    """Write to a temp file, fsync, then rename over `path`"""
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+@dataclass
+class SpoolItem:
+    id: str
+    key: str
+    content_type: str
+    created_at: float
+    metadata: dict = field(default_factory=dict)
+    attempts: int = 0
+    next_attempt_at: float = 0.0
+    last_error: Optional[str] = None
+
+
+class FeedbackSpool:
+    """
+    Crash-safe local write-ahead spool for feedback uploads
+
+    - Each item is `<id>.bin` (image bytes) + `<id>.json` (S3 key and metadata)
+    - Files are written to a temp name, fsynced and renamed; the .json is written
+      last and is the commit marker, so a crash never leaves a half-written item
+    - Items are immutable except for retry bookkeeping; an upload removes the
+      .json first, then the .bin. Orphaned .bin / temp files are cleaned on scan
+    - Ids start with a nanosecond timestamp, so name order is arrival order and
+      the oldest item's age needs no file reads
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, item_id: str) -> Tuple[Path, Path]:
+        return self.root / f"{item_id}.bin", self.root / f"{item_id}.json"
+
+    def append(self, key: str, data: bytes, content_type: str, metadata: Optional[dict] = None) -> SpoolItem:
+        """Durably store one upload (blocking; call off the event loop)"""
+        item = SpoolItem(
+            id=f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}",
+            key=key,
+            content_type=content_type,
+            created_at=time.time(),
+            metadata=metadata or {}
+        )
+        bin_path, json_path = self._paths(item.id)
+        _write_atomic(bin_path, data)
+        _write_atomic(json_path, json.dumps(asdict(item), ensure_ascii=False).encode("utf-8"))
+        _fsync_dir(self.root)
+        return item
+
+    def list_ids(self) -> List[str]:
+        """Committed item ids, oldest first"""
+        with os.scandir(self.root) as it:
+            return sorted(entry.name[:-5] for entry in it if entry.name.endswith(".json") and entry.name[0] != ".")
+
+    def load(self, item_id: str) -> Optional[SpoolItem]:
+        try:
+            with open(self._paths(item_id)[1], "r", encoding="utf-8") as f:
+                return SpoolItem(**json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def read(self, item: SpoolItem) -> bytes:
+        return self._paths(item.id)[0].read_bytes()
+
+    def update(self, item: SpoolItem):
+        """Rewrite retry bookkeeping atomically"""
+        _write_atomic(self._paths(item.id)[1], json.dumps(asdict(item), ensure_ascii=False).encode("utf-8"))
+
+    def remove(self, item: SpoolItem):
+        bin_path, json_path = self._paths(item.id)
+        json_path.unlink(missing_ok=True)
+        bin_path.unlink(missing_ok=True)
+
+    def cleanup(self, min_age_s: float = 60.0) -> int:
+        """Delete .bin files without a .json and stale temp files left by a crash"""
+        now = time.time()
+        committed = set(self.list_ids())
+        removed = 0
+        with os.scandir(self.root) as it:
+            for entry in it:
+                orphan = entry.name.endswith(".bin") and entry.name[:-4] not in committed
+                if (orphan or entry.name.endswith(".tmp")) and now - entry.stat().st_mtime > min_age_s:
+                    os.unlink(entry.path)
+                    removed += 1
+        return removed
+
+    def import_legacy(self, legacy_dir: Path, key_prefix: str = "feedback") -> int:
+        """Move files from the old feedback_local/<class>/ fallback into the spool"""
+        legacy_dir = Path(legacy_dir)
+        if not legacy_dir.is_dir():
+            return 0
+        imported = 0
+        for class_dir in sorted(p for p in legacy_dir.iterdir() if p.is_dir()):
+            for path in sorted(p for p in class_dir.iterdir() if p.is_file()):
+                key = f"{key_prefix}/{class_dir.name}/{path.name}"
+                self.append(key, path.read_bytes(), content_type_for(path.name),
+                            {"corrected_class": class_dir.name, "source": "feedback_local"})
+                path.unlink()
+                imported += 1
+        return imported
+
+    def stats(self) -> dict:
+        """Depth, size and oldest item age from one directory scan (blocking; call off the event loop)"""
+        depth, size, oldest = 0, 0, None
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if entry.name.endswith(".json") and entry.name[0] != ".":
+                    depth += 1
+                    created_ns = int(entry.name.split("-", 1)[0])
+                    oldest = created_ns if oldest is None else min(oldest, created_ns)
+                elif entry.name.endswith(".bin"):
+                    size += entry.stat().st_size
+        return {
+            "depth": depth,
+            "bytes": size,
+            "oldest_age_s": round(time.time() - oldest / 1e9, 1) if oldest is not None else 0.0,
+        }
+
+
+class SpoolFlusher:
+    """
+    Background S3 flusher for a FeedbackSpool
+
+    - Picks up to `batch_size` due items per pass and uploads them with
+      `concurrency` parallel put_object calls on a dedicated thread pool
+    - A failed item is retried with exponential backoff (with jitter, capped at
+      max_backoff_s); feedback is never dropped
+    - Only one process flushes a spool directory: gunicorn workers all append,
+      the holder of an flock on `.flusher.lock` uploads (re-elected if it dies)
+    - Wakes immediately on notify() after an append, otherwise polls every poll_s
+    """
+
+    def __init__(
+        self,
+        spool: FeedbackSpool,
+        client_factory: Callable[[], object],
+        bucket: str,
+        concurrency: int = 4,
+        batch_size: int = 32,
+        poll_s: float = 2.0,
+        base_backoff_s: float = 1.0,
+        max_backoff_s: float = 300.0
+    ):
+        self.spool = spool
+        self.client_factory = client_factory
+        self.bucket = bucket
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.poll_s = poll_s
+        self.base_backoff_s = base_backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.uploaded = 0
+        self.failed_attempts = 0
+        self.imported = 0
+        self.leader = False
+        self._client = None
+        self._items: Dict[str, SpoolItem] = {}
+        self._lock_file = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self.client_factory()
+        return self._client
+
+    async def start(self, legacy_dir: Optional[Path] = None):
+        if self._task is not None:
+            return
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="s3")
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run(legacy_dir))
+        logger.info(f"Feedback spool flusher started (spool={self.spool.root}, bucket={self.bucket})")
+
+    async def stop(self):
+        """Stop flushing; anything not yet uploaded stays in the spool for the next start"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._pool.shutdown(wait=True)
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+            self.leader = False
+
+    def notify(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    def _try_lead(self) -> bool:
+        if self.leader:
+            return True
+        if fcntl is None:
+            # No flock (Windows): single-process development server
+            self.leader = True
+            return True
+        lock_file = open(self.spool.root / ".flusher.lock", "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        self.leader = True
+        logger.info(f"Process {os.getpid()} is flushing the feedback spool")
+        return True
+
+    def _due_items(self) -> Tuple[List[SpoolItem], Optional[float]]:
+        """Up to batch_size due items (oldest first) and the earliest future retry time"""
+        ids = self.spool.list_ids()
+        known = set(ids)
+        for item_id in [i for i in self._items if i not in known]:
+            del self._items[item_id]
+
+        now = time.time()
+        due, next_retry = [], None
+        for item_id in ids:
+            item = self._items.get(item_id)
+            if item is None:
+                item = self.spool.load(item_id)
+                if item is None:
+                    continue
+                self._items[item_id] = item
+            if item.next_attempt_at <= now:
+                due.append(item)
+                if len(due) >= self.batch_size:
+                    break
+            elif next_retry is None or item.next_attempt_at < next_retry:
+                next_retry = item.next_attempt_at
+        return due, next_retry
+
+    def _upload(self, item: SpoolItem):
+        data = self.spool.read(item)
+        # Class info as object metadata (ASCII only) so listings can be reconciled per transition
+        metadata = {
+            name.replace("_", "-"): str(item.metadata[name])
+            for name in S3_METADATA_FIELDS
+            if name in item.metadata and str(item.metadata[name]).isascii()
+        }
+        self.client.put_object(
+            Bucket=self.bucket, Key=item.key, Body=data, ContentType=item.content_type, Metadata=metadata
+        )
+        self.spool.remove(item)
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_backoff_s, self.base_backoff_s * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _flush(self, item: SpoolItem):
+        loop = asyncio.get_running_loop()
+        try:
+            with STAGE_SECONDS.time("s3_upload"):
+                await loop.run_in_executor(self._pool, self._upload, item)
+            self.uploaded += 1
+            self._items.pop(item.id, None)
+        except Exception as e:
+            self.failed_attempts += 1
+            item.attempts += 1
+            item.next_attempt_at = time.time() + self._backoff(item.attempts)
+            item.last_error = str(e)[:500]
+            logger.warning(f"S3 upload failed for {item.key} (attempt {item.attempts}): {e}")
+            try:
+                await loop.run_in_executor(self._pool, self.spool.update, item)
+            except OSError as update_error:
+                logger.error(f"Could not record retry for {item.key}: {update_error}")
+
+    async def _wait(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._wake.wait(), max(0.0, timeout))
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def _run(self, legacy_dir: Optional[Path]):
+        loop = asyncio.get_running_loop()
+        while not self._try_lead():
+            await asyncio.sleep(self.poll_s)
+
+        removed = await loop.run_in_executor(self._pool, self.spool.cleanup)
+        if removed:
+            logger.info(f"Removed {removed} incomplete spool files")
+        if legacy_dir is not None:
+            self.imported = await loop.run_in_executor(self._pool, self.spool.import_legacy, legacy_dir)
+            if self.imported:
+                logger.info(f"Imported {self.imported} files from {legacy_dir} into the feedback spool")
+
+        while True:
+            try:
+                due, next_retry = await loop.run_in_executor(self._pool, self._due_items)
+            except OSError as e:
+                logger.error(f"Feedback spool scan failed: {e}")
+                due, next_retry = [], None
+            if due:
+                await asyncio.gather(*(self._flush(item) for item in due))
+                continue
+            timeout = self.poll_s if next_retry is None else min(self.poll_s, next_retry - time.time())
+            await self._wait(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "bucket": self.bucket,
+            "leader": self.leader,
+            "uploaded": self.uploaded,
+            "failed_attempts": self.failed_attempts,
+            "imported_legacy": self.imported,
+        }
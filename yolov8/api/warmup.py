@@ -0,0 +1,102 @@
+"""
+Startup Warm-up
+Runs dummy batches at each configured batch size and records a startup timing breakdown
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from api.executor import InferenceExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def parse_batch_sizes(value: str, max_batch_size: int, max_job_size: int = 0) -> List[int]:
+    """
+    "1,4,8" -> [1, 4, 8]; empty -> powers of two up to max_batch_size plus max_batch_size itself,
+    and max_job_size when one request can submit more images than max_batch_size
+    (the scheduler runs such a job alone as one larger batch instead of splitting it)
+    Sizes above both limits are dropped since the scheduler never builds them
+    """
+    largest = max(max_batch_size, max_job_size)
+    if value.strip():
+        sizes = {int(v) for v in value.split(",") if v.strip()}
+    else:
+        sizes = {max_batch_size, largest}
+        size = 1
+        while size < max_batch_size:
+            sizes.add(size)
+            size *= 2
+    return sorted(s for s in sizes if 0 < s <= largest)
+
+
+class StartupProfile:
+    """
+    Startup timing breakdown (seconds)
+
+    - import_s: importing the API module (FastAPI, numpy, OpenCV, boto3, ...)
+    - model_load_s: backend construction incl. torch/ultralytics import and weight load
+    - first_inference_s: the first warm-up batch (kernel selection, first allocations)
+    - warmup_s: all warm-up batches; per-size latency of the last round in `batches`
+    - ready_s: module import start -> worker ready
+    """
+
+    def __init__(self, started: Optional[float] = None):
+        self.started = started if started is not None else time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.batches: Dict[int, float] = {}
+
+    def record(self, name: str, seconds: float):
+        self.timings[name] = round(seconds, 4)
+
+    def mark_ready(self):
+        self.record("ready_s", time.perf_counter() - self.started)
+
+    def snapshot(self) -> dict:
+        return {
+            **self.timings,
+            "batches_ms": {str(size): round(s * 1000, 2) for size, s in self.batches.items()},
+        }
+
+
+async def run_warmup(
+    executor: InferenceExecutor,
+    batch_sizes: List[int],
+    rounds: int,
+    profile: StartupProfile,
+    image_shape: tuple = (480, 640, 3)
+):
+    """
+    Run `rounds` dummy batches at every size through the executor
+
+    Each round fills every executor slot so all worker threads / processes see the
+    batch shape; images are larger than the model input so the resize path is warmed too.
+    """
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, size=image_shape, dtype=np.uint8)
+    first: Optional[float] = None
+    warmup_start = time.perf_counter()
+
+    async def _run(size: int) -> float:
+        await executor.acquire()
+        try:
+            start = time.perf_counter()
+            await executor.run([image] * size)
+            return time.perf_counter() - start
+        finally:
+            executor.release()
+
+    for size in batch_sizes:
+        for _ in range(max(1, rounds)):
+            elapsed = await asyncio.gather(*[_run(size) for _ in range(executor.workers)])
+            if first is None:
+                first = max(elapsed)
+                profile.record("first_inference_s", first)
+            profile.batches[size] = max(elapsed)
+        logger.info(f"Warm-up batch size {size}: {profile.batches[size] * 1000:.1f} ms")
+
+    profile.record("warmup_s", time.perf_counter() - warmup_start)
@@ -0,0 +1,290 @@
+"""
+추론 백엔드
+PyTorch(.pt) / ONNX Runtime(.onnx) / OpenVINO IR(.xml) 모델을 같은 인터페이스로 사용
+
+- 모든 백엔드는 BGR 이미지 리스트를 받아 [N, C] 클래스 확률 행렬을 반환
+- 전처리(리사이즈 → 중앙 크롭 → RGB → 0~1 정규화)는 모든 백엔드가 공유
+- torch / ultralytics 는 PyTorch 백엔드를 사용할 때만 import
+"""
+
+import ast
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+import yaml
+
+
+BACKENDS = ('torch', 'onnx', 'openvino')
+
+# 메타데이터에 클래스 정보가 없을 때 사용 (configs/dataset.yaml 순서)
+DEFAULT_NAMES = {
+    0: 'simple_pole',
+    1: 'steel_pipe',
+    2: 'complex_type',
+    3: 'indoor',
+    4: 'single_pole_building',
+    5: 'tower_building',
+    6: 'tower_ground',
+    7: 'telecom_pole',
+    8: 'frame_mount',
+}
+
+DEFAULT_IMGSZ = 224
+
+
+def detect_backend(model_path: str) -> str:
+    """모델 경로(확장자)로 백엔드 결정"""
+    path = Path(model_path)
+    suffix = path.suffix.lower()
+    if suffix == '.pt':
+        return 'torch'
+    if suffix == '.onnx':
+        return 'onnx'
+    if suffix == '.xml' or path.is_dir():
+        return 'openvino'
+    raise ValueError(f"모델 형식을 알 수 없습니다: {model_path} (.pt / .onnx / .xml 지원)")
+
+
+def model_fingerprint(model_path: str) -> str:
+    """
+    모델 파일 내용 기반 버전 문자열 (예: best-3fa2c9d1e0ab)
+    OpenVINO는 .xml과 .bin을 함께 해시
+    """
+    path = Path(model_path)
+    if path.is_dir():
+        files = sorted(path.glob('*.xml')) + sorted(path.glob('*.bin'))
+    elif path.suffix.lower() == '.xml':
+        files = [path] + ([path.with_suffix('.bin')] if path.with_suffix('.bin').exists() else [])
+    else:
+        files = [path]
+
+    digest = hashlib.sha256()
+    for file in files:
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return f"{path.stem}-{digest.hexdigest()[:12]}"
+
+
+def prepare_image(image: np.ndarray, imgsz: int = DEFAULT_IMGSZ) -> np.ndarray:
+    """
+    BGR 이미지 → [3, imgsz, imgsz] uint8 (RGB)
+    짧은 변을 imgsz로 리사이즈한 뒤 중앙 크롭 (ultralytics 분류 전처리와 동일)
+    """
+    h, w = image.shape[:2]
+    scale = imgsz / min(h, w)
+    new_w, new_h = max(imgsz, round(w * scale)), max(imgsz, round(h * scale))
+    interp = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    resized = cv2.resize(image, (new_w, new_h), interpolation=interp)
+
+    top = (new_h - imgsz) // 2
+    left = (new_w - imgsz) // 2
+    cropped = resized[top:top + imgsz, left:left + imgsz]
+
+    rgb = cv2.cvtColor(cropped, cv2.COLOR_BGR2RGB)
+    return np.ascontiguousarray(rgb.transpose(2, 0, 1))
+
+
+def to_tensor(batch: np.ndarray) -> np.ndarray:
+    """uint8 [N, 3, H, W] → float32 (0~1)"""
+    return batch.astype(np.float32) / 255.0
+
+
+def preprocess_image(image: np.ndarray, imgsz: int = DEFAULT_IMGSZ) -> np.ndarray:
+    """BGR 이미지 → [3, imgsz, imgsz] float32 (RGB, 0~1)"""
+    return to_tensor(prepare_image(image, imgsz))
+
+
+def preprocess(images: List[np.ndarray], imgsz: int = DEFAULT_IMGSZ) -> np.ndarray:
+    """BGR 이미지 리스트 → [N, 3, imgsz, imgsz] float32 배치"""
+    return np.stack([preprocess_image(image, imgsz) for image in images])
+
+
+class InferenceBackend:
+    """추론 백엔드 공통 인터페이스"""
+
+    name = 'base'
+
+    def __init__(self, model_path: str):
+        self.model_path = str(model_path)
+        self.names: Dict[int, str] = dict(DEFAULT_NAMES)
+        self.imgsz = DEFAULT_IMGSZ
+        self.version = ''
+
+    def predict(self, images: List[np.ndarray]) -> np.ndarray:
+        """BGR 이미지 리스트 → [N, C] 확률 행렬"""
+        return self.predict_tensor(preprocess(images, self.imgsz))
+
+    def predict_tensor(self, batch: np.ndarray) -> np.ndarray:
+        """전처리된 [N, 3, H, W] 배치 → [N, C] 확률 행렬"""
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.model_path})"
+
+
+class TorchBackend(InferenceBackend):
+    """ultralytics YOLO (.pt) 백엔드"""
+
+    name = 'torch'
+
+    def __init__(self, model_path: str, num_threads: int = 0):
+        super().__init__(model_path)
+        import torch
+        from ultralytics import YOLO
+
+        if num_threads > 0:
+            torch.set_num_threads(num_threads)
+        self._torch = torch
+
+        yolo = YOLO(self.model_path)
+        self.names = dict(yolo.names)
+        args = getattr(yolo.model, 'args', None) or {}
+        imgsz = args.get('imgsz', DEFAULT_IMGSZ) if isinstance(args, dict) else DEFAULT_IMGSZ
+        self.imgsz = int(imgsz[0] if isinstance(imgsz, (list, tuple)) else imgsz)
+
+        # predictor 를 거치지 않고 분류 모듈을 직접 호출
+        self.module = yolo.model.float().eval()
+
+    def predict_tensor(self, batch: np.ndarray) -> np.ndarray:
+        with self._torch.inference_mode():
+            out = self.module(self._torch.from_numpy(np.ascontiguousarray(batch, dtype=np.float32)))
+        if isinstance(out, (list, tuple)):
+            out = out[0]
+        return out.float().cpu().numpy()
+
+
+class OnnxBackend(InferenceBackend):
+    """ONNX Runtime (.onnx) CPU 백엔드"""
+
+    name = 'onnx'
+
+    def __init__(self, model_path: str, num_threads: int = 0):
+        super().__init__(model_path)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            self.model_path, sess_options=options, providers=['CPUExecutionProvider']
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+
+        meta = self.session.get_modelmeta().custom_metadata_map
+        if 'names' in meta:
+            self.names = {int(k): v for k, v in ast.literal_eval(meta['names']).items()}
+        if 'imgsz' in meta:
+            self.imgsz = int(ast.literal_eval(meta['imgsz'])[0])
+
+    def predict_tensor(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        if self.dynamic_batch:
+            return self.session.run(None, {self.input_name: batch})[0]
+        # 고정 배치(1)로 내보낸 모델은 한 장씩 실행
+        return np.concatenate([
+            self.session.run(None, {self.input_name: batch[i:i + 1]})[0]
+            for i in range(len(batch))
+        ])
+
+
+class OpenVinoBackend(InferenceBackend):
+    """OpenVINO IR (.xml / *_openvino_model 디렉토리) CPU 백엔드"""
+
+    name = 'openvino'
+
+    def __init__(self, model_path: str, num_threads: int = 0):
+        path = Path(model_path)
+        if path.is_dir():
+            xml_files = sorted(path.glob('*.xml'))
+            if not xml_files:
+                raise FileNotFoundError(f"OpenVINO 모델(.xml)이 없습니다: {model_path}")
+            path = xml_files[0]
+        super().__init__(str(path))
+        import openvino as ov
+
+        metadata_path = path.parent / 'metadata.yaml'
+        if metadata_path.exists():
+            with open(metadata_path, 'r', encoding='utf-8') as f:
+                metadata = yaml.safe_load(f) or {}
+            if 'names' in metadata:
+                self.names = {int(k): v for k, v in metadata['names'].items()}
+            if 'imgsz' in metadata:
+                self.imgsz = int(metadata['imgsz'][0])
+
+        core = ov.Core()
+        model = core.read_model(str(path))
+        # 배치 차원을 동적으로 변경
+        model.reshape([-1, 3, self.imgsz, self.imgsz])
+        config = {'PERFORMANCE_HINT': 'LATENCY'}
+        if num_threads > 0:
+            config['INFERENCE_NUM_THREADS'] = num_threads
+        self.compiled = core.compile_model(model, 'CPU', config)
+        self.output = self.compiled.output(0)
+
+    def predict_tensor(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        return np.asarray(self.compiled(batch)[self.output])
+
+
+_BACKEND_CLASSES = {
+    'torch': TorchBackend,
+    'onnx': OnnxBackend,
+    'openvino': OpenVinoBackend,
+}
+
+
+def load_backend(
+    model_path: str,
+    backend: Optional[str] = None,
+    num_threads: int = 0,
+    version: Optional[str] = None
+) -> InferenceBackend:
+    """
+    모델 로드
+
+    Args:
+        model_path: .pt / .onnx / .xml (또는 *_openvino_model 디렉토리)
+        backend: 'torch' / 'onnx' / 'openvino' / 'auto' (None이면 INFERENCE_BACKEND 환경변수, 없으면 auto)
+        num_threads: 추론 스레드 수 (0이면 라이브러리 기본값)
+        version: 모델 버전 이름 (None이면 파일 내용 기반 fingerprint)
+    """
+    if not Path(model_path).exists():
+        raise FileNotFoundError(f"모델 파일을 찾을 수 없습니다: {model_path}")
+
+    backend = backend or os.getenv('INFERENCE_BACKEND', 'auto')
+    if backend == 'auto':
+        backend = detect_backend(model_path)
+    if backend not in _BACKEND_CLASSES:
+        raise ValueError(f"지원하지 않는 백엔드: {backend} (지원: {BACKENDS})")
+
+    model = _BACKEND_CLASSES[backend](model_path, num_threads=num_threads)
+    model.version = version or model_fingerprint(model_path)
+    return model
+
+
+def describe_model(model_path: str, backend: Optional[str] = None, version: Optional[str] = None) -> InferenceBackend:
+    """
+    가중치를 올리지 않고 경로 / 백엔드 이름 / 버전만 채운 모델 정보
+    프로세스 풀 워커가 실제 모델을 로드할 때 부모 프로세스가 버전 확인용으로 사용 (predict 불가)
+    """
+    if not Path(model_path).exists():
+        raise FileNotFoundError(f"모델 파일을 찾을 수 없습니다: {model_path}")
+
+    backend = backend or os.getenv('INFERENCE_BACKEND', 'auto')
+    if backend == 'auto':
+        backend = detect_backend(model_path)
+    if backend not in _BACKEND_CLASSES:
+        raise ValueError(f"지원하지 않는 백엔드: {backend} (지원: {BACKENDS})")
+
+    info = InferenceBackend(model_path)
+    info.name = backend
+    info.version = version or model_fingerprint(model_path)
+    return info
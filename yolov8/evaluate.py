@@ -1,14 +1,26 @@
 """
 모델 평가 스크립트
 학습된 모델의 성능을 평가하고 리포트 생성
+
+- 평가 분할 전체를 CPU 배치 추론(디코딩은 워커 병렬)으로 한 번만 돌려 확률 행렬을 .npy 로 저장
+- 클래스별 정밀도 / 재현율 / F1, 혼동 행렬, 보정 지표(ECE / Brier / NLL)는 저장된 확률로 계산
+  (--cache 로 다시 분석할 때는 추론하지 않음)
+- 분할 매니페스트(utils/splits.py)의 국소ID로 묶어 종합 판단 방식(mean / max / vote)별 국소 정확도 비교
 """
 
 import argparse
+import csv
 import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 import numpy as np
-from ultralytics import YOLO
+
+from backends import load_backend, prepare_image, to_tensor
+from predict import DecodePipeline, combine_probs, print_pipeline_stats
+from utils.shards import ShardReader, is_shard_dataset, load_shard_meta
+from utils.splits import MANIFEST_NAME, load_split_manifest
 
 
 # 클래스 한글 매핑 (9개 클래스)
@@ -25,26 +37,37 @@ CLASS_NAMES_KR = {
 }
 
 
+ENSEMBLE_METHODS = ('mean', 'max', 'vote')
+
+# 평가 캐시 (--save-dir / --cache)
+PROBS_NAME = 'probs.npy'
+LABELS_NAME = 'labels.npy'
+FILES_NAME = 'files.txt'
+CACHE_META_NAME = 'meta.json'
+
+
 def evaluate_model(
     model_path: str,
     data_path: str,
     split: str = 'val',
     batch_size: int = 16,
-    device: int = 0
+    device: str = 'cpu'
 ) -> Dict:
     """
-    모델 성능 평가
+    ultralytics val 로 모델 성능 평가 (Top-1 / Top-5 만)
 
     Args:
         model_path: 학습된 모델 경로
         data_path: 데이터셋 경로 (train/val 포함)
         split: 평가할 데이터 분할 (train/val)
         batch_size: 배치 크기
-        device: GPU 디바이스
+        device: 디바이스 ('cpu' 또는 GPU 번호)
 
     Returns:
         평가 결과 딕셔너리
     """
+    from ultralytics import YOLO
+
     # 모델 로드
     model = YOLO(model_path)
 
@@ -76,6 +99,372 @@ def evaluate_model(
     return results
 
 
+def list_split_images(data_path: str, split: str, class_names: Dict[int, str]) -> List[tuple]:
+    """data_path/split/<클래스>/ 구조에서 (이미지 경로, 클래스 인덱스) 목록 생성"""
+    name_to_idx = {name: idx for idx, name in class_names.items()}
+    split_dir = Path(data_path) / split
+    if not split_dir.is_dir():
+        raise NotADirectoryError(f"데이터 분할 디렉토리를 찾을 수 없습니다: {split_dir}")
+
+    samples = []
+    for class_dir in sorted(p for p in split_dir.iterdir() if p.is_dir()):
+        if class_dir.name not in name_to_idx:
+            print(f"경고: 모델에 없는 클래스 폴더 건너뜀: {class_dir.name}")
+            continue
+        for img_path in sorted(class_dir.iterdir()):
+            if img_path.suffix.lower() in ('.jpg', '.jpeg', '.png', '.bmp', '.webp'):
+                samples.append((str(img_path), name_to_idx[class_dir.name]))
+    return samples
+
+
+class ShardSamples:
+    """샤드 분할을 평가용 (이미지, 모델 클래스 인덱스) 목록처럼 사용 (디코딩 없음)"""
+
+    def __init__(self, data_path: str, split: str, class_names: Dict[int, str]):
+        self.reader = ShardReader(str(Path(data_path) / split))
+        name_to_idx = {name: idx for idx, name in class_names.items()}
+        missing = [name for name in self.reader.names if name not in name_to_idx]
+        if missing:
+            raise ValueError(f"모델에 없는 클래스가 샤드에 있습니다: {missing}")
+        self.labels = np.array([name_to_idx[name] for name in self.reader.names])[self.reader.labels]
+        # 샤드를 만든 원본 데이터셋 기준 상대 경로 (split/<클래스>/<파일>)
+        self.files = self.reader.files
+
+    def __len__(self) -> int:
+        return len(self.reader)
+
+    def batch(self, start: int, size: int):
+        end = min(start + size, len(self))
+        return [self.reader.image(i) for i in range(start, end)], self.labels[start:end]
+
+
+class FileSamples:
+    """data_path/split/<클래스>/ 이미지 파일 목록"""
+
+    def __init__(self, data_path: str, split: str, class_names: Dict[int, str]):
+        self.samples = list_split_images(data_path, split, class_names)
+        self.labels = np.array([label for _, label in self.samples], dtype=np.int64)
+        self.files = [Path(path).relative_to(data_path).as_posix() for path, _ in self.samples]
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+
+def infer_samples(
+    model,
+    samples,
+    batch_size: int = 16,
+    workers: int = 8
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    평가 샘플 전체 추론
+
+    - 파일: DecodePipeline 워커가 디코딩/전처리를 추론과 병렬로 미리 수행
+    - 샤드: 디코딩 없이 리사이즈/크롭만 스레드 풀에서 병렬 수행
+
+    Returns:
+        ([N, C] 확률 행렬, 추론 성공 여부 [N] - 읽지 못한 이미지는 False)
+    """
+    probs = np.zeros((len(samples), len(model.names)), dtype=np.float32)
+    ok = np.zeros(len(samples), dtype=bool)
+
+    if isinstance(samples, ShardSamples):
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for start in range(0, len(samples), batch_size):
+                images, _ = samples.batch(start, batch_size)
+                batch = np.stack(list(pool.map(lambda image: prepare_image(image, model.imgsz), images)))
+                probs[start:start + len(images)] = model.predict_tensor(to_tensor(batch))
+                ok[start:start + len(images)] = True
+        return probs, ok
+
+    pipeline = DecodePipeline(model.imgsz, batch_size, workers)
+    tagged_paths = ((i, path) for i, (path, _) in enumerate(samples.samples))
+    for batch_items, tensor, failed in pipeline.batches(tagged_paths):
+        for _, path in failed:
+            print(f"  이미지를 읽을 수 없습니다: {path}")
+        if batch_items:
+            idx = [i for i, _ in batch_items]
+            probs[idx] = pipeline.predict(model, tensor)
+            ok[idx] = True
+    print_pipeline_stats(pipeline.stats.report())
+    return probs, ok
+
+
+def run_inference(
+    model_path: str,
+    data_path: str,
+    split: str = 'val',
+    batch_size: int = 16,
+    backend: str = 'auto',
+    workers: int = 8,
+    threads: int = 0,
+    save_dir: Optional[str] = None
+) -> Path:
+    """
+    평가 분할을 추론하고 확률 행렬을 캐시 디렉토리에 저장
+
+    캐시 구조:
+    save_dir/
+    ├── probs.npy      # [N, C] float32 클래스 확률 (모델 클래스 인덱스 순서)
+    ├── labels.npy     # [N] 정답 클래스 인덱스
+    ├── files.txt      # 이미지별 데이터셋 기준 상대 경로 (split/<클래스>/<파일>)
+    └── meta.json      # 모델 / 데이터 / 클래스 이름 / 백엔드
+
+    data_path 가 샤드 디렉토리(utils/shards.py)면 디코딩 없이 샤드에서 읽음
+
+    Returns:
+        캐시 디렉토리 경로
+    """
+    model = load_backend(model_path, backend, num_threads=threads)
+    source_cls = ShardSamples if is_shard_dataset(data_path) else FileSamples
+    samples = source_cls(data_path, split, model.names)
+    if not len(samples):
+        raise ValueError(f"평가할 이미지가 없습니다: {data_path}/{split}")
+
+    print("=" * 60)
+    print(f"모델 평가: {model_path} ({model.name})")
+    print(f"데이터: {data_path}/{split} ({len(samples)}장)")
+    print("=" * 60)
+
+    probs, ok = infer_samples(model, samples, batch_size, workers)
+
+    cache_dir = Path(save_dir) if save_dir else Path('runs/evaluate') / f"{Path(model_path).stem}_{split}"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    np.save(cache_dir / PROBS_NAME, probs[ok])
+    np.save(cache_dir / LABELS_NAME, samples.labels[ok])
+    (cache_dir / FILES_NAME).write_text(
+        ''.join(f"{f}\n" for f, keep in zip(samples.files, ok) if keep), encoding='utf-8'
+    )
+    meta = {
+        'model_path': str(model_path),
+        'data_path': str(data_path),
+        'split': split,
+        'backend': model.name,
+        'model_version': model.version,
+        'names': {str(k): v for k, v in model.names.items()},
+        'num_images': int(ok.sum()),
+        'failed': int((~ok).sum()),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    with open(cache_dir / CACHE_META_NAME, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    print(f"확률 행렬 저장: {cache_dir / PROBS_NAME} {probs[ok].shape}")
+    return cache_dir
+
+
+def load_eval_cache(cache_dir: str) -> Tuple[np.ndarray, np.ndarray, List[str], Dict]:
+    """run_inference 캐시 → (확률 행렬, 정답, 파일 목록, 메타)"""
+    cache_path = Path(cache_dir)
+    with open(cache_path / CACHE_META_NAME, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    probs = np.load(cache_path / PROBS_NAME)
+    labels = np.load(cache_path / LABELS_NAME)
+    files = (cache_path / FILES_NAME).read_text(encoding='utf-8').splitlines()
+    return probs, labels, files, meta
+
+
+def classification_metrics(probs: np.ndarray, labels: np.ndarray, n_bins: int = 15) -> Dict:
+    """
+    확률 행렬 → 정확도, 클래스별 정밀도 / 재현율 / F1, 혼동 행렬, 보정 지표
+
+    - 혼동 행렬: 행 = 정답, 열 = 예측
+    - ECE: 1순위 신뢰도를 n_bins 구간으로 나눠 |정확도 - 평균 신뢰도| 를 이미지 수로 가중 평균
+    - Brier: 원-핫 정답과 확률 벡터의 제곱 오차 합 평균, NLL: 정답 클래스 확률의 -log 평균
+    """
+    n, num_classes = probs.shape
+    pred = probs.argmax(axis=1)
+    confusion = np.bincount(labels * num_classes + pred, minlength=num_classes ** 2).reshape(num_classes, num_classes)
+
+    tp = np.diag(confusion).astype(np.float64)
+    support = confusion.sum(axis=1)
+    predicted = confusion.sum(axis=0)
+    precision = np.divide(tp, predicted, out=np.zeros(num_classes), where=predicted > 0)
+    recall = np.divide(tp, support, out=np.zeros(num_classes), where=support > 0)
+    f1 = np.divide(2 * precision * recall, precision + recall, out=np.zeros(num_classes),
+                   where=(precision + recall) > 0)
+    present = support > 0
+
+    top5 = np.argsort(-probs, axis=1)[:, :5]
+    confidence = probs[np.arange(n), pred]
+    correct = pred == labels
+    bins = np.minimum((confidence * n_bins).astype(np.int64), n_bins - 1)
+    bin_count = np.bincount(bins, minlength=n_bins)
+    bin_correct = np.bincount(bins, weights=correct, minlength=n_bins)
+    bin_confidence = np.bincount(bins, weights=confidence, minlength=n_bins)
+    filled = bin_count > 0
+    ece = float(np.sum(np.abs(bin_correct[filled] - bin_confidence[filled])) / n)
+
+    onehot = np.zeros_like(probs, dtype=np.float64)
+    onehot[np.arange(n), labels] = 1.0
+
+    return {
+        'metrics': {
+            'top1_accuracy': float(correct.mean()),
+            'top5_accuracy': float(np.any(top5 == labels[:, None], axis=1).mean()),
+            'macro_f1': float(f1[present].mean()) if present.any() else 0.0,
+            'weighted_f1': float(np.sum(f1 * support) / n),
+            'ece': ece,
+            'brier': float(np.mean(np.sum((probs - onehot) ** 2, axis=1))),
+            'nll': float(-np.mean(np.log(np.clip(probs[np.arange(n), labels], 1e-12, 1.0)))),
+        },
+        'per_class': {
+            'precision': precision,
+            'recall': recall,
+            'f1': f1,
+            'support': support,
+            'predicted': predicted,
+        },
+        'confusion_matrix': confusion,
+        'reliability': [
+            {
+                'range': [b / n_bins, (b + 1) / n_bins],
+                'count': int(bin_count[b]),
+                'accuracy': float(bin_correct[b] / bin_count[b]),
+                'confidence': float(bin_confidence[b] / bin_count[b]),
+            }
+            for b in range(n_bins) if filled[b]
+        ],
+    }
+
+
+def default_manifest_path(data_path: str) -> Path:
+    """평가 데이터의 분할 매니페스트 위치 (샤드는 원본 데이터셋 디렉토리)"""
+    if is_shard_dataset(data_path):
+        return Path(load_shard_meta(data_path)['source']) / MANIFEST_NAME
+    return Path(data_path) / MANIFEST_NAME
+
+
+def load_station_map(manifest_path: Path) -> Dict[str, str]:
+    """분할 매니페스트 → {split/<클래스>/<파일>: 국소ID} (국소ID 가 없는 행 제외)"""
+    manifest = load_split_manifest(manifest_path)
+    manifest = manifest[manifest['station'] != '']
+    keys = manifest['split'] + '/' + manifest['class'] + '/' + manifest['dest']
+    return dict(zip(keys, manifest['station']))
+
+
+def evaluate_stations(
+    probs: np.ndarray,
+    labels: np.ndarray,
+    files: List[str],
+    station_map: Dict[str, str],
+    names: Dict[int, str],
+    methods: Tuple[str, ...] = ENSEMBLE_METHODS
+) -> Dict:
+    """
+    국소ID 로 묶은 이미지의 확률을 종합 방식별로 결합해 국소 단위 정확도 계산 (재추론 없음)
+    국소 정답은 국소 이미지 정답의 다수결
+    """
+    groups: Dict[str, List[int]] = {}
+    for i, f in enumerate(files):
+        station = station_map.get(f)
+        if station:
+            groups.setdefault(station, []).append(i)
+
+    correct = {method: 0 for method in methods}
+    rows = []
+    for station, idx in groups.items():
+        true = int(np.bincount(labels[idx]).argmax())
+        row = {'국소ID': station, '이미지수': len(idx), '정답': names[true]}
+        for method in methods:
+            pred = int(np.argmax(combine_probs(probs[idx], method)))
+            row[method] = names[pred]
+            correct[method] += pred == true
+        rows.append(row)
+
+    covered = [i for idx in groups.values() for i in idx]
+    return {
+        'stations': len(groups),
+        'images': len(covered),
+        'image_accuracy': float(np.mean(probs[covered].argmax(axis=1) == labels[covered])) if covered else 0.0,
+        'accuracy': {method: correct[method] / len(groups) if groups else 0.0 for method in methods},
+        'rows': rows,
+    }
+
+
+def analyze_cache(cache_dir: str, manifest: Optional[str] = None, n_bins: int = 15) -> Dict:
+    """
+    저장된 확률 행렬로 전체 지표 계산 (추론 없음)
+    per_class.csv, confusion_matrix.csv, stations.csv 를 캐시 디렉토리에 함께 저장
+    """
+    cache_path = Path(cache_dir)
+    probs, labels, files, meta = load_eval_cache(cache_dir)
+    names = {int(k): v for k, v in meta['names'].items()}
+    class_list = [names[i] for i in range(len(names))]
+    computed = classification_metrics(probs, labels, n_bins)
+
+    per_class = [
+        {
+            'class': name,
+            'class_kr': CLASS_NAMES_KR.get(name, name),
+            'precision': round(float(computed['per_class']['precision'][i]), 4),
+            'recall': round(float(computed['per_class']['recall'][i]), 4),
+            'f1': round(float(computed['per_class']['f1'][i]), 4),
+            'support': int(computed['per_class']['support'][i]),
+            'predicted': int(computed['per_class']['predicted'][i]),
+        }
+        for i, name in enumerate(class_list)
+    ]
+    with open(cache_path / 'per_class.csv', 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(per_class[0]))
+        writer.writeheader()
+        writer.writerows(per_class)
+
+    confusion = computed['confusion_matrix']
+    with open(cache_path / 'confusion_matrix.csv', 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['정답\\예측'] + class_list)
+        for name, row in zip(class_list, confusion):
+            writer.writerow([name] + row.tolist())
+
+    results = {
+        'model_path': meta['model_path'],
+        'data_path': meta['data_path'],
+        'split': meta['split'],
+        'backend': meta['backend'],
+        'num_images': len(labels),
+        'failed': meta.get('failed', 0),
+        'cache_dir': str(cache_path),
+        'metrics': computed['metrics'],
+        'per_class': per_class,
+        'confusion_matrix': {'labels': class_list, 'matrix': confusion.tolist()},
+        'reliability': computed['reliability'],
+    }
+
+    manifest_path = Path(manifest) if manifest else default_manifest_path(meta['data_path'])
+    if manifest_path.exists():
+        stations = evaluate_stations(probs, labels, files, load_station_map(manifest_path), names)
+        if stations['rows']:
+            with open(cache_path / 'stations.csv', 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=list(stations['rows'][0]))
+                writer.writeheader()
+                writer.writerows(stations['rows'])
+        results['stations'] = {k: v for k, v in stations.items() if k != 'rows'}
+        results['stations']['manifest'] = str(manifest_path)
+    elif manifest:
+        raise FileNotFoundError(f"분할 매니페스트를 찾을 수 없습니다: {manifest}")
+
+    return results
+
+
+def evaluate_backend(
+    model_path: str,
+    data_path: str,
+    split: str = 'val',
+    batch_size: int = 16,
+    backend: str = 'auto',
+    workers: int = 8,
+    threads: int = 0,
+    save_dir: Optional[str] = None,
+    manifest: Optional[str] = None
+) -> Dict:
+    """
+    추론 백엔드(.pt / .onnx / .xml)로 모델 성능 평가 (run_inference + analyze_cache)
+    ultralytics val 없이 동일한 전처리로 평가 (양자화 모델 비교용)
+    """
+    cache_dir = run_inference(model_path, data_path, split, batch_size, backend, workers, threads, save_dir)
+    return analyze_cache(str(cache_dir), manifest)
+
+
 def print_evaluation_report(results: Dict):
     """평가 결과 리포트 출력"""
     print("\n" + "=" * 60)
@@ -86,39 +475,94 @@ def print_evaluation_report(results: Dict):
     print(f"\nTop-1 정확도: {metrics['top1_accuracy']:.2%}")
     print(f"Top-5 정확도: {metrics['top5_accuracy']:.2%}")
 
-    print("\n클래스 정보:")
-    for eng, kr in CLASS_NAMES_KR.items():
-        print(f"  - {eng}: {kr}")
+    if 'macro_f1' in metrics:
+        print(f"Macro F1: {metrics['macro_f1']:.4f} (가중 F1: {metrics['weighted_f1']:.4f})")
+        print(f"보정: ECE={metrics['ece']:.4f}, Brier={metrics['brier']:.4f}, NLL={metrics['nll']:.4f}")
+
+    if 'per_class' in results:
+        print(f"\n{'클래스':<34}{'정밀도':>8}{'재현율':>8}{'F1':>8}{'이미지':>8}")
+        for row in results['per_class']:
+            print(f"  {row['class_kr']:<32}{row['precision']:>8.3f}{row['recall']:>8.3f}"
+                  f"{row['f1']:>8.3f}{row['support']:>8}")
 
+        print("\n혼동 행렬 (행: 정답, 열: 예측, 클래스 순서는 위 표와 같음):")
+        for row in results['confusion_matrix']['matrix']:
+            print("  " + " ".join(f"{v:>5}" for v in row))
+    else:
+        print("\n클래스 정보:")
+        for eng, kr in CLASS_NAMES_KR.items():
+            print(f"  - {eng}: {kr}")
+
+    if 'stations' in results:
+        stations = results['stations']
+        print(f"\n국소 단위 종합 판단: 국소 {stations['stations']}개, 이미지 {stations['images']}장 "
+              f"(이미지 단위 정확도 {stations['image_accuracy']:.2%})")
+        for method, accuracy in stations['accuracy'].items():
+            print(f"  {method}: {accuracy:.2%}")
+
+    if 'cache_dir' in results:
+        print(f"\n확률 행렬 / CSV: {results['cache_dir']}")
     print("=" * 60)
 
 
 def main():
     parser = argparse.ArgumentParser(description='모델 평가')
-    parser.add_argument('--model', type=str, required=True,
-                        help='학습된 모델 경로')
-    parser.add_argument('--data', type=str, required=True,
-                        help='데이터셋 경로')
+    parser.add_argument('--model', type=str, default=None,
+                        help='학습된 모델 경로 (.pt / .onnx / .xml)')
+    parser.add_argument('--data', type=str, default=None,
+                        help='데이터셋 경로 (클래스 폴더 또는 샤드 디렉토리)')
     parser.add_argument('--split', type=str, default='val',
                         choices=['train', 'val'],
                         help='평가할 데이터 분할 (기본: val)')
     parser.add_argument('--batch-size', type=int, default=16,
                         help='배치 크기 (기본: 16)')
-    parser.add_argument('--device', type=int, default=0,
-                        help='GPU 디바이스 (기본: 0)')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='병렬 디코딩 / 전처리 수 (기본: 8)')
+    parser.add_argument('--threads', type=int, default=0,
+                        help='추론 스레드 수 (기본: 0 = 라이브러리 기본값)')
+    parser.add_argument('--backend', type=str, default='auto',
+                        choices=['auto', 'torch', 'onnx', 'openvino'],
+                        help='추론 백엔드 (기본: auto = 확장자로 결정)')
+    parser.add_argument('--save-dir', type=str, default=None,
+                        help='확률 행렬 / CSV 저장 디렉토리 (기본: runs/evaluate/<모델>_<분할>)')
+    parser.add_argument('--cache', type=str, default=None,
+                        help='저장된 확률 행렬 디렉토리로 다시 분석 (추론 없음, --model / --data 불필요)')
+    parser.add_argument('--manifest', type=str, default=None,
+                        help=f'국소 종합 판단용 분할 매니페스트 (기본: <데이터셋>/{MANIFEST_NAME})')
+    parser.add_argument('--bins', type=int, default=15,
+                        help='ECE 신뢰도 구간 수 (기본: 15)')
+    parser.add_argument('--ultralytics-val', action='store_true',
+                        help='ultralytics val 로 Top-1 / Top-5 만 평가')
+    parser.add_argument('--device', type=str, default='cpu',
+                        help='--ultralytics-val 디바이스 (기본: cpu, GPU 는 0)')
     parser.add_argument('--output', type=str, default=None,
                         help='결과 저장 경로 (JSON)')
 
     args = parser.parse_args()
+    if not args.cache and not (args.model and args.data):
+        parser.error('--model 과 --data 를 지정하거나 --cache 로 저장된 확률 행렬을 지정하세요')
 
     # 평가 실행
-    results = evaluate_model(
-        model_path=args.model,
-        data_path=args.data,
-        split=args.split,
-        batch_size=args.batch_size,
-        device=args.device
-    )
+    if args.ultralytics_val:
+        results = evaluate_model(
+            model_path=args.model,
+            data_path=args.data,
+            split=args.split,
+            batch_size=args.batch_size,
+            device=args.device
+        )
+    else:
+        cache_dir = args.cache or run_inference(
+            model_path=args.model,
+            data_path=args.data,
+            split=args.split,
+            batch_size=args.batch_size,
+            backend=args.backend,
+            workers=args.workers,
+            threads=args.threads,
+            save_dir=args.save_dir
+        )
+        results = analyze_cache(str(cache_dir), args.manifest, args.bins)
 
     # 리포트 출력
     print_evaluation_report(results)
@@ -0,0 +1,449 @@
+"""
+모델 내보내기 스크립트
+train.py로 학습한 best.pt를 ONNX / OpenVINO IR로 변환하고 수치 일치 여부 검증
+INT8 정적 양자화 후 정확도 하락이 기준 이내일 때만 승격
+
+사용 예시:
+  # ONNX + OpenVINO로 내보내고 원본(.pt)과 비교 검증
+  python export.py export --weights runs/classify/tower_classifier/weights/best.pt --check-images data/val
+
+  # 이미 내보낸 모델 검증
+  python export.py check --reference best.pt --candidate best.onnx --images data/val
+
+  # INT8 양자화 (data/train으로 보정, data/val 정확도 하락 1%p 초과 시 승격 거부)
+  python export.py quantize --model best.onnx --data data --max-drop 0.01
+
+  # 모델 레지스트리에 새 버전으로 등록 후 활성화 (실행 중인 API 서버가 무중단 교체)
+  python export.py register --weights best_int8.onnx --registry models --activate
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from backends import load_backend, preprocess
+from registry import ModelRegistry
+
+
+DEFAULT_WEIGHTS = 'runs/classify/tower_classifier/weights/best.pt'
+EXPORT_FORMATS = ('onnx', 'openvino')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def export_model(weights: str, formats: List[str], imgsz: int = 224) -> Dict[str, str]:
+    """
+    .pt 모델을 지정한 형식으로 내보내기
+
+    Returns:
+        {형식: 내보낸 모델 경로}
+    """
+    from ultralytics import YOLO
+
+    if not Path(weights).exists():
+        raise FileNotFoundError(f"모델 파일을 찾을 수 없습니다: {weights}")
+
+    exported = {}
+    for fmt in formats:
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"지원하지 않는 형식: {fmt} (지원: {EXPORT_FORMATS})")
+        print(f"\n[{fmt}] 내보내기 중...")
+        model = YOLO(weights)
+        # 배치 크기를 동적으로 두어 API 배치 추론에 그대로 사용
+        path = model.export(format=fmt, imgsz=imgsz, dynamic=True, simplify=(fmt == 'onnx'))
+        exported[fmt] = str(path)
+        print(f"[{fmt}] 저장: {path}")
+
+    return exported
+
+
+def sample_batch(images_dir: Optional[str], imgsz: int, num_samples: int, seed: int = 0) -> np.ndarray:
+    """
+    검증용 입력 배치 생성
+    이미지 디렉토리가 있으면 실제 이미지를, 없으면 난수 이미지를 사용
+    """
+    rng = np.random.default_rng(seed)
+    images = []
+
+    if images_dir:
+        paths = sorted(
+            p for p in Path(images_dir).rglob('*')
+            if p.suffix.lower() in IMAGE_EXTENSIONS
+        )
+        if paths:
+            chosen = rng.choice(len(paths), size=min(num_samples, len(paths)), replace=False)
+            for i in sorted(chosen):
+                image = cv2.imread(str(paths[i]), cv2.IMREAD_COLOR)
+                if image is not None:
+                    images.append(image)
+
+    if not images:
+        print("검증 이미지가 없어 난수 이미지를 사용합니다.")
+        images = [
+            rng.integers(0, 256, size=(imgsz + 32, imgsz + 64, 3), dtype=np.uint8)
+            for _ in range(num_samples)
+        ]
+
+    return preprocess(images, imgsz)
+
+
+def check_parity(
+    reference: str,
+    candidate: str,
+    images_dir: Optional[str] = None,
+    num_samples: int = 32,
+    atol: float = 1e-3,
+    batch_size: int = 8
+) -> Dict:
+    """
+    두 모델의 클래스 확률값 비교
+
+    같은 전처리 배치를 두 백엔드에 넣고 최대 절대 오차와 Top-1 일치율 계산
+    """
+    ref = load_backend(reference)
+    cand = load_backend(candidate)
+
+    if ref.names != cand.names:
+        raise ValueError(f"클래스 정보가 다릅니다: {ref.names} != {cand.names}")
+
+    batch = sample_batch(images_dir, ref.imgsz, num_samples)
+    ref_probs = np.concatenate([ref.predict_tensor(batch[i:i + batch_size]) for i in range(0, len(batch), batch_size)])
+    cand_probs = np.concatenate([cand.predict_tensor(batch[i:i + batch_size]) for i in range(0, len(batch), batch_size)])
+
+    if ref_probs.shape != cand_probs.shape:
+        raise ValueError(f"출력 크기가 다릅니다: {ref_probs.shape} != {cand_probs.shape}")
+
+    max_abs_diff = float(np.max(np.abs(ref_probs - cand_probs)))
+    top1_agreement = float(np.mean(ref_probs.argmax(axis=1) == cand_probs.argmax(axis=1)))
+
+    return {
+        'reference': f"{reference} ({ref.name})",
+        'candidate': f"{candidate} ({cand.name})",
+        'num_samples': int(len(batch)),
+        'num_classes': int(ref_probs.shape[1]),
+        'max_abs_diff': round(max_abs_diff, 6),
+        'top1_agreement': round(top1_agreement, 4),
+        'passed': max_abs_diff <= atol and top1_agreement == 1.0,
+    }
+
+
+class ImageCalibrationReader:
+    """onnxruntime 양자화 보정용 데이터 리더 (전처리된 배치를 순서대로 제공)"""
+
+    def __init__(self, image_paths: List[str], input_name: str, imgsz: int, batch_size: int = 8):
+        self.image_paths = image_paths
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self.batch_size = batch_size
+        self._index = 0
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        while self._index < len(self.image_paths):
+            batch_paths = self.image_paths[self._index:self._index + self.batch_size]
+            self._index += self.batch_size
+            images = [img for img in (cv2.imread(p, cv2.IMREAD_COLOR) for p in batch_paths) if img is not None]
+            if images:
+                return {self.input_name: preprocess(images, self.imgsz)}
+        return None
+
+    def rewind(self):
+        self._index = 0
+
+
+def sample_calibration_images(train_dir: str, num_samples: int, seed: int = 42) -> List[str]:
+    """클래스별로 고르게 보정 이미지 샘플링"""
+    class_dirs = sorted(p for p in Path(train_dir).iterdir() if p.is_dir())
+    if not class_dirs:
+        raise ValueError(f"보정 이미지 디렉토리가 비어 있습니다: {train_dir}")
+
+    rng = random.Random(seed)
+    per_class = max(1, num_samples // len(class_dirs))
+    samples = []
+    for class_dir in class_dirs:
+        paths = sorted(str(p) for p in class_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+        rng.shuffle(paths)
+        samples.extend(paths[:per_class])
+    return samples
+
+
+def copy_onnx_metadata(src: str, dst: str):
+    """클래스명 / imgsz 메타데이터를 양자화 모델에 복사"""
+    import onnx
+
+    src_model = onnx.load(src)
+    dst_model = onnx.load(dst)
+    existing = {p.key for p in dst_model.metadata_props}
+    for prop in src_model.metadata_props:
+        if prop.key not in existing:
+            entry = dst_model.metadata_props.add()
+            entry.key, entry.value = prop.key, prop.value
+    onnx.save(dst_model, dst)
+
+
+def quantize_onnx(
+    fp32_path: str,
+    output_path: str,
+    calibration_images: List[str],
+    imgsz: int,
+    per_channel: bool = True,
+    calibrate_method: str = 'minmax'
+) -> str:
+    """ONNX Runtime 정적 양자화 (QDQ, 가중치 INT8 / 활성값 UINT8)"""
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    input_name = ort.InferenceSession(fp32_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+    # 양자화 전 그래프 최적화 / shape 추론 (가능한 경우)
+    model_input = fp32_path
+    try:
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+        prepared = str(Path(output_path).with_suffix('.prep.onnx'))
+        quant_pre_process(fp32_path, prepared)
+        model_input = prepared
+    except Exception as e:
+        print(f"전처리 건너뜀 (quant_pre_process 실패: {e})")
+
+    methods = {
+        'minmax': CalibrationMethod.MinMax,
+        'entropy': CalibrationMethod.Entropy,
+        'percentile': CalibrationMethod.Percentile,
+    }
+    reader = ImageCalibrationReader(calibration_images, input_name, imgsz)
+    quantize_static(
+        model_input,
+        output_path,
+        reader,
+        quant_format=QuantFormat.QDQ,
+        per_channel=per_channel,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        calibrate_method=methods[calibrate_method],
+    )
+
+    if model_input != fp32_path:
+        Path(model_input).unlink(missing_ok=True)
+    copy_onnx_metadata(fp32_path, output_path)
+    return output_path
+
+
+def quantize_with_gate(
+    model: str,
+    data: str,
+    output: Optional[str] = None,
+    num_calibration: int = 256,
+    max_drop: float = 0.01,
+    split: str = 'val',
+    batch_size: int = 16,
+    per_channel: bool = True,
+    calibrate_method: str = 'minmax',
+    imgsz: int = 224
+) -> Dict:
+    """
+    INT8 양자화 + 정확도 게이트
+
+    - .pt 입력은 먼저 ONNX로 내보냄
+    - data/train 샘플로 보정, data/<split>으로 FP32 / INT8 Top-1 / Top-5 비교
+    - Top-1 또는 Top-5 하락이 max_drop을 넘으면 승격하지 않음 (후보 파일만 남김)
+    """
+    from evaluate import evaluate_backend
+
+    fp32_path = model
+    if Path(model).suffix.lower() == '.pt':
+        fp32_path = export_model(model, ['onnx'], imgsz)['onnx']
+
+    output_path = Path(output) if output else Path(fp32_path).with_name(f"{Path(fp32_path).stem}_int8.onnx")
+    candidate_path = output_path.with_name(f"{output_path.stem}.candidate.onnx")
+
+    calibration_images = sample_calibration_images(str(Path(data) / 'train'), num_calibration)
+    print(f"\n보정 이미지: {len(calibration_images)}장")
+    quantize_onnx(fp32_path, str(candidate_path), calibration_images, imgsz, per_channel, calibrate_method)
+    print(f"INT8 후보 모델: {candidate_path}")
+
+    fp32 = evaluate_backend(fp32_path, data, split, batch_size, backend='onnx')
+    int8 = evaluate_backend(str(candidate_path), data, split, batch_size, backend='onnx')
+
+    top1_drop = fp32['metrics']['top1_accuracy'] - int8['metrics']['top1_accuracy']
+    top5_drop = fp32['metrics']['top5_accuracy'] - int8['metrics']['top5_accuracy']
+    promoted = top1_drop <= max_drop and top5_drop <= max_drop
+
+    if promoted:
+        candidate_path.replace(output_path)
+
+    report = {
+        'fp32_model': str(fp32_path),
+        'int8_model': str(output_path if promoted else candidate_path),
+        'split': split,
+        'num_calibration_images': len(calibration_images),
+        'fp32_size_mb': round(Path(fp32_path).stat().st_size / 1e6, 2),
+        'int8_size_mb': round(Path(output_path if promoted else candidate_path).stat().st_size / 1e6, 2),
+        'fp32': fp32['metrics'],
+        'int8': int8['metrics'],
+        'top1_drop': round(top1_drop, 4),
+        'top5_drop': round(top5_drop, 4),
+        'max_drop': max_drop,
+        'promoted': promoted,
+    }
+    with open(output_path.with_suffix('.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    return report
+
+
+def print_quantization_report(report: Dict):
+    """양자화 결과 출력"""
+    print("\n" + "=" * 60)
+    print("INT8 양자화 결과")
+    print("=" * 60)
+    print(f"FP32: Top-1 {report['fp32']['top1_accuracy']:.2%}, Top-5 {report['fp32']['top5_accuracy']:.2%}"
+          f" ({report['fp32_size_mb']} MB)")
+    print(f"INT8: Top-1 {report['int8']['top1_accuracy']:.2%}, Top-5 {report['int8']['top5_accuracy']:.2%}"
+          f" ({report['int8_size_mb']} MB)")
+    print(f"하락폭: Top-1 {report['top1_drop']:.2%}, Top-5 {report['top5_drop']:.2%}"
+          f" (허용: {report['max_drop']:.2%})")
+    if report['promoted']:
+        print(f"\n승격 완료: {report['int8_model']}")
+        print(f"서버 적용: MODEL_PATH={report['int8_model']}")
+    else:
+        print(f"\n승격 거부: 정확도 하락이 허용 범위를 초과했습니다. 후보 모델: {report['int8_model']}")
+    print("=" * 60)
+
+
+def print_parity_report(report: Dict):
+    """검증 결과 출력"""
+    status = "통과" if report['passed'] else "실패"
+    print(f"\n[{status}] {report['candidate']}")
+    print(f"  기준 모델: {report['reference']}")
+    print(f"  샘플 수: {report['num_samples']}, 클래스 수: {report['num_classes']}")
+    print(f"  최대 절대 오차: {report['max_abs_diff']:.6f}")
+    print(f"  Top-1 일치율: {report['top1_agreement']:.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='모델 내보내기 및 검증 도구')
+    subparsers = parser.add_subparsers(dest='command', help='명령어')
+
+    # export 명령어
+    export_parser = subparsers.add_parser('export', help='.pt → ONNX / OpenVINO 내보내기')
+    export_parser.add_argument('--weights', type=str, default=DEFAULT_WEIGHTS,
+                               help=f'학습된 모델 경로 (기본: {DEFAULT_WEIGHTS})')
+    export_parser.add_argument('--formats', type=str, nargs='+', default=list(EXPORT_FORMATS),
+                               choices=EXPORT_FORMATS,
+                               help='내보낼 형식 (기본: onnx openvino)')
+    export_parser.add_argument('--imgsz', type=int, default=224,
+                               help='입력 이미지 크기 (기본: 224)')
+    export_parser.add_argument('--check-images', type=str, default=None,
+                               help='수치 검증에 사용할 이미지 디렉토리 (없으면 난수 이미지)')
+    export_parser.add_argument('--num-samples', type=int, default=32,
+                               help='검증 샘플 수 (기본: 32)')
+    export_parser.add_argument('--atol', type=float, default=1e-3,
+                               help='허용 최대 절대 오차 (기본: 0.001)')
+    export_parser.add_argument('--output', type=str, default=None,
+                               help='검증 결과 저장 경로 (JSON)')
+
+    # check 명령어
+    check_parser = subparsers.add_parser('check', help='두 모델의 수치 일치 여부 검증')
+    check_parser.add_argument('--reference', type=str, default=DEFAULT_WEIGHTS,
+                              help='기준 모델 경로')
+    check_parser.add_argument('--candidate', type=str, required=True,
+                              help='비교할 모델 경로')
+    check_parser.add_argument('--images', type=str, default=None,
+                              help='검증 이미지 디렉토리 (없으면 난수 이미지)')
+    check_parser.add_argument('--num-samples', type=int, default=32,
+                              help='검증 샘플 수 (기본: 32)')
+    check_parser.add_argument('--atol', type=float, default=1e-3,
+                              help='허용 최대 절대 오차 (기본: 0.001)')
+
+    # quantize 명령어
+    quantize_parser = subparsers.add_parser('quantize', help='INT8 정적 양자화 + 정확도 게이트')
+    quantize_parser.add_argument('--model', type=str, default=DEFAULT_WEIGHTS,
+                                 help='FP32 모델 경로 (.pt / .onnx)')
+    quantize_parser.add_argument('--data', type=str, required=True,
+                                 help='데이터셋 경로 (train: 보정, val: 평가)')
+    quantize_parser.add_argument('--output', type=str, default=None,
+                                 help='INT8 모델 경로 (기본: <모델명>_int8.onnx)')
+    quantize_parser.add_argument('--num-calibration', type=int, default=256,
+                                 help='보정 이미지 수 (기본: 256)')
+    quantize_parser.add_argument('--max-drop', type=float, default=0.01,
+                                 help='허용 정확도 하락폭 (기본: 0.01 = 1%%p)')
+    quantize_parser.add_argument('--split', type=str, default='val',
+                                 choices=['train', 'val'],
+                                 help='평가 데이터 분할 (기본: val)')
+    quantize_parser.add_argument('--calibrate-method', type=str, default='minmax',
+                                 choices=['minmax', 'entropy', 'percentile'],
+                                 help='보정 방식 (기본: minmax)')
+    quantize_parser.add_argument('--per-tensor', action='store_true',
+                                 help='채널별 대신 텐서 단위 가중치 양자화')
+    quantize_parser.add_argument('--imgsz', type=int, default=224,
+                                 help='입력 이미지 크기 (기본: 224)')
+
+    # register 명령어
+    register_parser = subparsers.add_parser('register', help='모델 레지스트리에 새 버전 등록')
+    register_parser.add_argument('--weights', type=str, default=DEFAULT_WEIGHTS,
+                                 help='등록할 모델 경로 (.pt / .onnx / .xml / *_openvino_model)')
+    register_parser.add_argument('--registry', type=str, default='models',
+                                 help='레지스트리 디렉토리 (기본: models, API 서버의 MODEL_REGISTRY_DIR)')
+    register_parser.add_argument('--version', type=str, default=None,
+                                 help='버전 이름 (기본: 등록 시각)')
+    register_parser.add_argument('--activate', action='store_true',
+                                 help='등록 후 활성 버전으로 지정')
+
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        exported = export_model(args.weights, args.formats, args.imgsz)
+        reports = []
+        for fmt, path in exported.items():
+            report = check_parity(args.weights, path, args.check_images, args.num_samples, args.atol)
+            print_parity_report(report)
+            reports.append(report)
+
+        if args.output:
+            output_path = Path(args.output)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(reports, f, ensure_ascii=False, indent=2)
+            print(f"\n결과 저장: {output_path}")
+
+        if not all(r['passed'] for r in reports):
+            raise SystemExit(1)
+
+    elif args.command == 'check':
+        report = check_parity(args.reference, args.candidate, args.images, args.num_samples, args.atol)
+        print_parity_report(report)
+        if not report['passed']:
+            raise SystemExit(1)
+
+    elif args.command == 'quantize':
+        report = quantize_with_gate(
+            model=args.model,
+            data=args.data,
+            output=args.output,
+            num_calibration=args.num_calibration,
+            max_drop=args.max_drop,
+            split=args.split,
+            per_channel=not args.per_tensor,
+            calibrate_method=args.calibrate_method,
+            imgsz=args.imgsz
+        )
+        print_quantization_report(report)
+        if not report['promoted']:
+            raise SystemExit(1)
+
+    elif args.command == 'register':
+        registry = ModelRegistry(args.registry)
+        version = registry.register(args.weights, args.version, activate=args.activate)
+        print(f"등록 완료: {version} → {registry.resolve(version)}")
+        if args.activate:
+            print(f"활성 버전: {version} (API 서버는 MODEL_REGISTRY_POLL_S 이내에 교체)")
+
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
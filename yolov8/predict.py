@@ -5,17 +5,26 @@
 지원 기능:
 - 단일 이미지 분류
 - 다중 이미지 종합 판단 (여러 방향 사진을 종합하여 최종 판단)
+- 메타데이터 기반 국소별 일괄 종합 판단
+- 대용량 디렉토리 스트리밍 추론 (JSONL 결과, 이어하기 지원)
 """
 
 import os
 import shutil
+import csv
 import json
+import time
+import queue
 import argparse
+import threading
+import cv2
 import numpy as np
 from pathlib import Path
-from typing import List, Dict, Union, Tuple
-from collections import defaultdict
-from ultralytics import YOLO
+from typing import List, Dict, Union, Tuple, Iterable, Iterator, Optional, Set
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from backends import BACKENDS, InferenceBackend, load_backend, prepare_image, to_tensor
 
 
 # 클래스 한글 매핑 (9개 클래스)
@@ -44,31 +53,65 @@ SHORT_NAMES = {
     '프레임': '프레임'
 }
 
+# 지원 이미지 확장자
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
 
-def load_model(model_path: str) -> YOLO:
-    """학습된 모델 로드"""
+def load_model(model_path: str, backend: str = 'auto') -> InferenceBackend:
+    """학습된 모델 로드 (.pt / .onnx / .xml)"""
     if not Path(model_path).exists():
         raise FileNotFoundError(f"모델 파일을 찾을 수 없습니다: {model_path}")
-    return YOLO(model_path)
+    return load_backend(model_path, backend)
 
 
-def predict_single_with_probs(model: YOLO, image_path: str) -> Tuple[Dict, np.ndarray]:
+def predict_single_with_probs(model: InferenceBackend, image_path: str) -> Tuple[Dict, np.ndarray]:
     """
     단일 이미지 추론 + 전체 클래스 확률값 반환
     종합 판단에 사용
     """
-    results = model(image_path, verbose=False)
-    result = results[0]
+    all_probs = model.predict(load_images([image_path]))[0]  # 전체 클래스 확률값
+    return model.names, all_probs
+
+
+def load_images(image_paths: List[str], workers: int = 8) -> List[np.ndarray]:
+    """이미지 병렬 디코딩 (BGR 배열 리스트 반환)"""
+    def _read(path):
+        image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"이미지를 읽을 수 없습니다: {path}")
+        return image
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(image_paths)))) as pool:
+        return list(pool.map(_read, image_paths))
+
+
+def predict_probs_batch(model: InferenceBackend, images: List[np.ndarray]) -> Tuple[Dict, np.ndarray]:
+    """
+    여러 이미지를 한 번의 배치로 추론
+    전체 클래스 확률 행렬 [N, C] 반환
+    """
+    return model.names, model.predict(images)
 
-    probs = result.probs
-    all_probs = probs.data.cpu().numpy()  # 전체 클래스 확률값
-    class_names = result.names
 
-    return class_names, all_probs
+def combine_probs(probs_array: np.ndarray, method: str = 'mean') -> np.ndarray:
+    """이미지별 확률값 [N, C]를 종합 방식에 따라 하나의 확률 벡터로 결합"""
+    if method == 'mean':
+        # 평균 확률
+        return np.mean(probs_array, axis=0)
+    elif method == 'max':
+        # 최대 확률
+        return np.max(probs_array, axis=0)
+    elif method == 'vote':
+        # 투표 방식 (각 이미지에서 1위인 클래스에 투표)
+        votes = np.zeros(probs_array.shape[1])
+        for probs in probs_array:
+            votes[np.argmax(probs)] += 1
+        return votes / len(probs_array)
+    return np.mean(probs_array, axis=0)
 
 
 def ensemble_predict(
-    model: YOLO,
+    model: InferenceBackend,
     image_paths: List[str],
     method: str = 'mean',
     conf_threshold: float = 0.5
@@ -77,7 +120,7 @@ def ensemble_predict(
     여러 이미지를 종합하여 최종 판단
 
     Args:
-        model: YOLO 모델
+        model: 추론 백엔드
         image_paths: 이미지 경로 리스트 (같은 국소의 여러 방향 사진)
         method: 종합 방식 ('mean': 평균, 'max': 최대값, 'vote': 투표)
         conf_threshold: 신뢰도 임계값
@@ -88,44 +131,36 @@ def ensemble_predict(
     if not image_paths:
         raise ValueError("이미지가 없습니다.")
 
-    all_probs_list = []
-    individual_predictions = []
-    class_names = None
+    # 이미지 병렬 디코딩 후 한 번의 배치로 추론
+    images = load_images(image_paths)
+    class_names, probs_array = predict_probs_batch(model, images)
+
+    return build_ensemble_result(image_paths, probs_array, class_names, method, conf_threshold)
 
-    # 각 이미지별 예측 및 확률값 수집
-    for img_path in image_paths:
-        names, probs = predict_single_with_probs(model, img_path)
-        class_names = names
-        all_probs_list.append(probs)
 
-        # 개별 예측 결과도 저장
-        top1_idx = np.argmax(probs)
+def build_ensemble_result(
+    image_paths: List[str],
+    probs_array: np.ndarray,
+    class_names: Dict,
+    method: str = 'mean',
+    conf_threshold: float = 0.5
+) -> Dict:
+    """이미지별 확률값 [N, C] → 종합 판단 결과"""
+    # 개별 예측 결과도 저장
+    individual_predictions = []
+    for img_path, probs in zip(image_paths, probs_array):
+        top1_idx = int(np.argmax(probs))
         individual_predictions.append({
             'image_path': str(img_path),
-            'prediction': names[top1_idx],
+            'prediction': class_names[top1_idx],
             'confidence': float(probs[top1_idx])
         })
 
     # 확률값 종합
-    probs_array = np.array(all_probs_list)
-
-    if method == 'mean':
-        # 평균 확률
-        ensemble_probs = np.mean(probs_array, axis=0)
-    elif method == 'max':
-        # 최대 확률
-        ensemble_probs = np.max(probs_array, axis=0)
-    elif method == 'vote':
-        # 투표 방식 (각 이미지에서 1위인 클래스에 투표)
-        votes = np.zeros(len(class_names))
-        for probs in probs_array:
-            votes[np.argmax(probs)] += 1
-        ensemble_probs = votes / len(probs_array)
-    else:
-        ensemble_probs = np.mean(probs_array, axis=0)
+    ensemble_probs = combine_probs(probs_array, method)
 
     # 최종 결과
-    final_idx = np.argmax(ensemble_probs)
+    final_idx = int(np.argmax(ensemble_probs))
     final_class = class_names[final_idx]
     final_class_kr = CLASS_NAMES_KR.get(final_class, final_class)
     final_conf = float(ensemble_probs[final_idx])
@@ -158,24 +193,21 @@ def ensemble_predict(
     return result
 
 
-def predict_single(model: YOLO, image_path: str, conf_threshold: float = 0.5) -> Dict:
-    """단일 이미지 추론"""
-    results = model(image_path, verbose=False)
-    result = results[0]
-
-    # 분류 결과 추출
-    probs = result.probs
-    top1_idx = probs.top1
-    top1_conf = probs.top1conf.item()
-    top5_indices = probs.top5
-    top5_confs = probs.top5conf.tolist()
-
-    # 클래스 이름 가져오기
-    class_names = result.names
+def format_prediction(
+    image_path: str,
+    probs: np.ndarray,
+    class_names: Dict,
+    conf_threshold: float = 0.5
+) -> Dict:
+    """확률 벡터 → 개별 예측 결과"""
+    top1_idx = int(np.argmax(probs))
+    top1_conf = float(probs[top1_idx])
+    top5_indices = np.argsort(probs)[::-1][:5]
+
     top1_class = class_names[top1_idx]
     top1_class_kr = CLASS_NAMES_KR.get(top1_class, top1_class)
 
-    prediction = {
+    return {
         'image_path': str(image_path),
         'prediction': {
             'class': top1_class,
@@ -184,84 +216,455 @@ def predict_single(model: YOLO, image_path: str, conf_threshold: float = 0.5) ->
         },
         'top5': [
             {
-                'class': class_names[idx],
-                'class_kr': CLASS_NAMES_KR.get(class_names[idx], class_names[idx]),
-                'confidence': round(conf, 4)
+                'class': class_names[int(idx)],
+                'class_kr': CLASS_NAMES_KR.get(class_names[int(idx)], class_names[int(idx)]),
+                'confidence': round(float(probs[idx]), 4)
             }
-            for idx, conf in zip(top5_indices, top5_confs)
+            for idx in top5_indices
         ],
         'is_confident': top1_conf >= conf_threshold
     }
 
-    return prediction
+
+def predict_single(model: InferenceBackend, image_path: str, conf_threshold: float = 0.5) -> Dict:
+    """단일 이미지 추론"""
+    class_names, all_probs = predict_single_with_probs(model, image_path)
+    return format_prediction(image_path, all_probs, class_names, conf_threshold)
 
 
 def predict_batch(
-    model: YOLO,
-    image_paths: List[str],
+    model: InferenceBackend,
+    image_paths: Iterable[str],
     conf_threshold: float = 0.5,
-    batch_size: int = 16
+    batch_size: int = 16,
+    workers: int = 8
 ) -> List[Dict]:
-    """배치 이미지 추론"""
+    """
+    배치 이미지 추론
+    디코딩/전처리는 DecodePipeline 워커가 추론과 병렬로 미리 수행
+    """
     predictions = []
+    pipeline = DecodePipeline(model.imgsz, batch_size, workers)
+
+    for batch_paths, tensor, failed in pipeline.batches(image_paths):
+        for img_path in failed:
+            print(f"  이미지를 읽을 수 없습니다: {img_path}")
+        if not batch_paths:
+            continue
+        probs_array = pipeline.predict(model, tensor)
+        for img_path, probs in zip(batch_paths, probs_array):
+            predictions.append(format_prediction(img_path, probs, model.names, conf_threshold))
+
+    print_pipeline_stats(pipeline.stats.report())
+    return predictions
 
-    for i in range(0, len(image_paths), batch_size):
-        batch_paths = image_paths[i:i + batch_size]
-        results = model(batch_paths, verbose=False)
-
-        for result, img_path in zip(results, batch_paths):
-            probs = result.probs
-            top1_idx = probs.top1
-            top1_conf = probs.top1conf.item()
-            top5_indices = probs.top5
-            top5_confs = probs.top5conf.tolist()
-
-            class_names = result.names
-            top1_class = class_names[top1_idx]
-            top1_class_kr = CLASS_NAMES_KR.get(top1_class, top1_class)
-
-            prediction = {
-                'image_path': str(img_path),
-                'prediction': {
-                    'class': top1_class,
-                    'class_kr': top1_class_kr,
-                    'confidence': round(top1_conf, 4)
-                },
-                'top5': [
-                    {
-                        'class': class_names[idx],
-                        'class_kr': CLASS_NAMES_KR.get(class_names[idx], class_names[idx]),
-                        'confidence': round(conf, 4)
-                    }
-                    for idx, conf in zip(top5_indices, top5_confs)
-                ],
-                'is_confident': top1_conf >= conf_threshold
-            }
-            predictions.append(prediction)
 
-    return predictions
+def iter_image_paths(
+    directory: str,
+    extensions: tuple = IMAGE_EXTENSIONS,
+    recursive: bool = True
+) -> Iterator[str]:
+    """
+    디렉토리를 한 번만 순회하며 이미지 경로를 순차 반환 (전체 목록을 만들지 않음)
+    확장자는 대소문자 구분 없이 비교, 디렉토리별 이름순
+    """
+    extensions = tuple(ext.lower() for ext in extensions)
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        with os.scandir(current) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.name.lower().endswith(extensions):
+                yield entry.path
+        if recursive:
+            stack.extend(reversed(subdirs))
+
+
+class PipelineStats:
+    """단계별 처리 시간/처리량 집계"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.decoded = 0            # 디코딩+전처리 완료 이미지 수
+        self.failed = 0             # 디코딩 실패 이미지 수
+        self.decode_s = 0.0         # 워커별 디코딩+전처리 시간 합계
+        self.inferred = 0           # 추론 완료 이미지 수
+        self.inference_s = 0.0      # 추론 시간 합계
+        self.wait_s = 0.0           # 추론 단계가 배치를 기다린 시간 (디코딩 병목 지표)
+        self.started = time.perf_counter()
+
+    def report(self) -> Dict:
+        wall = time.perf_counter() - self.started
+        decode_wall = self.decode_s / self.workers
+        return {
+            'images': self.inferred,
+            'failed': self.failed,
+            'wall_s': round(wall, 2),
+            'images_per_s': round(self.inferred / wall, 1) if wall > 0 else 0.0,
+            'decode_images_per_s': round(self.decoded / decode_wall, 1) if decode_wall > 0 else 0.0,
+            'inference_images_per_s': round(self.inferred / self.inference_s, 1) if self.inference_s > 0 else 0.0,
+            'inference_wait_s': round(self.wait_s, 2),
+        }
+
+
+class DecodePipeline:
+    """
+    디코딩/전처리 → 추론 생산자-소비자 파이프라인
+
+    - 디코더 워커 풀이 이미지를 읽고 모델 입력 크기(imgsz)로 리사이즈/크롭
+      (원본 해상도 이미지를 메모리에 쌓지 않음)
+    - 생산자 스레드가 결과를 입력 순서대로 모아 고정 크기 배치 [B, 3, H, W]를 만들고
+      bounded queue에 넣음 → 추론 중에도 다음 배치 디코딩이 계속 진행
+    - 큐 크기로 미리 준비하는 배치 수를 제한해 메모리 사용량 일정 유지
+    - 입력은 경로 또는 (태그, 경로) 튜플 (예: 국소ID 태그), 배치에는 입력 항목을 그대로 돌려줌
+    """
+
+    _DONE = object()
+
+    def __init__(self, imgsz: int, batch_size: int = 16, workers: int = 8, queue_batches: int = 4):
+        self.imgsz = imgsz
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        self.queue_batches = max(1, queue_batches)
+        self.stats = PipelineStats(self.workers)
+
+    def _decode(self, path) -> Tuple[Optional[np.ndarray], float]:
+        """워커: 디코딩 + 리사이즈/크롭 (uint8), 실패 시 None"""
+        start = time.perf_counter()
+        if isinstance(path, tuple):
+            path = path[-1]
+        image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        prepared = prepare_image(image, self.imgsz) if image is not None else None
+        return prepared, time.perf_counter() - start
+
+    def _put(self, q: queue.Queue, item, stop: threading.Event) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self, image_paths: Iterable[str], q: queue.Queue, stop: threading.Event):
+        batch_paths: List[str] = []
+        batch = np.empty((self.batch_size, 3, self.imgsz, self.imgsz), dtype=np.uint8)
+        failed: List[str] = []
+
+        def _emit() -> bool:
+            nonlocal batch_paths, failed
+            item = (batch_paths, to_tensor(batch[:len(batch_paths)]), failed)
+            batch_paths, failed = [], []
+            return self._put(q, item, stop)
+
+        try:
+            pending = deque()
+            prefetch = self.batch_size * 2
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='decode') as pool:
+                def _collect() -> bool:
+                    path, future = pending.popleft()
+                    prepared, elapsed = future.result()
+                    self.stats.decode_s += elapsed
+                    if prepared is None:
+                        self.stats.failed += 1
+                        failed.append(path)
+                        return True
+                    batch[len(batch_paths)] = prepared
+                    batch_paths.append(path)
+                    self.stats.decoded += 1
+                    return len(batch_paths) < self.batch_size or _emit()
+
+                for path in image_paths:
+                    if stop.is_set():
+                        return
+                    pending.append((path, pool.submit(self._decode, path)))
+                    if len(pending) >= prefetch and not _collect():
+                        return
+                while pending:
+                    if not _collect():
+                        return
+            if (batch_paths or failed) and not _emit():
+                return
+            self._put(q, self._DONE, stop)
+        except BaseException as e:
+            self._put(q, e, stop)
+
+    def batches(self, image_paths: Iterable[str]) -> Iterator[Tuple[List[str], np.ndarray, List[str]]]:
+        """
+        (배치 이미지 경로, [B, 3, H, W] float32 텐서, 디코딩 실패 경로) 를 입력 순서대로 반환
+        마지막 배치는 B가 batch_size보다 작을 수 있고, 실패만 남은 경우 B=0
+        """
+        q: queue.Queue = queue.Queue(maxsize=self.queue_batches)
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(image_paths, q, stop), daemon=True)
+        producer.start()
+        try:
+            while True:
+                start = time.perf_counter()
+                item = q.get()
+                self.stats.wait_s += time.perf_counter() - start
+                if item is self._DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            producer.join()
+
+    def predict(self, model: InferenceBackend, tensor: np.ndarray) -> np.ndarray:
+        """전처리된 배치 추론 (추론 단계 시간 집계)"""
+        start = time.perf_counter()
+        probs = model.predict_tensor(tensor)
+        self.stats.inference_s += time.perf_counter() - start
+        self.stats.inferred += len(tensor)
+        return probs
 
 
 def predict_directory(
-    model: YOLO,
+    model: InferenceBackend,
     directory: str,
     conf_threshold: float = 0.5,
-    extensions: tuple = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+    extensions: tuple = IMAGE_EXTENSIONS,
+    batch_size: int = 16,
+    workers: int = 8
 ) -> List[Dict]:
     """디렉토리 내 모든 이미지 추론"""
     dir_path = Path(directory)
     if not dir_path.is_dir():
         raise NotADirectoryError(f"디렉토리를 찾을 수 없습니다: {directory}")
 
-    image_paths = []
-    for ext in extensions:
-        image_paths.extend(dir_path.glob(f'**/*{ext}'))
-        image_paths.extend(dir_path.glob(f'**/*{ext.upper()}'))
-
-    image_paths = [str(p) for p in sorted(set(image_paths))]
+    image_paths = sorted(iter_image_paths(directory, extensions))
     print(f"발견된 이미지: {len(image_paths)}개")
 
-    return predict_batch(model, image_paths, conf_threshold)
+    return predict_batch(model, image_paths, conf_threshold, batch_size, workers)
+
+
+def load_completed_paths(jsonl_path: str) -> Set[str]:
+    """
+    JSONL 결과 파일에서 이미 처리한 이미지 경로 수집 (이어하기용)
+    중단으로 잘린 마지막 줄은 파일에서 잘라냄
+    """
+    path = Path(jsonl_path)
+    completed = set()
+    if not path.exists():
+        return completed
+
+    valid_size = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            completed.add(record['image_path'])
+            valid_size += len(line)
+
+    if valid_size < path.stat().st_size:
+        with open(path, 'r+b') as f:
+            f.truncate(valid_size)
+        print(f"잘린 마지막 결과를 제거했습니다: {jsonl_path}")
+
+    return completed
+
+
+def iter_jsonl(jsonl_path: str) -> Iterator[Dict]:
+    """JSONL 결과 파일을 한 줄씩 읽기"""
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def predict_directory_stream(
+    model: InferenceBackend,
+    directory: str,
+    output_path: str,
+    conf_threshold: float = 0.5,
+    batch_size: int = 16,
+    workers: int = 8,
+    resume: bool = False,
+    extensions: tuple = IMAGE_EXTENSIONS
+) -> Dict:
+    """
+    대용량 디렉토리 스트리밍 추론
+
+    - 디렉토리를 순차 탐색하고 DecodePipeline으로 디코딩/전처리를 추론과 병렬 수행
+    - 배치마다 결과를 JSONL에 한 줄씩 기록 (중단되어도 완료분은 보존)
+    - resume=True면 결과 파일에 이미 있는 이미지는 건너뜀
+    - 결과를 메모리에 모으지 않고 요약 통계만 유지
+
+    Returns:
+        요약 통계 (총 이미지, 신뢰도 충족 수, 클래스별 개수, 디코딩 실패 수, 건너뛴 수)
+    """
+    if not Path(directory).is_dir():
+        raise NotADirectoryError(f"디렉토리를 찾을 수 없습니다: {directory}")
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    completed = load_completed_paths(str(output_path)) if resume else set()
+    if completed:
+        print(f"이어하기: 이미 처리된 이미지 {len(completed)}개 건너뜀")
+
+    summary = {'total': 0, 'confident': 0, 'class_counts': defaultdict(int), 'failed': 0, 'skipped': 0}
+
+    def _pending_paths():
+        for path in iter_image_paths(directory, extensions):
+            if path in completed:
+                summary['skipped'] += 1
+                continue
+            yield path
+
+    pipeline = DecodePipeline(model.imgsz, batch_size, workers)
+    mode = 'a' if resume else 'w'
+    with open(output_path, mode, encoding='utf-8') as f:
+        for batch_paths, tensor, failed in pipeline.batches(_pending_paths()):
+            for img_path in failed:
+                # 디코딩 실패도 기록해 이어하기 시 다시 시도하지 않음
+                f.write(json.dumps({'image_path': img_path, 'error': '이미지를 읽을 수 없습니다'},
+                                   ensure_ascii=False) + '\n')
+                summary['failed'] += 1
+            if batch_paths:
+                probs_array = pipeline.predict(model, tensor)
+                for img_path, probs in zip(batch_paths, probs_array):
+                    pred = format_prediction(img_path, probs, model.names, conf_threshold)
+                    f.write(json.dumps(pred, ensure_ascii=False) + '\n')
+                    summary['total'] += 1
+                    summary['class_counts'][pred['prediction']['class_kr']] += 1
+                    if pred['is_confident']:
+                        summary['confident'] += 1
+            f.flush()
+            if batch_paths and summary['total'] % (batch_size * 50) == 0:
+                print(f"  처리: {summary['total']}개")
+
+    summary['class_counts'] = dict(summary['class_counts'])
+    summary['pipeline'] = pipeline.stats.report()
+    print(f"결과 저장: {output_path}")
+    return summary
+
+
+def load_station_groups(
+    metadata_path: str,
+    image_dir: str,
+    id_column: str = '국소ID',
+    image_column: str = '이미지경로'
+) -> Dict[str, List[str]]:
+    """
+    메타데이터(CSV/Excel)의 국소ID별 이미지 경로 목록
+    메타데이터에 처음 등장한 국소 순서를 유지
+    """
+    from utils.data_prepare import load_metadata
+
+    df = load_metadata(metadata_path, columns=[id_column, image_column], categorical=[id_column])
+    for col in (id_column, image_column):
+        if col not in df.columns:
+            raise ValueError(f"'{col}' 컬럼이 없습니다. 사용 가능한 컬럼: {list(df.columns)}")
+
+    df = df[[id_column, image_column]].dropna()
+    image_base = Path(image_dir)
+    groups: Dict[str, List[str]] = {}
+    for station_id, image_name in zip(df[id_column].astype(str), df[image_column].astype(str)):
+        groups.setdefault(station_id.strip(), []).append(str(image_base / image_name.strip()))
+    return groups
+
+
+STATION_CSV_COLUMNS = [
+    '국소ID', '이미지수', '실패수', '예측', '예측(한글)', '신뢰도', '신뢰도충족', '2순위(한글)', '2순위신뢰도', '오류'
+]
+
+
+def predict_stations(
+    model: InferenceBackend,
+    groups: Dict[str, List[str]],
+    output_path: str,
+    method: str = 'mean',
+    conf_threshold: float = 0.5,
+    batch_size: int = 16,
+    workers: int = 8
+) -> Dict:
+    """
+    국소별 종합 판단 일괄 처리
+
+    - 모든 국소의 이미지를 하나의 스트림으로 이어 붙여 국소 경계와 무관하게 고정 크기 배치로 추론
+    - 국소의 마지막 이미지까지 추론되면 즉시 종합 판단 후 CSV에 한 줄 기록
+    - 읽을 수 없는 이미지는 제외하고 종합, 모두 실패한 국소는 오류로 기록
+
+    Returns:
+        요약 통계 (국소 수, 신뢰도 충족 수, 클래스별 개수, 실패 국소 수)
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    summary = {'total': 0, 'confident': 0, 'class_counts': defaultdict(int), 'failed': 0}
+    station_ids = list(groups)
+    # 국소별 추론 결과 (경로, 확률) / 실패 수 / 남은 이미지 수
+    results: Dict[str, List[Tuple[str, np.ndarray]]] = {sid: [] for sid in station_ids}
+    failures = {sid: 0 for sid in station_ids}
+    remaining = {sid: len(groups[sid]) for sid in station_ids}
+    next_station = 0
+
+    def _write(writer, station_id):
+        done = results.pop(station_id)
+        row = {'국소ID': station_id, '이미지수': len(done), '실패수': failures.pop(station_id)}
+        if not done:
+            row['오류'] = '이미지를 읽을 수 없습니다'
+            summary['failed'] += 1
+        else:
+            paths = [p for p, _ in done]
+            probs_array = np.stack([probs for _, probs in done])
+            result = build_ensemble_result(paths, probs_array, model.names, method, conf_threshold)
+            final = result['final_prediction']
+            second = result['top5'][1] if len(result['top5']) > 1 else {}
+            row.update({
+                '예측': final['class'],
+                '예측(한글)': final['class_kr'],
+                '신뢰도': final['confidence'],
+                '신뢰도충족': result['is_confident'],
+                '2순위(한글)': second.get('class_kr', ''),
+                '2순위신뢰도': second.get('confidence', ''),
+            })
+            summary['total'] += 1
+            summary['class_counts'][final['class_kr']] += 1
+            if result['is_confident']:
+                summary['confident'] += 1
+        writer.writerow(row)
+
+    # 국소ID를 태그로 붙여 전체 이미지를 하나의 스트림으로 전달
+    tagged_paths = ((sid, path) for sid in station_ids for path in groups[sid])
+    pipeline = DecodePipeline(model.imgsz, batch_size, workers)
+
+    with open(output_path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=STATION_CSV_COLUMNS)
+        writer.writeheader()
+
+        for batch_items, tensor, failed in pipeline.batches(tagged_paths):
+            if batch_items:
+                probs_array = pipeline.predict(model, tensor)
+                for (sid, path), probs in zip(batch_items, probs_array):
+                    results[sid].append((path, probs))
+                    remaining[sid] -= 1
+            for sid, path in failed:
+                print(f"  이미지를 읽을 수 없습니다: {path}")
+                failures[sid] += 1
+                remaining[sid] -= 1
+
+            # 파이프라인이 입력 순서를 유지하므로 국소도 메타데이터 순서대로 완료됨
+            while next_station < len(station_ids) and remaining[station_ids[next_station]] == 0:
+                _write(writer, station_ids[next_station])
+                next_station += 1
+            f.flush()
+
+    summary['class_counts'] = dict(summary['class_counts'])
+    summary['pipeline'] = pipeline.stats.report()
+    print(f"결과 저장: {output_path}")
+    return summary
 
 
 def save_results(predictions: List[Dict], output_path: str):
@@ -331,13 +734,62 @@ def print_summary(predictions: List[Dict]):
         if pred['is_confident']:
             confident_count += 1
 
-    print(f"\n총 이미지: {len(predictions)}개")
-    print(f"신뢰도 기준 충족: {confident_count}개 ({confident_count/len(predictions)*100:.1f}%)")
+    _print_counts(len(predictions), confident_count, class_counts)
+    print("=" * 60)
+
+
+def _print_counts(total: int, confident_count: int, class_counts: Dict[str, int]):
+    print(f"\n총 이미지: {total}개")
+    print(f"신뢰도 기준 충족: {confident_count}개 ({confident_count/total*100:.1f}%)")
     print("\n클래스별 분포:")
     for cls, count in sorted(class_counts.items(), key=lambda x: -x[1]):
-        print(f"  - {cls}: {count}개 ({count/len(predictions)*100:.1f}%)")
+        print(f"  - {cls}: {count}개 ({count/total*100:.1f}%)")
+
+
+def print_stream_summary(summary: Dict):
+    """스트리밍 추론 요약 출력"""
+    print("\n" + "=" * 60)
+    print("추론 결과 요약 (이번 실행분)")
+    print("=" * 60)
+
+    if summary['skipped']:
+        print(f"\n이어하기로 건너뛴 이미지: {summary['skipped']}개")
+    if summary['failed']:
+        print(f"디코딩 실패: {summary['failed']}개")
+
+    if summary['total']:
+        _print_counts(summary['total'], summary['confident'], summary['class_counts'])
+    else:
+        print("\n새로 추론한 이미지가 없습니다.")
+
+    print("=" * 60)
+    print_pipeline_stats(summary['pipeline'])
+
+
+def print_station_summary(summary: Dict):
+    """국소별 종합 판단 요약 출력"""
+    print("\n" + "=" * 60)
+    print("국소별 종합 판단 결과 요약")
+    print("=" * 60)
+
+    if summary['failed']:
+        print(f"\n이미지를 읽지 못한 국소: {summary['failed']}개")
+
+    if summary['total']:
+        _print_counts(summary['total'], summary['confident'], summary['class_counts'])
+    else:
+        print("\n판단한 국소가 없습니다.")
 
     print("=" * 60)
+    print_pipeline_stats(summary['pipeline'])
+
+
+def print_pipeline_stats(stats: Dict):
+    """파이프라인 단계별 처리량 출력"""
+    print(f"\n처리량: 전체 {stats['images_per_s']} img/s "
+          f"(디코딩+전처리 {stats['decode_images_per_s']} img/s, "
+          f"추론 {stats['inference_images_per_s']} img/s, "
+          f"추론 대기 {stats['inference_wait_s']}s)")
 
 
 def print_ensemble_result(result: Dict):
@@ -382,10 +834,19 @@ def main():
 
   # 종합 판단 + 파일명 변경
   python predict.py --model best.pt --source images/ --ensemble --rename
+
+  # 메타데이터의 국소ID별 일괄 종합 판단 (국소당 CSV 한 줄)
+  python predict.py --model best.pt --source images/ --ensemble --metadata metadata.csv --output results/stations.csv
+
+  # 대용량 디렉토리 스트리밍 추론 (JSONL, 중단 후 --resume으로 이어하기)
+  python predict.py --model best.pt --source archive/ --stream --output results/predictions.jsonl --resume
         """
     )
     parser.add_argument('--model', type=str, required=True,
-                        help='학습된 모델 경로')
+                        help='학습된 모델 경로 (.pt / .onnx / .xml)')
+    parser.add_argument('--backend', type=str, default='auto',
+                        choices=['auto', *BACKENDS],
+                        help='추론 백엔드 (기본: auto, 모델 확장자로 결정)')
     parser.add_argument('--source', type=str, required=True,
                         help='입력 이미지 또는 디렉토리 경로')
     parser.add_argument('--output', type=str, default='results/predictions.json',
@@ -401,26 +862,56 @@ def main():
     parser.add_argument('--ensemble-method', type=str, default='mean',
                         choices=['mean', 'max', 'vote'],
                         help='종합 판단 방식: mean(평균), max(최대), vote(투표) (기본: mean)')
+    parser.add_argument('--metadata', type=str, default=None,
+                        help='종합 판단 모드에서 국소ID별로 묶을 메타데이터 (CSV/Excel), --source는 이미지 디렉토리')
+    parser.add_argument('--id-col', type=str, default='국소ID',
+                        help='ID 컬럼명 (기본: 국소ID)')
+    parser.add_argument('--image-col', type=str, default='이미지경로',
+                        help='이미지경로 컬럼명 (기본: 이미지경로)')
+    parser.add_argument('--stream', action='store_true',
+                        help='디렉토리 스트리밍 추론 (결과를 JSONL로 순차 기록)')
+    parser.add_argument('--resume', action='store_true',
+                        help='스트리밍 모드에서 결과 파일에 있는 이미지는 건너뜀')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='이미지 디코딩 워커 수 (기본: 8)')
 
     args = parser.parse_args()
 
     # 모델 로드
     print(f"모델 로드 중: {args.model}")
-    model = load_model(args.model)
+    model = load_model(args.model, args.backend)
 
     # 추론 실행
     source_path = Path(args.source)
 
+    # 국소별 일괄 종합 판단 모드
+    if args.ensemble and args.metadata:
+        if not source_path.is_dir():
+            raise ValueError("국소별 종합 판단 모드는 이미지 디렉토리를 입력해야 합니다.")
+
+        output = args.output
+        if Path(output).suffix.lower() != '.csv':
+            output = str(Path(output).with_suffix('.csv'))
+
+        groups = load_station_groups(args.metadata, args.source, args.id_col, args.image_col)
+        num_images = sum(len(paths) for paths in groups.values())
+        print(f"\n국소별 종합 판단: 국소 {len(groups)}개, 이미지 {num_images}장")
+        summary = predict_stations(
+            model,
+            groups,
+            output,
+            method=args.ensemble_method,
+            conf_threshold=args.conf,
+            batch_size=args.batch_size,
+            workers=args.workers
+        )
+        print_station_summary(summary)
+
     # 종합 판단 모드
-    if args.ensemble:
+    elif args.ensemble:
         if source_path.is_dir():
             # 디렉토리 내 모든 이미지를 종합 판단
-            extensions = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
-            image_paths = []
-            for ext in extensions:
-                image_paths.extend(source_path.glob(f'*{ext}'))
-                image_paths.extend(source_path.glob(f'*{ext.upper()}'))
-            image_paths = sorted(set(image_paths))
+            image_paths = sorted(iter_image_paths(args.source, recursive=False))
 
             if not image_paths:
                 raise ValueError(f"디렉토리에 이미지가 없습니다: {args.source}")
@@ -454,6 +945,32 @@ def main():
         else:
             raise ValueError("종합 판단 모드는 디렉토리를 입력해야 합니다.")
 
+    # 스트리밍 모드
+    elif args.stream:
+        if not source_path.is_dir():
+            raise ValueError("스트리밍 모드는 디렉토리를 입력해야 합니다.")
+
+        output = args.output
+        if Path(output).suffix.lower() == '.json':
+            output = str(Path(output).with_suffix('.jsonl'))
+
+        print(f"스트리밍 추론: {args.source}")
+        summary = predict_directory_stream(
+            model,
+            args.source,
+            output,
+            conf_threshold=args.conf,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            resume=args.resume
+        )
+        print_stream_summary(summary)
+
+        if args.rename:
+            print("\n파일명 변경 중...")
+            rename_files_by_prediction(r for r in iter_jsonl(output) if 'prediction' in r)
+            print("파일명 변경 완료!")
+
     # 개별 판단 모드
     else:
         if source_path.is_file():
@@ -461,7 +978,9 @@ def main():
             predictions = [predict_single(model, args.source, args.conf)]
         elif source_path.is_dir():
             print(f"디렉토리 추론: {args.source}")
-            predictions = predict_directory(model, args.source, args.conf)
+            predictions = predict_directory(
+                model, args.source, args.conf, batch_size=args.batch_size, workers=args.workers
+            )
         else:
             raise ValueError(f"유효하지 않은 경로: {args.source}")
 
@@ -0,0 +1,141 @@
+"""
+모델 레지스트리
+버전별 디렉토리에 모델을 보관하고 활성 버전을 ACTIVE 파일로 관리
+
+구조:
+models/
+├── ACTIVE                  # 활성 버전 이름 (한 줄)
+├── 20260301-0930/
+│   └── best.pt
+└── 20260315-1410/
+    └── best_int8.onnx
+
+- 버전 디렉토리에는 모델이 하나만 있어야 함 (.pt / .onnx / .xml / *_openvino_model)
+- 등록은 임시 디렉토리에 복사 후 rename 하므로 API 서버가 반쯤 복사된 모델을 보지 않음
+- ACTIVE 파일도 임시 파일 + rename 으로 원자적으로 교체
+"""
+
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from backends import detect_backend
+
+ACTIVE_FILE = 'ACTIVE'
+MODEL_SUFFIXES = ('.pt', '.onnx', '.xml')
+
+
+def _model_candidates(version_dir: Path) -> List[Path]:
+    candidates = []
+    for entry in sorted(version_dir.iterdir()):
+        if entry.is_dir() and entry.name.endswith('_openvino_model'):
+            candidates.append(entry)
+        elif entry.is_file() and entry.suffix.lower() in MODEL_SUFFIXES:
+            candidates.append(entry)
+    return candidates
+
+
+class ModelRegistry:
+    """버전별 모델 디렉토리 + 활성 버전 포인터"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _version_dir(self, version: str) -> Path:
+        if not version or version != Path(version).name or version.startswith('.'):
+            raise ValueError(f"잘못된 버전 이름: {version}")
+        return self.root / version
+
+    def resolve(self, version: str) -> Path:
+        """버전 이름 → 모델 경로"""
+        version_dir = self._version_dir(version)
+        if not version_dir.is_dir():
+            raise FileNotFoundError(f"등록되지 않은 버전: {version}")
+        candidates = _model_candidates(version_dir)
+        if len(candidates) != 1:
+            raise ValueError(
+                f"버전 디렉토리에는 모델이 하나만 있어야 합니다: {version_dir} ({len(candidates)}개)"
+            )
+        return candidates[0]
+
+    def list_versions(self) -> List[Dict]:
+        """등록된 버전 목록 (오래된 순)"""
+        if not self.root.is_dir():
+            return []
+        active = self.active_version()
+        versions = []
+        for version_dir in sorted(p for p in self.root.iterdir() if p.is_dir() and not p.name.startswith('.')):
+            try:
+                path = self.resolve(version_dir.name)
+            except (FileNotFoundError, ValueError):
+                continue
+            versions.append({
+                'version': version_dir.name,
+                'path': str(path),
+                'backend': detect_backend(str(path)),
+                'registered_at': datetime.fromtimestamp(version_dir.stat().st_mtime).isoformat(),
+                'active': version_dir.name == active,
+            })
+        return versions
+
+    def active_version(self) -> Optional[str]:
+        """ACTIVE 파일의 버전 이름 (없으면 None)"""
+        try:
+            version = (self.root / ACTIVE_FILE).read_text(encoding='utf-8').strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def set_active(self, version: str):
+        """활성 버전 변경 (존재하는 버전만)"""
+        self.resolve(version)
+        tmp = self.root / f".{ACTIVE_FILE}.{uuid.uuid4().hex}"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(version + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.root / ACTIVE_FILE)
+
+    def register(self, source: str, version: Optional[str] = None, activate: bool = False) -> str:
+        """
+        모델을 새 버전으로 등록
+
+        Args:
+            source: 모델 파일 또는 *_openvino_model 디렉토리
+            version: 버전 이름 (기본: 등록 시각 YYYYmmdd-HHMMSS)
+            activate: 등록 후 활성 버전으로 지정
+        """
+        source = Path(source)
+        if not source.exists():
+            raise FileNotFoundError(f"모델을 찾을 수 없습니다: {source}")
+        detect_backend(str(source))
+
+        version = version or datetime.now().strftime('%Y%m%d-%H%M%S')
+        target = self._version_dir(version)
+        if target.exists():
+            raise FileExistsError(f"이미 등록된 버전: {version}")
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = self.root / f".staging-{uuid.uuid4().hex}"
+        staging.mkdir()
+        try:
+            if source.is_dir():
+                shutil.copytree(source, staging / source.name)
+            elif source.suffix.lower() == '.xml':
+                # OpenVINO IR: .xml + .bin + metadata.yaml
+                for file in (source, source.with_suffix('.bin'), source.parent / 'metadata.yaml'):
+                    if file.exists():
+                        shutil.copy2(file, staging / file.name)
+            else:
+                shutil.copy2(source, staging / source.name)
+            os.replace(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if activate:
+            self.set_active(version)
+        return version
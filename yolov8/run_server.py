@@ -1,8 +1,16 @@
 """
 API Server Runner
 Run this script to start the FastAPI server
+
+  python run_server.py                # development: single process with auto-reload
+  python run_server.py --workers 4    # production: gunicorn + uvicorn workers (Linux)
+
+Production mode preloads the model in the gunicorn master so forked workers share
+the weights copy-on-write, recycles workers after MAX_REQUESTS requests, and each
+worker only reports ready on /ready after its warm-up batch has run.
 """
 
+import argparse
 import uvicorn
 import os
 import sys
@@ -10,17 +18,84 @@ import sys
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+
+# Production (gunicorn) settings
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0"))  # 0 = development mode
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "2000"))  # recycle a worker after this many requests
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", "200"))  # so workers don't recycle together
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))  # seconds to finish in-flight requests
+WORKER_TIMEOUT = int(os.getenv("WORKER_TIMEOUT", "120"))  # kill a worker silent for this long
+
+
+def run_development(host: str, port: int):
+    uvicorn.run(
+        "api.main:app",
+        host=host,
+        port=port,
+        reload=True
+    )
+
+
+def run_production(host: str, port: int, workers: int):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        sys.exit("Production mode requires gunicorn (pip install gunicorn, Linux/macOS only)")
+
+    # Split CPU cores between workers unless TORCH_THREADS is set explicitly
+    os.environ.setdefault("TORCH_THREADS", str(max(1, (os.cpu_count() or 1) // workers)))
+
+    class ProductionServer(BaseApplication):
+        def __init__(self, options: dict):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Runs once in the master because of preload_app
+            from api.main import app, preload_model
+            try:
+                if preload_model():
+                    print("Model preloaded in master, shared with workers")
+            except Exception as e:
+                print(f"Warning: Could not preload model, workers will load it: {e}")
+            return app
+
+    ProductionServer({
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "max_requests": MAX_REQUESTS,
+        "max_requests_jitter": MAX_REQUESTS_JITTER,
+        "graceful_timeout": GRACEFUL_TIMEOUT,
+        "timeout": WORKER_TIMEOUT,
+    }).run()
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tower Classification API Server")
+    parser.add_argument("--host", type=str, default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY,
+                        help="Number of gunicorn workers (0 = development server with auto-reload)")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("Tower Classification API Server")
     print("=" * 60)
-    print("Starting server at http://localhost:8000")
-    print("API Documentation: http://localhost:8000/docs")
+    print(f"Starting server at http://localhost:{args.port}")
+    print(f"API Documentation: http://localhost:{args.port}/docs")
+    if args.workers > 0:
+        print(f"Production mode: {args.workers} workers, readiness at /ready")
     print("=" * 60)
 
-    uvicorn.run(
-        "api.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
-    )
+    if args.workers > 0:
+        run_production(args.host, args.port, args.workers)
+    else:
+        run_development(args.host, args.port)
@@ -0,0 +1,62 @@
+"""
+BatchScheduler executor swap tests
+Run from yolov8/: python -m pytest tests
+"""
+
+import asyncio
+
+import numpy as np
+
+from api.batching import BatchScheduler
+from api.executor import InferenceExecutor
+
+
+def _executor(version: str) -> InferenceExecutor:
+    def runner(images):
+        return np.ones((len(images), 3), dtype=np.float32) / 3, {0: "a", 1: "b", 2: "c"}, version, {}
+    return InferenceExecutor("thread", 1, runner, f"{version}.pt", 1)
+
+
+def _image() -> np.ndarray:
+    return np.zeros((8, 8, 3), dtype=np.uint8)
+
+
+def test_swap_while_idle_releases_old_executor():
+    async def scenario():
+        old, new = _executor("v1"), _executor("v2")
+        scheduler = BatchScheduler(old, max_batch_size=4, max_wait_ms=1)
+        await scheduler.start()
+        await asyncio.sleep(0.02)
+        # The idle loop holds a slot on the executor it is collecting for
+        assert old.in_flight == 1
+
+        new.start()
+        previous = scheduler.swap_executor(new)
+        await asyncio.wait_for(previous.drain(), 1.0)
+        previous.shutdown()
+
+        _, _, version = await asyncio.wait_for(scheduler.submit(_image()), 1.0)
+        await scheduler.stop()
+        return version
+
+    assert asyncio.run(scenario()) == "v2"
+
+
+def test_swap_while_collecting_runs_batch_on_new_executor():
+    async def scenario():
+        old, new = _executor("v1"), _executor("v2")
+        scheduler = BatchScheduler(old, max_batch_size=4, max_wait_ms=200)
+        await scheduler.start()
+        request = asyncio.ensure_future(scheduler.submit(_image()))
+        # The first job is taken; the loop is now waiting for the batch to fill
+        await asyncio.sleep(0.02)
+
+        new.start()
+        previous = scheduler.swap_executor(new)
+        _, _, version = await asyncio.wait_for(request, 1.0)
+        await asyncio.wait_for(previous.drain(), 1.0)
+        previous.shutdown()
+        await scheduler.stop()
+        return version
+
+    assert asyncio.run(scenario()) == "v2"
@@ -0,0 +1,121 @@
+"""
+Feedback S3 upload / ingest tests against moto's in-process S3
+Run from yolov8/: python -m pytest tests
+"""
+
+import asyncio
+import time
+
+import boto3
+import cv2
+import numpy as np
+import pytest
+from moto import mock_aws
+
+from api.storage import FeedbackSpool, SpoolFlusher, create_s3_client
+from utils.feedback_ingest import ingest_feedback
+
+BUCKET = "feedback-test"
+REGION = "us-east-1"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    for name, value in [("AWS_ACCESS_KEY_ID", "testing"), ("AWS_SECRET_ACCESS_KEY", "testing"),
+                        ("AWS_SESSION_TOKEN", "testing"), ("AWS_DEFAULT_REGION", REGION)]:
+        monkeypatch.setenv(name, value)
+    with mock_aws():
+        client = create_s3_client(REGION)
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+class FlakyClient:
+    """Fails the first `failures` put_object calls, then delegates to the real client"""
+
+    def __init__(self, client, failures: int):
+        self.client = client
+        self.failures = failures
+
+    def put_object(self, **kwargs):
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("simulated S3 outage")
+        return self.client.put_object(**kwargs)
+
+
+def _png(seed: int) -> bytes:
+    image = np.random.default_rng(seed).integers(0, 255, (32, 32, 3), dtype=np.uint8)
+    return cv2.imencode(".png", image)[1].tobytes()
+
+
+async def _until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+def test_flush_uploads_with_content_type_and_metadata_then_removes_item(s3, tmp_path):
+    spool = FeedbackSpool(tmp_path / "spool")
+    key = "feedback/steel_pipe/20260101_000000_a.png"
+    spool.append(key, b"image-bytes", "image/png", {"original_class": "simple_pole", "corrected_class": "steel_pipe"})
+
+    async def scenario():
+        flusher = SpoolFlusher(spool, lambda: s3, BUCKET, poll_s=0.05)
+        await flusher.start()
+        await _until(lambda: flusher.uploaded == 1)
+        await flusher.stop()
+
+    asyncio.run(scenario())
+    head = s3.head_object(Bucket=BUCKET, Key=key)
+    assert head["ContentType"] == "image/png"
+    assert head["Metadata"] == {"original-class": "simple_pole", "corrected-class": "steel_pipe"}
+    assert s3.get_object(Bucket=BUCKET, Key=key)["Body"].read() == b"image-bytes"
+    assert spool.list_ids() == []
+    assert list(spool.root.glob("*.bin")) == []
+
+
+def test_failed_put_is_kept_and_retried_with_backoff(s3, tmp_path):
+    spool = FeedbackSpool(tmp_path / "spool")
+    key = "feedback/indoor/20260101_000000_b.jpg"
+    item = spool.append(key, b"retry-me", "image/jpeg", {"corrected_class": "indoor"})
+    client = FlakyClient(s3, failures=1)
+
+    async def scenario():
+        flusher = SpoolFlusher(spool, lambda: client, BUCKET, poll_s=0.05, base_backoff_s=0.3)
+        await flusher.start()
+        await _until(lambda: flusher.failed_attempts == 1)
+        # Still spooled, with the retry scheduled in the future and persisted
+        assert spool.list_ids() == [item.id]
+        retry = spool.load(item.id)
+        assert retry.attempts == 1
+        assert retry.next_attempt_at > time.time()
+        assert "simulated S3 outage" in retry.last_error
+
+        await _until(lambda: flusher.uploaded == 1)
+        await flusher.stop()
+        return flusher.failed_attempts
+
+    assert asyncio.run(scenario()) == 1
+    assert s3.get_object(Bucket=BUCKET, Key=key)["Body"].read() == b"retry-me"
+    assert spool.list_ids() == []
+
+
+def test_ingest_skips_unchanged_objects_by_etag(s3, tmp_path):
+    keys = [f"feedback/steel_pipe/20260101_00000{i}_{i}.png" for i in range(3)]
+    for i, key in enumerate(keys):
+        s3.put_object(Bucket=BUCKET, Key=key, Body=_png(i), ContentType="image/png")
+    output = tmp_path / "data"
+
+    first = ingest_feedback(BUCKET, str(output), workers=2, region=REGION)
+    assert (first["listed"], first["added"], first["skipped"]) == (3, 3, 0)
+
+    second = ingest_feedback(BUCKET, str(output), workers=2, region=REGION)
+    assert (second["listed"], second["added"], second["skipped"]) == (3, 0, 3)
+
+    # A rewritten object has a new ETag and is fetched again
+    boto3.client("s3", region_name=REGION).put_object(Bucket=BUCKET, Key=keys[0], Body=_png(10))
+    third = ingest_feedback(BUCKET, str(output), workers=2, region=REGION)
+    assert (third["added"], third["skipped"]) == (1, 2)
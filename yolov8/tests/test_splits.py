@@ -0,0 +1,66 @@
+"""
+SplitEngine stability tests (rebuild with a saved split manifest)
+Run from yolov8/: python -m pytest tests
+"""
+
+import pandas as pd
+import pytest
+
+from utils.splits import SplitEngine, load_split_manifest, save_split_manifest
+
+CLASSES = ['simple_pole', 'steel_pipe', 'indoor']
+
+
+def _items(stations: range, per_station: int = 3, prefix: str = 'p') -> pd.DataFrame:
+    rows = []
+    for s in stations:
+        for i in range(per_station):
+            item = f"{prefix}{s}_{i}.jpg"
+            rows.append({'item': item, 'station': f"S{s}", 'group': f"station:S{s}",
+                         'class': CLASSES[(s + i) % len(CLASSES)], 'dest': f"x_{item}"})
+    return pd.DataFrame(rows)
+
+
+def _assert_groups_on_one_side(items: pd.DataFrame):
+    sides = items.groupby('group')['split'].nunique()
+    assert (sides == 1).all(), sides[sides > 1]
+
+
+@pytest.mark.parametrize('folds', [0, 5])
+def test_rebuild_keeps_assignments_and_new_rows_follow_their_group(tmp_path, folds):
+    engine = SplitEngine(train_ratio=0.8, folds=folds, val_fold=1, seed=7)
+    manifest_path = tmp_path / 'split_manifest.csv'
+
+    first = engine.assign(_items(range(30)), load_split_manifest(manifest_path))
+    _assert_groups_on_one_side(first)
+    assert set(first['split']) == {'train', 'val'}
+    save_split_manifest(first, manifest_path)
+
+    # New stations, plus a new photo of an existing station
+    joined = pd.DataFrame([{'item': 'late.jpg', 'station': 'S3', 'group': 'station:S3',
+                            'class': 'indoor', 'dest': 'x_late.jpg'}])
+    rebuilt_items = pd.concat([_items(range(30)), _items(range(30, 40), prefix='n'), joined], ignore_index=True)
+    second = engine.assign(rebuilt_items, load_split_manifest(manifest_path))
+
+    before = first.set_index('item')
+    after = second.set_index('item')
+    old = before.index
+    assert (after.loc[old, 'split'] == before['split']).all()
+    assert (after.loc[old, 'fold'] == before['fold']).all()
+    assert (after.loc[old, 'dest'] == before['dest']).all()
+
+    station = before[before['group'] == 'station:S3'].iloc[0]
+    assert after.loc['late.jpg', 'split'] == station['split']
+    assert after.loc['late.jpg', 'fold'] == station['fold']
+    _assert_groups_on_one_side(second)
+    if folds:
+        assert set(second['fold']) <= set(range(folds))
+
+
+def test_assignment_is_independent_of_row_order(tmp_path):
+    engine = SplitEngine(train_ratio=0.8, seed=7)
+    empty = load_split_manifest(tmp_path / 'split_manifest.csv')
+    items = _items(range(30))
+    forward = engine.assign(items, empty).set_index('item')['split'].sort_index()
+    backward = engine.assign(items.iloc[::-1].reset_index(drop=True), empty).set_index('item')['split'].sort_index()
+    assert forward.equals(backward)
@@ -0,0 +1,73 @@
+"""
+FeedbackSpool crash safety and SpoolFlusher leader election tests
+Run from yolov8/: python -m pytest tests
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+from api import storage
+from api.storage import FeedbackSpool, SpoolFlusher
+
+
+def _age(path, seconds: float):
+    old = time.time() - seconds
+    os.utime(path, (old, old))
+
+
+def test_committed_item_is_listed_and_loadable(tmp_path):
+    spool = FeedbackSpool(tmp_path)
+    item = spool.append("feedback/indoor/a.jpg", b"abc", "image/jpeg", {"corrected_class": "indoor"})
+
+    assert spool.list_ids() == [item.id]
+    loaded = spool.load(item.id)
+    assert (loaded.key, loaded.metadata) == ("feedback/indoor/a.jpg", {"corrected_class": "indoor"})
+    assert spool.read(loaded) == b"abc"
+    assert spool.stats()["depth"] == 1
+
+
+def test_cleanup_removes_orphan_bin_and_stale_tmp(tmp_path):
+    spool = FeedbackSpool(tmp_path)
+    item = spool.append("feedback/indoor/a.jpg", b"abc", "image/jpeg")
+    # A crash before the .json commit marker leaves a .bin with no .json, or a temp file
+    orphan = tmp_path / "00000000000000000001-deadbeef.bin"
+    orphan.write_bytes(b"half")
+    tmp = tmp_path / ".00000000000000000002-cafebabe.json.tmp"
+    tmp.write_bytes(b"{")
+    fresh_orphan = tmp_path / "00000000000000000003-feedface.bin"
+    fresh_orphan.write_bytes(b"being written")
+    for path in (orphan, tmp):
+        _age(path, 120)
+
+    assert orphan.name[:-4] not in spool.list_ids()
+    assert spool.cleanup(min_age_s=60) == 2
+    assert not orphan.exists() and not tmp.exists()
+    # Recent files may belong to an append in progress in another worker
+    assert fresh_orphan.exists()
+    assert spool.list_ids() == [item.id]
+    assert (tmp_path / f"{item.id}.bin").exists()
+
+
+@pytest.mark.skipif(storage.fcntl is None, reason="flock is not available")
+def test_only_one_flusher_leads_a_spool_directory(tmp_path):
+    async def scenario():
+        spool = FeedbackSpool(tmp_path)
+        first, second = (SpoolFlusher(spool, lambda: None, "bucket", poll_s=0.02) for _ in range(2))
+        await first.start()
+        await second.start()
+        await asyncio.sleep(0.1)
+        leaders = [first.leader, second.leader]
+
+        # The follower takes over once the leader stops and releases the lock
+        await first.stop()
+        await asyncio.sleep(0.1)
+        takeover = second.leader
+        await second.stop()
+        return leaders, takeover
+
+    leaders, takeover = asyncio.run(scenario())
+    assert leaders == [True, False]
+    assert takeover
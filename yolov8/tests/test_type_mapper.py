@@ -0,0 +1,52 @@
+"""
+TypeMapper priority rule tests
+Run from yolov8/: python -m pytest tests
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.data_prepare import TypeMapper
+
+
+def test_longest_contained_key_wins():
+    mapper = TypeMapper()
+    # '철탑(건물)' (tower_building) beats the shorter '철탑' (tower_ground)
+    assert mapper.lookup('철탑(건물) 옥상') == 'tower_building'
+    assert mapper.lookup('  철탑(건물)   옥상 ') == 'tower_building'
+
+
+def test_exact_match_beats_substring_and_is_not_ambiguous():
+    mapper = TypeMapper({'복합': 'complex_type', '강관 복합': 'steel_pipe', '철탑': 'tower_ground'})
+    assert mapper.lookup('강관 복합') == 'steel_pipe'
+    assert mapper.lookup('철탑') == 'tower_ground'
+    assert mapper.report()['ambiguous'] == {}
+
+
+def test_equal_length_keys_earliest_in_value_wins():
+    mapper = TypeMapper({'옥내': 'indoor', '강관': 'steel_pipe'})
+    assert mapper.lookup('강관 옥내') == 'steel_pipe'
+    assert mapper.lookup('옥내 강관') == 'indoor'
+
+
+def test_report_lists_unmapped_and_ambiguous_values():
+    mapper = TypeMapper()
+    mapper.map_series(pd.Series(['강관 철탑', '강관 철탑', '해상 부이', '철탑(건물) 옥상', '강관주']))
+    report = mapper.report()
+
+    assert report['unmapped'] == {'해상 부이': 1}
+    # '철탑' inside the matched '철탑(건물)' is not a competing candidate
+    assert report['ambiguous'] == {
+        '강관 철탑': {'class': 'steel_pipe', 'candidates': ['steel_pipe', 'tower_ground'], 'count': 2}
+    }
+
+
+def test_map_series_categorical_with_nan():
+    mapper = TypeMapper()
+    values = pd.Series(['강관', np.nan, '강관', '터널', np.nan], index=[10, 11, 12, 13, 14], dtype='category')
+    mapped = mapper.map_series(values)
+
+    assert list(mapped.index) == [10, 11, 12, 13, 14]
+    assert mapped.tolist() == ['steel_pipe', None, 'steel_pipe', 'indoor', None]
+    # Empty values are counted as one unmapped '' entry
+    assert mapper.report()['unmapped'] == {'': 2}
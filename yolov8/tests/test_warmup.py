@@ -0,0 +1,18 @@
+"""
+Warm-up batch size tests
+Run from yolov8/: python -m pytest tests
+"""
+
+from api.warmup import parse_batch_sizes
+
+
+def test_default_sizes_include_the_largest_single_job():
+    # A 10-image ensemble runs alone as one batch of 10, above BATCH_MAX_SIZE
+    assert parse_batch_sizes("", 8, 10) == [1, 2, 4, 8, 10]
+    assert parse_batch_sizes("", 8) == [1, 2, 4, 8]
+    assert parse_batch_sizes("", 16, 10) == [1, 2, 4, 8, 16]
+
+
+def test_explicit_sizes_are_capped_by_the_largest_possible_batch():
+    assert parse_batch_sizes("1, 9,12", 8, 10) == [1, 9]
+    assert parse_batch_sizes("4,8", 8) == [4, 8]
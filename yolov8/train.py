@@ -7,7 +7,15 @@ import os
 import yaml
 import argparse
 from pathlib import Path
+
+import cv2
+from PIL import Image
+from torch.utils.data import Dataset
 from ultralytics import YOLO
+from ultralytics.data.augment import classify_augmentations, classify_transforms
+from ultralytics.models.yolo.classify import ClassificationTrainer
+
+from utils.shards import ShardReader, is_shard_dataset, load_shard_meta
 
 
 def load_config(config_path: str) -> dict:
@@ -16,6 +24,57 @@ def load_config(config_path: str) -> dict:
         return yaml.safe_load(f)
 
 
+class ShardClassificationDataset(Dataset):
+    """
+    샤드(utils/shards.py)에서 바로 읽는 분류 데이터셋
+    ultralytics ClassificationDataset 과 같은 변환/출력 형식 ({'img', 'cls'})이며 이미지 디코딩이 없음
+    """
+
+    def __init__(self, root: str, args, augment: bool = False, prefix: str = ''):
+        self.reader = ShardReader(root)
+        self.prefix = prefix
+        if augment:
+            self.torch_transforms = classify_augmentations(
+                size=args.imgsz,
+                scale=(1.0 - args.scale, 1.0),
+                hflip=args.fliplr,
+                vflip=args.flipud,
+                erasing=args.erasing,
+                auto_augment=args.auto_augment,
+                hsv_h=args.hsv_h,
+                hsv_s=args.hsv_s,
+                hsv_v=args.hsv_v,
+            )
+        else:
+            crop = {'crop_fraction': args.crop_fraction} if hasattr(args, 'crop_fraction') else {}
+            self.torch_transforms = classify_transforms(size=args.imgsz, **crop)
+
+    def __len__(self):
+        return len(self.reader)
+
+    def __getitem__(self, i):
+        image = Image.fromarray(cv2.cvtColor(self.reader.image(i), cv2.COLOR_BGR2RGB))
+        return {'img': self.torch_transforms(image), 'cls': int(self.reader.index['label'][i])}
+
+
+class ShardClassificationTrainer(ClassificationTrainer):
+    """data 가 샤드 디렉토리일 때 사용하는 trainer (ultralytics 8.3 trainer API)"""
+
+    def get_dataset(self):
+        root = Path(self.args.data)
+        meta = load_shard_meta(root)
+        return {
+            'train': root / 'train',
+            'val': root / 'val',
+            'test': None,
+            'nc': len(meta['names']),
+            'names': dict(enumerate(meta['names'])),
+        }
+
+    def build_dataset(self, img_path, mode='train', batch=None):
+        return ShardClassificationDataset(img_path, args=self.args, augment=mode == 'train', prefix=mode)
+
+
 def train(args):
     """모델 학습 실행"""
 
@@ -24,7 +83,7 @@ def train(args):
     dataset_config = load_config(args.dataset)
 
     # 모델 초기화
-    model_name = config.get('model', 'yolov8n-cls.pt')
+    model_name = args.model or config.get('model', 'yolov8n-cls.pt')
     model = YOLO(model_name)
 
     print("=" * 50)
@@ -39,9 +98,16 @@ def train(args):
     # 데이터 경로 설정
     data_path = Path(args.data) if args.data else Path(dataset_config['path'])
 
+    # 샤드 디렉토리면 디코딩 없이 샤드에서 읽는 trainer 사용
+    trainer = None
+    if is_shard_dataset(str(data_path)):
+        trainer = ShardClassificationTrainer
+        print(f"샤드 데이터셋 사용: {data_path}")
+
     # 학습 실행
     results = model.train(
         data=str(data_path),
+        trainer=trainer,
         epochs=config.get('epochs', 100),
         batch=config.get('batch', 16),
         imgsz=config.get('imgsz', 224),
@@ -89,7 +155,9 @@ def main():
     parser.add_argument('--dataset', type=str, default='configs/dataset.yaml',
                         help='데이터셋 설정 파일 경로')
     parser.add_argument('--data', type=str, default=None,
-                        help='데이터 경로 (설정 파일 대신 직접 지정)')
+                        help='데이터 경로 (설정 파일 대신 직접 지정, 샤드 디렉토리도 가능)')
+    parser.add_argument('--model', type=str, default=None,
+                        help='초기 가중치 (설정 파일의 model 대신, 예: 기존 best.pt에서 이어서 학습)')
     parser.add_argument('--resume', type=str, default=None,
                         help='학습 재개할 체크포인트 경로')
 
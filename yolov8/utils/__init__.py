@@ -1,2 +1,2 @@
 # Utils package
-from .data_prepare import prepare_classification_dataset, load_metadata, map_type_to_class
+from .data_prepare import prepare_classification_dataset, load_metadata, map_type_to_class, TypeMapper
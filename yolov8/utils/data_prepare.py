@@ -4,14 +4,29 @@
 """
 
 import os
+import json
 import shutil
-import random
+import hashlib
 import argparse
+import re
+import threading
+import unicodedata
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Sequence
+import cv2
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 from tqdm import tqdm
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 
 # 형태 분류 매핑 (국소 형태정보 → 클래스명) - 9개 클래스
 # 실제 데이터에 맞게 수정 필요
@@ -56,23 +71,131 @@ TYPE_MAPPING = {
     '프레임': 'frame_mount',
 }
 
+# 클래스 목록 (configs/dataset.yaml 의 names 순서)
+CLASSES = [
+    'simple_pole',           # 간이폴, 분산폴 및 비기준 설치대
+    'steel_pipe',            # 강관주
+    'complex_type',          # 복합형
+    'indoor',                # 옥내, 터널, 지하 등
+    'single_pole_building',  # 원폴(건물)
+    'tower_building',        # 철탑(건물)
+    'tower_ground',          # 철탑(지면)
+    'telecom_pole',          # 통신주
+    'frame_mount',           # 프레임
+]
+
+
+METADATA_CHUNK_ROWS = 200_000
+# Excel 변환 캐시 위치 (원본 옆이 아니라 사용자 캐시 디렉토리, 원본 폴더가 읽기 전용 / 네트워크 드라이브여도 동작)
+METADATA_CACHE_DIR = os.getenv('METADATA_CACHE_DIR', str(Path.home() / '.cache' / 'tower-classification' / 'metadata'))
+
+
+def _strip_columns(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+
+def _read_csv_columns(path: Path, columns: Optional[Sequence[str]], categorical: Sequence[str],
+                      chunksize: int) -> pd.DataFrame:
+    """CSV 를 chunksize 행씩 읽어 필요한 컬럼만 모음 (범주형 컬럼은 청크마다 category 로 변환 후 합침)"""
+    usecols = (lambda c: str(c).strip() in columns) if columns else None
+    parts: Dict[str, List[pd.Series]] = {}
+    for chunk in pd.read_csv(path, encoding='utf-8', usecols=usecols, dtype=str, chunksize=chunksize):
+        for col, values in _strip_columns(chunk).items():
+            parts.setdefault(col, []).append(values.astype('category') if col in categorical else values)
+    if not parts:
+        return _strip_columns(pd.read_csv(path, encoding='utf-8', usecols=usecols, dtype=str, nrows=0))
+
+    return pd.DataFrame({
+        col: (pd.Series(union_categoricals(values, ignore_order=True)) if col in categorical
+              else pd.concat(values, ignore_index=True))
+        for col, values in parts.items()
+    })
+
+
+def _excel_cache_path(path: Path, cache_dir: Path) -> Tuple[Path, str]:
+    """
+    (Excel 변환 캐시 경로, 같은 원본의 캐시 파일 이름 접두어)
+    이름은 <파일명>-<원본 절대 경로 해시>-<크기>-<수정 시각>.parquet 이라 원본이 바뀌면 새 파일
+    """
+    resolved = path.resolve()
+    prefix = f"{path.stem}-{hashlib.sha1(str(resolved).encode('utf-8')).hexdigest()[:12]}-"
+    st = resolved.stat()
+    return cache_dir / f"{prefix}{st.st_size}-{st.st_mtime_ns}.parquet", prefix
+
 
-def load_metadata(metadata_path: str) -> pd.DataFrame:
+def _read_excel_columns(path: Path, columns: Optional[Sequence[str]], cache_dir: Path) -> pd.DataFrame:
+    """
+    Excel 전체 시트를 한 번만 읽어 cache_dir 에 Parquet 캐시로 저장하고, 이후에는 캐시에서 필요한 컬럼만 읽음
+    pyarrow 가 없거나 캐시를 쓸 수 없으면 매번 Excel 을 직접 읽음
+    """
+    sidecar, prefix = _excel_cache_path(path, cache_dir)
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        pq = None
+
+    if pq is not None and sidecar.exists():
+        available = pq.read_schema(sidecar).names
+        print(f"Excel 캐시 사용: {sidecar.name}")
+        return pd.read_parquet(sidecar, columns=[c for c in columns if c in available] if columns else None)
+
+    sheets = pd.read_excel(path, sheet_name=None, dtype=str)
+    df = pd.concat([_strip_columns(sheet) for sheet in sheets.values() if not sheet.empty], ignore_index=True)
+    print(f"Excel 시트 {len(sheets)}개 로드")
+    if pq is None:
+        print("pyarrow 가 없어 Excel 캐시를 만들지 않습니다 (pip install pyarrow)")
+    else:
+        tmp = sidecar.with_name(f"{sidecar.name}.tmp")
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, sidecar)
+            # 같은 원본의 이전 캐시 (원본이 바뀌기 전 버전) 정리
+            for old in cache_dir.iterdir():
+                if old.name.startswith(prefix) and old.suffix == '.parquet' and old != sidecar:
+                    old.unlink(missing_ok=True)
+            print(f"Excel 캐시 저장: {sidecar}")
+        except OSError as e:
+            tmp.unlink(missing_ok=True)
+            print(f"경고: Excel 캐시를 저장하지 못했습니다 ({cache_dir}): {e}")
+    return df[[c for c in df.columns if c in columns]] if columns else df
+
+
+def load_metadata(
+    metadata_path: str,
+    columns: Optional[Sequence[str]] = None,
+    categorical: Sequence[str] = (),
+    chunksize: int = METADATA_CHUNK_ROWS,
+    cache_dir: Optional[str] = None
+) -> pd.DataFrame:
     """
     국소 형태정보 메타데이터 로드
 
+    - 값은 모두 문자열로 읽음 (국소ID 앞자리 0 보존), 컬럼명 앞뒤 공백 제거
+    - CSV 는 chunksize 행씩 스트리밍, Excel 은 모든 시트를 합쳐 cache_dir 에 Parquet 캐시로 저장
+      (원본이 바뀌면 새로 만들고 같은 원본의 이전 캐시는 삭제)
+
     Args:
         metadata_path: CSV 또는 Excel 파일 경로
+        columns: 읽을 컬럼 (None 이면 전체, 없는 컬럼은 무시)
+        categorical: category dtype 으로 읽을 컬럼 (형태, 국소ID 처럼 값이 반복되는 컬럼)
+        chunksize: CSV 청크 크기 (행)
+        cache_dir: Excel 캐시 디렉토리 (기본: METADATA_CACHE_DIR 환경변수 또는 ~/.cache/tower-classification/metadata)
 
     Returns:
         DataFrame with columns: [국소ID, 형태, 이미지경로] (또는 유사한 컬럼)
     """
     path = Path(metadata_path)
+    columns = list(dict.fromkeys(columns)) if columns else None
 
     if path.suffix.lower() == '.csv':
-        df = pd.read_csv(metadata_path, encoding='utf-8')
+        df = _read_csv_columns(path, columns, categorical, chunksize)
     elif path.suffix.lower() in ['.xlsx', '.xls']:
-        df = pd.read_excel(metadata_path)
+        df = _read_excel_columns(path, columns, Path(cache_dir or METADATA_CACHE_DIR)).dropna(how='all').reset_index(drop=True)
+        for col in categorical:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
     else:
         raise ValueError(f"지원하지 않는 파일 형식: {path.suffix}")
 
@@ -82,20 +205,334 @@ def load_metadata(metadata_path: str) -> pd.DataFrame:
     return df
 
 
+def normalize_type_name(value: str) -> str:
+    """NFC 정규화 (macOS 엑셀의 자모 분리 한글 대응) + 앞뒤/연속 공백 정리"""
+    return ' '.join(unicodedata.normalize('NFC', str(value)).split())
+
+
+class TypeMapper:
+    """
+    형태 이름 → 클래스 매핑 엔진
+
+    매핑표를 한 번 정규식으로 컴파일하고, 고유 값별 결과를 기억해 같은 문자열은 다시 계산하지 않음
+
+    우선순위 규칙:
+    1. 정규화한 값이 매핑 키와 정확히 일치
+    2. 값에 포함된 키 중 가장 긴 키 (예: '철탑(건물) 옥상' → '철탑(건물)', '철탑' 아님)
+    3. 길이가 같으면 값에서 먼저 나오는 키
+    4. 그래도 같으면 매핑표에 먼저 적힌 키
+
+    포함된 키들이 서로 다른 클래스를 가리키면 규칙대로 정하되 모호한 값으로 보고
+    """
+
+    def __init__(self, mapping: Optional[Dict[str, str]] = None):
+        mapping = TYPE_MAPPING if mapping is None else mapping
+        self.mapping = {normalize_type_name(k): v for k, v in mapping.items()}
+        self._order = {key: rank for rank, key in enumerate(self.mapping)}
+        # 긴 키 우선 교대 + 전방 탐색: 위치마다 그 위치에서 시작하는 가장 긴 키를 겹침 포함해서 찾음
+        keys = sorted(self.mapping, key=len, reverse=True)
+        self._pattern = re.compile('(?=(' + '|'.join(re.escape(k) for k in keys) + '))') if keys else None
+        self._memo: Dict[str, Tuple[Optional[str], Tuple[str, ...]]] = {}
+        self.counts: Dict[str, int] = {}
+
+    def _resolve(self, name: str) -> Tuple[Optional[str], Tuple[str, ...]]:
+        if name in self.mapping:
+            return self.mapping[name], ()
+        if self._pattern is None:
+            return None, ()
+        matches = [(m.group(1), m.start()) for m in self._pattern.finditer(name)]
+        if not matches:
+            return None, ()
+        key, _ = min(matches, key=lambda km: (-len(km[0]), km[1], self._order[km[0]]))
+        candidates = tuple(sorted({self.mapping[k] for k, _ in matches}))
+        return self.mapping[key], candidates if len(candidates) > 1 else ()
+
+    def lookup(self, value) -> Optional[str]:
+        """값 하나 매핑 (메모이즈)"""
+        name = normalize_type_name(value)
+        result = self._memo.get(name)
+        if result is None:
+            result = self._memo[name] = self._resolve(name)
+        return result[0]
+
+    def map_series(self, values: pd.Series) -> pd.Series:
+        """
+        컬럼 전체 매핑 - 고유 값만 매핑한 뒤 코드로 펼침
+        빈 값(NaN)은 None, 고유 값별 등장 횟수는 report()에 누적
+        """
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        classes = [self.lookup(u) for u in uniques]
+        occurrences = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        for u, n in zip(uniques, occurrences):
+            name = normalize_type_name(u)
+            self.counts[name] = self.counts.get(name, 0) + int(n)
+        n_missing = int((codes < 0).sum())
+        if n_missing:
+            self.counts[''] = self.counts.get('', 0) + n_missing
+            self._memo.setdefault('', (None, ()))
+
+        lookup = np.array(classes + [None], dtype=object)
+        return pd.Series(lookup[codes], index=values.index, dtype=object)
+
+    def report(self) -> Dict[str, Dict]:
+        """
+        매핑 결과 보고
+        - unmapped: {값: 행 수} (행 수 내림차순)
+        - ambiguous: {값: {'class': 선택된 클래스, 'candidates': [...], 'count': 행 수}}
+        """
+        unmapped = {name: self.counts.get(name, 0) for name, (cls, _) in self._memo.items() if cls is None}
+        ambiguous = {
+            name: {'class': cls, 'candidates': list(candidates), 'count': self.counts.get(name, 0)}
+            for name, (cls, candidates) in self._memo.items() if candidates
+        }
+        return {
+            'unmapped': dict(sorted(unmapped.items(), key=lambda kv: -kv[1])),
+            'ambiguous': dict(sorted(ambiguous.items(), key=lambda kv: -kv[1]['count'])),
+        }
+
+
+def print_mapping_report(report: Dict[str, Dict], limit: int = 20):
+    """미매핑 / 모호한 형태 값 출력"""
+    unmapped, ambiguous = report['unmapped'], report['ambiguous']
+    if unmapped:
+        print(f"\n매핑되지 않은 형태 유형: {len(unmapped)}종 ({sum(unmapped.values())}행)")
+        for name, count in list(unmapped.items())[:limit]:
+            print(f"  {name or '(빈 값)'}: {count}행")
+        print("TYPE_MAPPING에 추가가 필요할 수 있습니다.")
+    if ambiguous:
+        print(f"\n여러 클래스에 걸치는 형태 유형: {len(ambiguous)}종 (우선순위 규칙으로 결정)")
+        for name, info in list(ambiguous.items())[:limit]:
+            print(f"  {name}: {info['class']} ← {info['candidates']} ({info['count']}행)")
+        print("정확한 값을 TYPE_MAPPING에 추가하면 명시적으로 지정할 수 있습니다.")
+
+
+_default_mapper: Optional[TypeMapper] = None
+
+
 def map_type_to_class(type_name: str) -> Optional[str]:
-    """형태 이름을 클래스명으로 매핑"""
-    type_name = str(type_name).strip()
+    """형태 이름을 클래스명으로 매핑 (TypeMapper 우선순위 규칙)"""
+    global _default_mapper
+    if _default_mapper is None:
+        _default_mapper = TypeMapper()
+    return _default_mapper.lookup(type_name)
+
+
+# 국소ID로 이미지를 찾을 때 시도하는 확장자 (앞쪽 우선)
+ID_IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.JPG', '.JPEG', '.PNG']
+LINK_MODES = ['auto', 'reflink', 'hardlink', 'symlink', 'copy']
+FICLONE = 0x40049409  # Linux ioctl: 파일 내용 공유 복사 (btrfs, XFS 등)
+
+
+class ImageIndex:
+    """
+    이미지 디렉토리를 한 번만 훑어 만든 색인
+
+    - by_relpath: 'sub/a.jpg' → 경로 (이미지경로 컬럼용, 하위 폴더 포함)
+    - by_stem: 'LOC001' → 경로 (국소ID용, 최상위 파일만, ID_IMAGE_EXTENSIONS 순서 우선)
+    """
+
+    def __init__(self, image_dir: str):
+        self.root = Path(image_dir)
+        self.by_relpath: Dict[str, Path] = {}
+        self.by_stem: Dict[str, Path] = {}
+        stem_rank: Dict[str, int] = {}
+
+        for dirpath, _, filenames in os.walk(self.root):
+            rel_dir = Path(dirpath).relative_to(self.root).as_posix()
+            for name in filenames:
+                path = Path(dirpath) / name
+                self.by_relpath[name if rel_dir == '.' else f"{rel_dir}/{name}"] = path
+                if rel_dir != '.':
+                    continue
+                stem, ext = os.path.splitext(name)
+                if ext in ID_IMAGE_EXTENSIONS:
+                    rank = ID_IMAGE_EXTENSIONS.index(ext)
+                    if rank < stem_rank.get(stem, len(ID_IMAGE_EXTENSIONS)):
+                        stem_rank[stem] = rank
+                        self.by_stem[stem] = path
+
+    def __len__(self) -> int:
+        return len(self.by_relpath)
+
+
+def resolve_image_paths(
+    df: pd.DataFrame,
+    index: ImageIndex,
+    image_column: str = '이미지경로',
+    id_column: str = '국소ID'
+) -> pd.Series:
+    """
+    행별 이미지 경로 (없으면 NaN) - 행 단위 exists() 대신 색인 조회를 컬럼 단위로 수행
 
-    # 직접 매핑 시도
-    if type_name in TYPE_MAPPING:
-        return TYPE_MAPPING[type_name]
+    이미지경로 값이 있으면 그 경로만, 없으면 국소ID로 찾음
+    """
+    resolved = pd.Series(index=df.index, dtype=object)
+    has_path = pd.Series(False, index=df.index)
+    if image_column in df.columns:
+        has_path = df[image_column].notna()
+        values = df.loc[has_path, image_column].astype(str).str.strip()
+        rel = values.str.replace('\\', '/', regex=False).str.replace(r'^(\./)+', '', regex=True)
+        resolved[has_path] = rel.map(index.by_relpath)
+        # 색인 밖 경로 (절대 경로, ../ 등)는 찾지 못한 행만 직접 확인
+        for i in resolved.index[has_path & resolved.isna()]:
+            candidate = index.root / values[i]
+            if candidate.is_file():
+                resolved[i] = candidate
+    if id_column in df.columns:
+        by_id = ~has_path
+        resolved[by_id] = df.loc[by_id, id_column].astype(str).str.strip().map(index.by_stem)
+    return resolved
+
+
+def _same_file(src_stat: os.stat_result, dest: Path) -> bool:
+    try:
+        dest_stat = dest.stat()
+    except FileNotFoundError:
+        return False
+    return dest_stat.st_size == src_stat.st_size and int(dest_stat.st_mtime) == int(src_stat.st_mtime)
+
+
+def _reflink(src: Path, dest: Path):
+    if fcntl is None:
+        raise OSError("reflink 미지원 플랫폼")
+    with open(src, 'rb') as fsrc, open(dest, 'wb') as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            dest.unlink(missing_ok=True)
+            raise
+    shutil.copystat(src, dest)
+
+
+class Materializer:
+    """
+    (원본, 대상) 파일 배치를 병렬로 처리
 
-    # 부분 매칭 시도
-    for key, value in TYPE_MAPPING.items():
-        if key in type_name:
-            return value
+    - auto: reflink → 하드링크 → 복사 순으로 시도하고, 실패한 방식은 (원본 장치, 대상 장치)
+      조합별로 기억해 파일마다 다시 시도하지 않음
+    - reflink/hardlink/symlink 는 디스크를 추가로 쓰지 않음 (symlink 는 원본이 있어야 유효)
+    - 대상이 이미 있고 크기와 수정 시각이 같으면 건너뜀 (재실행 시 변경분만 처리)
+    """
 
-    return None
+    def __init__(self, mode: str = 'auto', workers: int = 8):
+        if mode not in LINK_MODES:
+            raise ValueError(f"지원하지 않는 배치 방식: {mode} (가능: {LINK_MODES})")
+        self.mode = mode
+        self.workers = max(1, workers)
+        self._unsupported = set()
+        self._lock = threading.Lock()
+
+    def _methods(self) -> List[str]:
+        return ['reflink', 'hardlink', 'copy'] if self.mode == 'auto' else [self.mode]
+
+    def place(self, src: Path, dest: Path) -> str:
+        src_stat = src.stat()
+        if _same_file(src_stat, dest):
+            return 'skipped'
+        if dest.is_symlink() or dest.exists():
+            dest.unlink()
+
+        dest_dev = dest.parent.stat().st_dev
+        for method in self._methods():
+            devices = (method, src_stat.st_dev, dest_dev)
+            if devices in self._unsupported and method != 'copy':
+                continue
+            try:
+                if method == 'reflink':
+                    _reflink(src, dest)
+                elif method == 'hardlink':
+                    os.link(src, dest)
+                elif method == 'symlink':
+                    os.symlink(src.resolve(), dest)
+                else:
+                    shutil.copy2(src, dest)
+                return method
+            except OSError:
+                if self.mode != 'auto':
+                    raise
+                with self._lock:
+                    self._unsupported.add(devices)
+        raise OSError(f"파일을 배치할 수 없습니다: {src} → {dest}")
+
+    def run(self, pairs: List[Tuple[Path, Path]], desc: str = '파일 배치') -> Dict[str, int]:
+        """병렬 배치 후 방식별 개수 반환"""
+        counts = {method: 0 for method in ['reflink', 'hardlink', 'symlink', 'copy', 'skipped', 'failed']}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self.place, src, dest) for src, dest in pairs]
+            for future in tqdm(as_completed(futures), total=len(futures), desc=desc):
+                try:
+                    counts[future.result()] += 1
+                except OSError as e:
+                    counts['failed'] += 1
+                    print(f"  배치 실패: {e}")
+        return counts
+
+
+HASH_INDEX_NAME = 'image_hashes.json'
+LABEL_CONFLICTS_NAME = 'label_conflicts.csv'
+LABEL_CONFLICT_POLICIES = ['exclude', 'first']
+
+
+def _item_key(path: Path, root: Path) -> str:
+    """분할 매니페스트의 이미지 키 (이미지 디렉토리 기준 상대 경로)"""
+    try:
+        return path.relative_to(root).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def _dedup_groups(
+    classes: List[str],
+    paths: List[str],
+    stations: Optional[List[str]],
+    threshold: int,
+    index_path: Path,
+    workers: int,
+    label_conflicts: str = 'exclude'
+) -> Tuple[List[int], List[int], List[str], List[Tuple[int, str]]]:
+    """
+    중복 제거 + 분할 묶음 구성
+
+    - 같은 내용의 파일은 처음 한 장만 사용
+    - 같은 내용인데 클래스가 다르면 라벨 충돌: 'exclude' 는 모두 제외, 'first' 는 처음 행의 클래스로 사용
+    - 유사 사진 묶음과 같은 국소의 사진은 한 묶음으로
+
+    Returns:
+        (사용할 행 번호 목록, 사용할 행별 묶음 번호, 사용할 행별 SHA-256, 라벨 충돌 행 (행 번호, SHA-256) 목록)
+    """
+    try:
+        from .dedup import HashIndex, cluster_images
+    except ImportError:  # python utils/data_prepare.py 로 직접 실행
+        from dedup import HashIndex, cluster_images
+
+    sha, dhashes = HashIndex(str(index_path)).compute(paths, workers)
+
+    labels: Dict[str, set] = {}
+    for k, digest in enumerate(sha):
+        labels.setdefault(digest, set()).add(classes[k])
+    conflicted = {digest for digest, found in labels.items() if len(found) > 1}
+    conflicts = [(k, digest) for k, digest in enumerate(sha) if digest in conflicted]
+
+    first: Dict[str, int] = {}
+    keep = []
+    for k, digest in enumerate(sha):
+        if digest in first or (digest in conflicted and label_conflicts == 'exclude'):
+            continue
+        first[digest] = k
+        keep.append(k)
+    if len(keep) < len(sha):
+        print(f"\n동일 이미지 제외: {len(sha) - len(keep)}개")
+    if conflicts:
+        action = '모두 제외' if label_conflicts == 'exclude' else '처음 행의 클래스로 사용'
+        print(f"라벨 충돌 (같은 이미지, 다른 클래스): 이미지 {len(conflicted)}종 / {len(conflicts)}행 → {action}")
+
+    clusters = cluster_images(
+        [sha[k] for k in keep], [dhashes[k] for k in keep], threshold,
+        [stations[k] for k in keep] if stations else None
+    )
+    print(f"분할 묶음: {len(set(clusters))}개 (이미지 {len(keep)}개, 유사 기준 해밍 거리 ≤ {threshold})")
+    return keep, clusters, [sha[k] for k in keep], conflicts
 
 
 def prepare_classification_dataset(
@@ -106,7 +543,15 @@ def prepare_classification_dataset(
     image_column: str = '이미지경로',
     id_column: str = '국소ID',
     train_ratio: float = 0.8,
-    seed: int = 42
+    seed: int = 42,
+    link_mode: str = 'auto',
+    workers: int = 8,
+    dedup: bool = True,
+    near_dup_threshold: int = 6,
+    group_by_station: bool = True,
+    folds: int = 0,
+    val_fold: int = 0,
+    label_conflicts: str = 'exclude'
 ):
     """
     YOLOv8 Classification 형식으로 데이터셋 구성
@@ -114,19 +559,38 @@ def prepare_classification_dataset(
     구조:
     output_dir/
     ├── train/
-    │   ├── dispersed_pole/
-    │   ├── single_pole/
-    │   ├── eco_friendly/
-    │   ├── utility_pole/
-    │   └── steel_pipe/
-    └── val/
-        ├── dispersed_pole/
-        └── ...
-    """
-    random.seed(seed)
+    │   ├── simple_pole/
+    │   ├── steel_pipe/
+    │   └── ...
+    ├── val/
+    │   ├── simple_pole/
+    │   └── ...
+    ├── split_manifest.csv   # 이미지별 묶음 / 분할 / fold / 파일명 (다시 만들 때 그대로 유지)
+    └── label_conflicts.csv  # 같은 내용인데 클래스가 다른 행 (있을 때만)
 
-    # 메타데이터 로드
-    df = load_metadata(metadata_path)
+    Args:
+        seed: 분할 해시 seed (같은 seed 면 항상 같은 분할)
+        link_mode: 파일 배치 방식 (auto / reflink / hardlink / symlink / copy)
+        workers: 병렬 배치 / 해시 계산 수
+        dedup: 동일 이미지 제거 후 유사 사진도 같은 묶음으로 (False: 국소ID 묶음만 사용)
+        near_dup_threshold: 유사 사진 기준 dHash 해밍 거리 (음수면 유사 탐지 생략)
+        group_by_station: 같은 국소ID 사진을 같은 분할로
+        folds: k-fold 수 (지정하면 train_ratio 대신 val_fold 번째 fold 를 val 로)
+        val_fold: val 로 쓸 fold 번호
+        label_conflicts: 라벨 충돌 처리 ('exclude': 충돌한 이미지 모두 제외, 'first': 처음 행의 클래스 사용)
+    """
+    if label_conflicts not in LABEL_CONFLICT_POLICIES:
+        raise ValueError(f"label_conflicts 는 {LABEL_CONFLICT_POLICIES} 중 하나여야 합니다: {label_conflicts}")
+    try:
+        from .dedup import UnionFind
+        from .splits import MANIFEST_NAME, SplitEngine, group_keys, load_split_manifest, save_split_manifest
+    except ImportError:  # python utils/data_prepare.py 로 직접 실행
+        from dedup import UnionFind
+        from splits import MANIFEST_NAME, SplitEngine, group_keys, load_split_manifest, save_split_manifest
+
+    # 메타데이터 로드 (필요한 컬럼만)
+    df = load_metadata(metadata_path, columns=[type_column, image_column, id_column],
+                       categorical=[type_column, id_column])
 
     # 컬럼 확인
     required_cols = [type_column]
@@ -137,98 +601,262 @@ def prepare_classification_dataset(
 
     # 출력 디렉토리 생성
     output_path = Path(output_dir)
-    classes = [
-        'simple_pole',           # 간이폴, 분산폴 및 비기준 설치대
-        'steel_pipe',            # 강관주
-        'complex_type',          # 복합형
-        'indoor',                # 옥내, 터널, 지하 등
-        'single_pole_building',  # 원폴(건물)
-        'tower_building',        # 철탑(건물)
-        'tower_ground',          # 철탑(지면)
-        'telecom_pole',          # 통신주
-        'frame_mount',           # 프레임
-    ]
+    classes = CLASSES
 
     for split in ['train', 'val']:
         for cls in classes:
             (output_path / split / cls).mkdir(parents=True, exist_ok=True)
 
-    # 이미지 디렉토리 설정
-    image_base = Path(image_dir)
-
-    # 클래스별 이미지 수집
-    class_images: Dict[str, List[Tuple[str, Path]]] = {cls: [] for cls in classes}
-    unmapped_types = set()
+    # 이미지 디렉토리 색인 (한 번만 탐색)
+    index = ImageIndex(image_dir)
+    print(f"\n이미지 색인: {len(index)}개 파일")
+
+    # 형태 → 클래스 (고유 값별로 한 번만 매핑)
+    print("데이터 분류 중...")
+    mapper = TypeMapper()
+    class_of = mapper.map_series(df[type_column])
+
+    # 이미지 경로 결정
+    if image_column not in df.columns and id_column not in df.columns:
+        print(f"경고: '{image_column}' / '{id_column}' 컬럼이 모두 없습니다.")
+        return
+    img_paths = resolve_image_paths(df, index, image_column, id_column)
+    mapped = class_of.notna()
+    found = mapped & img_paths.notna()
+    missing_rows = df[mapped & img_paths.isna()]
     missing_images = []
-
-    print("\n데이터 분류 중...")
-    for idx, row in tqdm(df.iterrows(), total=len(df)):
-        type_name = row[type_column]
-        cls = map_type_to_class(type_name)
-
-        if cls is None:
-            unmapped_types.add(str(type_name))
-            continue
-
-        # 이미지 경로 결정
-        if image_column in df.columns and pd.notna(row[image_column]):
-            img_path = image_base / row[image_column]
-        elif id_column in df.columns:
-            # 국소ID로 이미지 찾기 (다양한 확장자 시도)
-            img_id = str(row[id_column])
-            img_path = None
-            for ext in ['.jpg', '.jpeg', '.png', '.bmp', '.JPG', '.JPEG', '.PNG']:
-                candidate = image_base / f"{img_id}{ext}"
-                if candidate.exists():
-                    img_path = candidate
-                    break
-        else:
-            continue
-
-        if img_path and img_path.exists():
-            class_images[cls].append((str(idx), img_path))
-        else:
-            missing_images.append(str(img_path) if img_path else str(row.get(id_column, idx)))
-
-    # 미매핑 형태 출력
-    if unmapped_types:
-        print(f"\n매핑되지 않은 형태 유형: {unmapped_types}")
-        print("TYPE_MAPPING에 추가가 필요할 수 있습니다.")
+    if image_column in df.columns:
+        has_path = missing_rows[image_column].notna()
+        missing_images = [str(index.root / v) for v in missing_rows.loc[has_path, image_column].astype(str)]
+        missing_rows = missing_rows[~has_path]
+    if id_column in df.columns:
+        missing_images += [str(v) for v in missing_rows[id_column]]
+
+    # 이미지 목록 (메타데이터 순서 유지)
+    rows = df.index[found]
+    row_classes = list(class_of[found])
+    row_paths = list(img_paths[found])
+    row_items = [_item_key(p, index.root) for p in row_paths]
+    row_stations = ([str(v).strip() or None if pd.notna(v) else None for v in df.loc[rows, id_column]]
+                    if id_column in df.columns else None)
+    group_stations = row_stations if group_by_station else None
+
+    # 미매핑 / 모호한 형태 출력
+    print_mapping_report(mapper.report())
 
     if missing_images and len(missing_images) <= 10:
         print(f"\n누락된 이미지: {missing_images}")
     elif missing_images:
         print(f"\n누락된 이미지: {len(missing_images)}개")
 
-    # 클래스별 통계 및 데이터 분할
+    # 분할 묶음 (동일 / 유사 사진, 국소ID)
+    conflicts_path = output_path / LABEL_CONFLICTS_NAME
+    conflicts_path.unlink(missing_ok=True)
+    if dedup:
+        keep, clusters, fallback, conflicts = _dedup_groups(
+            row_classes, [str(p) for p in row_paths], group_stations,
+            near_dup_threshold, output_path / HASH_INDEX_NAME, workers, label_conflicts
+        )
+        if conflicts:
+            pd.DataFrame({
+                'item': [row_items[k] for k, _ in conflicts],
+                'station': [row_stations[k] or '' if row_stations else '' for k, _ in conflicts],
+                'class': [row_classes[k] for k, _ in conflicts],
+                'sha256': [digest for _, digest in conflicts],
+                'row': [rows[k] for k, _ in conflicts],
+            }).sort_values(['sha256', 'item']).to_csv(conflicts_path, index=False, encoding='utf-8-sig')
+            print(f"라벨 충돌 목록: {conflicts_path}")
+    else:
+        keep = list(range(len(row_paths)))
+        uf = UnionFind(len(keep))
+        if group_stations:
+            uf.union_keys(group_stations)
+        clusters = uf.labels()
+        fallback = row_items
+
+    items = pd.DataFrame({
+        'item': [row_items[k] for k in keep],
+        'station': [row_stations[k] or '' if row_stations else '' for k in keep],
+        'group': group_keys(clusters, [group_stations[k] for k in keep] if group_stations else None, fallback),
+        'class': [row_classes[k] for k in keep],
+        'dest': [f"{hashlib.sha1(row_items[k].encode('utf-8')).hexdigest()[:8]}_{row_paths[k].name}" for k in keep],
+    })
+
+    # 데이터 분할 (매니페스트에 있는 행은 이전 배정 유지, 새 행만 배정)
+    manifest_path = output_path / MANIFEST_NAME
+    previous = load_split_manifest(manifest_path)
+    items = SplitEngine(train_ratio, folds, val_fold, seed).assign(items, previous)
+
+    # 이전 빌드에서 위치가 바뀌었거나(클래스 수정, val fold 변경) 메타데이터에서 빠진 파일 정리
+    def _placed(table: pd.DataFrame) -> set:
+        return {output_path / sp / cls / dest for sp, cls, dest in zip(table['split'], table['class'], table['dest'])}
+    stale = _placed(previous) - _placed(items)
+    for path in stale:
+        path.unlink(missing_ok=True)
+    n_new = int((~items['item'].isin(previous['item'])).sum())
+    print(f"\n분할 매니페스트: 기존 {len(items) - n_new}개 유지, 새로 배정 {n_new}개, 정리 {len(stale)}개")
+
+    # 클래스별 통계
     print("\n클래스별 분포:")
     total_train, total_val = 0, 0
+    pairs: List[Tuple[Path, Path]] = [
+        (row_paths[k], output_path / sp / cls / dest)
+        for k, sp, cls, dest in zip(keep, items['split'], items['class'], items['dest'])
+    ]
 
-    for cls, images in class_images.items():
-        if not images:
+    split_counts = Counter(zip(items['class'], items['split']))
+    for cls in classes:
+        n_train, n_val = split_counts[(cls, 'train')], split_counts[(cls, 'val')]
+        if n_train + n_val == 0:
             print(f"  {cls}: 0개 (이미지 없음)")
             continue
+        print(f"  {cls}: train={n_train}, val={n_val}")
+        total_train += n_train
+        total_val += n_val
+
+    # 이미지 배치 (링크 / 병렬 복사)
+    counts = Materializer(link_mode, workers).run(pairs)
+    print("\n배치 방식: " + ", ".join(f"{k}={v}" for k, v in counts.items() if v))
+    save_split_manifest(items, manifest_path)
 
-        random.shuffle(images)
-        split_idx = int(len(images) * train_ratio)
-        train_images = images[:split_idx]
-        val_images = images[split_idx:]
+    print(f"\n총계: train={total_train}, val={total_val}")
+    print(f"데이터셋 저장 완료: {output_path}")
 
-        # 이미지 복사
-        for idx, img_path in train_images:
-            dest = output_path / 'train' / cls / f"{idx}_{img_path.name}"
-            shutil.copy2(img_path, dest)
 
-        for idx, img_path in val_images:
-            dest = output_path / 'val' / cls / f"{idx}_{img_path.name}"
-            shutil.copy2(img_path, dest)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
 
-        print(f"  {cls}: train={len(train_images)}, val={len(val_images)}")
-        total_train += len(train_images)
-        total_val += len(val_images)
 
-    print(f"\n총계: train={total_train}, val={total_val}")
-    print(f"데이터셋 저장 완료: {output_path}")
+def _load_for_pack(path: Path, max_side: int) -> Tuple[Optional[np.ndarray], bytes]:
+    """원본 파일 → (긴 변이 max_side 이하인 BGR 이미지, 원본 SHA-256)"""
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).digest()
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None, digest
+    h, w = image.shape[:2]
+    scale = max_side / max(h, w)
+    if scale < 1:
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    return image, digest
+
+
+def pack_dataset(
+    data_dir: str,
+    output_dir: str,
+    max_side: int = 320,
+    splits: Tuple[str, ...] = ('train', 'val'),
+    workers: int = 8,
+    shard_mb: int = 1024
+) -> Dict:
+    """
+    train/<클래스>/, val/<클래스>/ 데이터셋을 샤드 형식으로 변환 (utils/shards.py)
+
+    - 이미지를 긴 변 max_side 로 미리 줄여 저장 (기본 320: 4:3 사진의 짧은 변 240 ≥ imgsz 224)
+    - 디코딩/리사이즈는 스레드 풀에서 병렬로, 기록은 원래 순서대로
+    - meta.json 은 모든 분할을 쓴 뒤 마지막에 기록 (중단된 샤드는 사용되지 않음)
+    """
+    try:
+        from .shards import META_NAME, SHARD_FORMAT_VERSION, ShardWriter
+    except ImportError:  # python utils/data_prepare.py 로 직접 실행
+        from shards import META_NAME, SHARD_FORMAT_VERSION, ShardWriter
+
+    data_path = Path(data_dir)
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    (output_path / META_NAME).unlink(missing_ok=True)
+
+    names = sorted(p.name for p in (data_path / 'train').iterdir() if p.is_dir())
+    meta = {
+        'version': SHARD_FORMAT_VERSION,
+        'names': names,
+        'max_side': max_side,
+        'color': 'BGR',
+        'source': str(data_path.resolve()),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'splits': {},
+    }
+
+    for split in splits:
+        split_dir = data_path / split
+        if not split_dir.is_dir():
+            print(f"경고: 분할 디렉토리가 없어 건너뜀: {split_dir}")
+            continue
+        samples = [
+            (path, label)
+            for label, name in enumerate(names) if (split_dir / name).is_dir()
+            for path in sorted((split_dir / name).iterdir()) if path.suffix.lower() in IMAGE_EXTENSIONS
+        ]
+
+        writer = ShardWriter(output_path / split, shard_mb << 20)
+        for name in names:
+            (output_path / split / name).mkdir(parents=True, exist_ok=True)
+        failed = 0
+        chunk = max(1, workers) * 16
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool, \
+                tqdm(total=len(samples), desc=f'{split} 패킹') as pbar:
+            # 묶음 단위로 제출해 앞서 디코딩된 이미지가 메모리에 쌓이지 않게 함
+            for start in range(0, len(samples), chunk):
+                batch = samples[start:start + chunk]
+                loaded = pool.map(lambda s: _load_for_pack(s[0], max_side), batch)
+                for (path, label), (image, digest) in zip(batch, loaded):
+                    if image is None:
+                        failed += 1
+                        print(f"  읽을 수 없는 이미지 건너뜀: {path}")
+                    else:
+                        writer.add(image, label, digest, path.relative_to(data_path).as_posix())
+                    pbar.update(1)
+        count = writer.close()
+        meta['splits'][split] = count
+        print(f"  {split}: {count}장 (실패 {failed}장)")
+
+    with open(output_path / META_NAME, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    print(f"샤드 저장 완료: {output_path}")
+    return meta
+
+
+def check_split_leakage(
+    data_dir: str,
+    near_dup_threshold: int = 6,
+    workers: int = 8,
+    output: Optional[str] = None
+) -> int:
+    """
+    기존 train/val 데이터셋에서 양쪽에 걸친 동일 / 유사 이미지 묶음 점검
+
+    Returns:
+        train/val 에 걸친 묶음 수
+    """
+    try:
+        from .dedup import HashIndex, cluster_images, cross_split_clusters
+    except ImportError:  # python utils/data_prepare.py 로 직접 실행
+        from dedup import HashIndex, cluster_images, cross_split_clusters
+
+    data_path = Path(data_dir)
+    paths, splits = [], []
+    for split in ['train', 'val']:
+        for path in sorted((data_path / split).glob('*/*')):
+            if path.suffix.lower() in IMAGE_EXTENSIONS:
+                paths.append(str(path))
+                splits.append(split)
+
+    sha, dhashes = HashIndex(str(data_path / HASH_INDEX_NAME)).compute(paths, workers)
+    clusters = cluster_images(sha, dhashes, near_dup_threshold)
+    leaked = cross_split_clusters(paths, splits, clusters)
+
+    val_total = splits.count('val')
+    leaked_val = sum(1 for group in leaked for p in group if Path(p).parts[-3] == 'val')
+    print(f"\ntrain/val 에 걸친 묶음: {len(leaked)}개 (val 이미지 {leaked_val}/{val_total}장)")
+    for group in leaked[:10]:
+        print("  " + " | ".join(group[:4]) + (" ..." if len(group) > 4 else ""))
+
+    if output:
+        pd.DataFrame(
+            [(n, p) for n, group in enumerate(leaked) for p in group], columns=['group', 'path']
+        ).to_csv(output, index=False, encoding='utf-8-sig')
+        print(f"목록 저장: {output}")
+    return len(leaked)
 
 
 def create_sample_metadata():
@@ -275,7 +903,55 @@ def main():
     prepare_parser.add_argument('--train-ratio', type=float, default=0.8,
                                 help='학습 데이터 비율 (기본: 0.8)')
     prepare_parser.add_argument('--seed', type=int, default=42,
-                                help='랜덤 시드 (기본: 42)')
+                                help='분할 해시 시드 (기본: 42)')
+    prepare_parser.add_argument('--link-mode', type=str, default='auto', choices=LINK_MODES,
+                                help='파일 배치 방식 (기본: auto = reflink → 하드링크 → 복사)')
+    prepare_parser.add_argument('--workers', type=int, default=8,
+                                help='병렬 배치 / 해시 계산 수 (기본: 8)')
+    prepare_parser.add_argument('--no-dedup', action='store_true',
+                                help='중복 / 유사 이미지 탐지 없이 국소ID 묶음만으로 분할')
+    prepare_parser.add_argument('--near-dup-threshold', type=int, default=6,
+                                help='유사 사진 기준 dHash 해밍 거리 (기본: 6, -1이면 유사 탐지 생략)')
+    prepare_parser.add_argument('--label-conflicts', type=str, default='exclude', choices=LABEL_CONFLICT_POLICIES,
+                                help='같은 이미지가 다른 클래스로 나올 때 (기본: exclude = 모두 제외, first = 처음 행의 클래스, '
+                                     f'목록은 <output>/{LABEL_CONFLICTS_NAME})')
+    prepare_parser.add_argument('--no-station-group', action='store_true',
+                                help='같은 국소ID 사진을 같은 분할로 묶지 않음')
+    prepare_parser.add_argument('--folds', type=int, default=0,
+                                help='k-fold 배정 수 (지정하면 --val-fold 번째 fold 가 val, 기본: 0 = 사용 안 함)')
+    prepare_parser.add_argument('--val-fold', type=int, default=0,
+                                help='val 로 쓸 fold 번호 (기본: 0)')
+
+    # dedup 명령어
+    dedup_parser = subparsers.add_parser('dedup', help='기존 데이터셋의 train/val 중복 / 유사 이미지 점검')
+    dedup_parser.add_argument('--data', type=str, default='data',
+                              help='train/val 클래스 폴더 데이터셋 (기본: data)')
+    dedup_parser.add_argument('--near-dup-threshold', type=int, default=6,
+                              help='유사 사진 기준 dHash 해밍 거리 (기본: 6)')
+    dedup_parser.add_argument('--workers', type=int, default=8,
+                              help='병렬 해시 계산 수 (기본: 8)')
+    dedup_parser.add_argument('--output', type=str, default=None,
+                              help='걸친 묶음 목록 CSV 저장 경로')
+
+    # types 명령어
+    types_parser = subparsers.add_parser('types', help='형태 매핑 보고 (미매핑 / 모호한 값)')
+    types_parser.add_argument('--metadata', type=str, required=True,
+                              help='메타데이터 파일 경로 (CSV/Excel)')
+    types_parser.add_argument('--type-col', type=str, default='형태',
+                              help='형태 컬럼명 (기본: 형태)')
+
+    # pack 명령어
+    pack_parser = subparsers.add_parser('pack', help='학습 데이터를 샤드 형식으로 변환 (디코딩 생략)')
+    pack_parser.add_argument('--data', type=str, default='data',
+                             help='train/val 클래스 폴더 데이터셋 (기본: data)')
+    pack_parser.add_argument('--output', type=str, default='data/shards',
+                             help='샤드 출력 디렉토리 (기본: data/shards)')
+    pack_parser.add_argument('--max-side', type=int, default=320,
+                             help='저장할 이미지의 최대 긴 변 (기본: 320)')
+    pack_parser.add_argument('--workers', type=int, default=8,
+                             help='병렬 디코딩 수 (기본: 8)')
+    pack_parser.add_argument('--shard-mb', type=int, default=1024,
+                             help='샤드 파일 하나의 최대 크기 MB (기본: 1024)')
 
     # sample 명령어
     sample_parser = subparsers.add_parser('sample', help='샘플 메타데이터 생성')
@@ -291,7 +967,41 @@ def main():
             image_column=args.image_col,
             id_column=args.id_col,
             train_ratio=args.train_ratio,
-            seed=args.seed
+            seed=args.seed,
+            link_mode=args.link_mode,
+            workers=args.workers,
+            dedup=not args.no_dedup,
+            near_dup_threshold=args.near_dup_threshold,
+            group_by_station=not args.no_station_group,
+            folds=args.folds,
+            val_fold=args.val_fold,
+            label_conflicts=args.label_conflicts
+        )
+    elif args.command == 'dedup':
+        check_split_leakage(
+            data_dir=args.data,
+            near_dup_threshold=args.near_dup_threshold,
+            workers=args.workers,
+            output=args.output
+        )
+    elif args.command == 'types':
+        df = load_metadata(args.metadata, columns=[args.type_col], categorical=[args.type_col])
+        mapper = TypeMapper()
+        classes = mapper.map_series(df[args.type_col])
+        print("\n클래스별 행 수:")
+        for cls, count in classes.value_counts().items():
+            print(f"  {cls}: {count}")
+        report = mapper.report()
+        print_mapping_report(report, limit=100)
+        if not report['unmapped'] and not report['ambiguous']:
+            print("\n모든 형태 값이 명확하게 매핑됩니다.")
+    elif args.command == 'pack':
+        pack_dataset(
+            data_dir=args.data,
+            output_dir=args.output,
+            max_side=args.max_side,
+            workers=args.workers,
+            shard_mb=args.shard_mb
         )
     elif args.command == 'sample':
         create_sample_metadata()
@@ -0,0 +1,236 @@
+"""
+중복 / 유사 이미지 탐지
+정확히 같은 파일(SHA-256)과 거의 같은 사진(dHash: 재촬영, 재업로드, 리사이즈)을 묶어
+같은 묶음이 train/val 에 나뉘어 들어가지 않게 함
+
+- 해시는 스레드 풀에서 병렬 계산하고, 경로/크기/수정 시각이 같으면 디스크 색인의 값을 재사용
+- 유사 탐지: 64비트 dHash 를 16비트 밴드 4개로 나눠 색인 (multi-index hashing)
+  해밍 거리 ≤ t 인 두 해시는 어떤 밴드에서 t // 4 비트 이하만 다르므로,
+  밴드별로 그 반경 안의 키만 조회하면 모든 후보를 빠짐없이 찾음 (전체 쌍 비교 없음)
+- 묶음은 union-find 로 구성 (A~B, B~C 면 A, B, C 한 묶음)
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+HASH_INDEX_VERSION = 1
+BANDS = 4
+BAND_BITS = 16
+DEFAULT_THRESHOLD = 6
+
+
+def dhash(image: np.ndarray) -> int:
+    """그레이스케일 이미지 → 64비트 차분 해시 (9x8 축소 후 가로 인접 픽셀 비교)"""
+    small = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def hash_file(path: str) -> Tuple[str, Optional[int]]:
+    """파일 → (SHA-256 hex, dHash 또는 None: 디코딩 실패)"""
+    return hash_bytes(Path(path).read_bytes())
+
+
+def hash_bytes(data: bytes) -> Tuple[str, Optional[int]]:
+    """파일 내용 → (SHA-256 hex, dHash 또는 None: 디코딩 실패)"""
+    digest = hashlib.sha256(data).hexdigest()
+    # JPEG 는 1/4 크기로 디코딩 (DCT 축소) - 9x8 해시에는 충분하고 훨씬 빠름
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if image is None or image.size == 0:
+        return digest, None
+    return digest, dhash(image)
+
+
+class HashIndex:
+    """
+    이미지 해시 디스크 색인 (JSON)
+    {경로: [크기, 수정 시각(ns), sha256, dhash hex 또는 null]}
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else None
+        self.entries: Dict[str, list] = {}
+        if self.path and self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == HASH_INDEX_VERSION:
+                self.entries = data['entries']
+
+    def save(self):
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': HASH_INDEX_VERSION, 'entries': self.entries}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def compute(self, paths: Sequence[str], workers: int = 8) -> Tuple[List[str], List[Optional[int]]]:
+        """경로 목록의 (sha256 목록, dhash 목록) - 바뀌지 않은 파일은 색인 값 사용"""
+        stats = {}
+        todo = []
+        for path in dict.fromkeys(paths):
+            st = os.stat(path)
+            stats[path] = (st.st_size, st.st_mtime_ns)
+            entry = self.entries.get(path)
+            if entry is None or (entry[0], entry[1]) != stats[path]:
+                todo.append(path)
+
+        if todo:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                results = zip(todo, pool.map(hash_file, todo))
+                for path, (digest, dh) in tqdm(results, total=len(todo), desc='해시 계산'):
+                    size, mtime = stats[path]
+                    self.entries[path] = [size, mtime, digest, None if dh is None else f"{dh:016x}"]
+            self.save()
+        print(f"이미지 해시: {len(stats)}개 (새로 계산 {len(todo)}개)")
+
+        sha = [self.entries[p][2] for p in paths]
+        dh = [None if self.entries[p][3] is None else int(self.entries[p][3], 16) for p in paths]
+        return sha, dh
+
+
+class UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, x: int) -> int:
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+    def union_keys(self, keys: Iterable):
+        """같은 키(None 제외)를 가진 항목끼리 묶음"""
+        first: Dict = {}
+        for i, key in enumerate(keys):
+            if key is None:
+                continue
+            if key in first:
+                self.union(first[key], i)
+            else:
+                first[key] = i
+
+    def labels(self) -> List[int]:
+        return [self.find(i) for i in range(len(self.parent))]
+
+
+def _band_masks(radius: int) -> List[int]:
+    """16비트 안에서 radius 비트 이하를 뒤집는 XOR 마스크 목록"""
+    masks = [0]
+    for r in range(1, radius + 1):
+        for bits in combinations(range(BAND_BITS), r):
+            masks.append(sum(1 << b for b in bits))
+    return masks
+
+
+class NearDuplicateIndex:
+    """
+    유사 사진 조회용 dHash 색인 (near_duplicate_pairs 와 같은 밴드 방식)
+    add() 로 넣은 항목 중 해밍 거리 ≤ threshold 인 가장 가까운 항목의 값을 find() 로 조회
+    """
+
+    def __init__(self, threshold: int = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self._masks = _band_masks(max(threshold, 0) // BANDS)
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in range(BANDS)]
+        self._hashes: List[int] = []
+        self._values: list = []
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def add(self, h: Optional[int], value):
+        if h is None or self.threshold < 0:
+            return
+        i = len(self._hashes)
+        self._hashes.append(h)
+        self._values.append(value)
+        for band in range(BANDS):
+            self._tables[band].setdefault((h >> (band * BAND_BITS)) & ((1 << BAND_BITS) - 1), []).append(i)
+
+    def find(self, h: Optional[int]):
+        if h is None or self.threshold < 0:
+            return None
+        best, best_distance = None, self.threshold + 1
+        for band in range(BANDS):
+            key = (h >> (band * BAND_BITS)) & ((1 << BAND_BITS) - 1)
+            for mask in self._masks:
+                for i in self._tables[band].get(key ^ mask, ()):
+                    distance = bin(self._hashes[i] ^ h).count('1')
+                    if distance < best_distance:
+                        best, best_distance = i, distance
+        return None if best is None else self._values[best]
+
+
+def near_duplicate_pairs(hashes: Sequence[Optional[int]], threshold: int = DEFAULT_THRESHOLD) -> List[Tuple[int, int]]:
+    """해밍 거리 ≤ threshold 인 (i, j) 쌍 (i < j)"""
+    masks = _band_masks(threshold // BANDS)
+    band_mask = (1 << BAND_BITS) - 1
+    tables: List[Dict[int, List[int]]] = [{} for _ in range(BANDS)]
+    pairs = set()
+
+    for i, h in enumerate(hashes):
+        if h is None:
+            continue
+        for band in range(BANDS):
+            key = (h >> (band * BAND_BITS)) & band_mask
+            table = tables[band]
+            for mask in masks:
+                for j in table.get(key ^ mask, ()):
+                    if (j, i) not in pairs and bin(hashes[j] ^ h).count('1') <= threshold:
+                        pairs.add((j, i))
+            table.setdefault(key, []).append(i)
+    return sorted(pairs)
+
+
+def cluster_images(
+    sha: Sequence[str],
+    dhashes: Sequence[Optional[int]],
+    threshold: int = DEFAULT_THRESHOLD,
+    groups: Optional[Sequence] = None
+) -> List[int]:
+    """
+    항목별 묶음 번호 (묶음에서 가장 앞 항목의 인덱스)
+    같은 파일, 유사 사진, 그리고 groups(예: 국소ID)가 같은 항목을 하나로 묶음
+    """
+    uf = UnionFind(len(sha))
+    uf.union_keys(sha)
+    if groups is not None:
+        uf.union_keys(groups)
+    if threshold >= 0:
+        for i, j in near_duplicate_pairs(dhashes, threshold):
+            uf.union(i, j)
+    return uf.labels()
+
+
+def cross_split_clusters(
+    paths: Sequence[str],
+    splits: Sequence[str],
+    clusters: Sequence[int]
+) -> List[List[str]]:
+    """train 과 val 양쪽에 걸친 묶음의 경로 목록 (기존 데이터셋 누수 점검용)"""
+    members: Dict[int, List[int]] = {}
+    for i, c in enumerate(clusters):
+        members.setdefault(c, []).append(i)
+    return [
+        [paths[i] for i in idx]
+        for idx in members.values()
+        if len({splits[i] for i in idx}) > 1
+    ]
@@ -0,0 +1,349 @@
+"""
+피드백 → 학습 데이터 증분 반영
+S3 feedback/{corrected_class}/ 이미지를 data/train|val/<클래스>/ 구조로 가져옴
+
+- 매니페스트(feedback_manifest.json)에 가져온 S3 키와 ETag를 기록해 새 객체만 내려받음
+- 내용 해시(SHA-256)로 중복 제거 (같은 사진이 여러 번 올라와도 한 장만 저장)
+  prepare_classification_dataset 으로 만든 이미지(split_manifest.csv)도 대상에 포함
+- 같은 사진이 다른 클래스로 다시 수정되면 최신 수정이 우선 (파일을 새 클래스 폴더로 이동)
+  메타데이터로 만든 이미지와 클래스가 다르면 추가하지 않고 feedback_conflicts.csv 에 기록
+- train/val 분할: 데이터셋의 같은 / 유사 사진(dHash)이 있으면 그 분할을 따름
+  (국소 / 유사 사진 묶음이 train/val 에 나뉘지 않음), 없으면 내용 해시로 고정
+- 이번 실행에 추가된 파일 목록(delta)을 남기고, 필요하면 delta만 담은 데이터셋을 하드링크로 구성
+"""
+
+import argparse
+import csv
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from tqdm import tqdm
+
+try:
+    from .data_prepare import CLASSES, HASH_INDEX_NAME
+    from .dedup import DEFAULT_THRESHOLD, HashIndex, NearDuplicateIndex, hash_bytes
+    from .splits import MANIFEST_NAME as SPLIT_MANIFEST_NAME, load_split_manifest
+except ImportError:  # python utils/feedback_ingest.py 로 직접 실행
+    from data_prepare import CLASSES, HASH_INDEX_NAME
+    from dedup import DEFAULT_THRESHOLD, HashIndex, NearDuplicateIndex, hash_bytes
+    from splits import MANIFEST_NAME as SPLIT_MANIFEST_NAME, load_split_manifest
+
+MANIFEST_NAME = 'feedback_manifest.json'
+CONFLICTS_NAME = 'feedback_conflicts.csv'
+MANIFEST_VERSION = 1
+DOWNLOAD_CHUNK = 64
+
+
+def stable_split(digest: str, train_ratio: float) -> str:
+    """내용 해시 → 'train' / 'val' (해시 앞 32비트를 [0, 1) 값으로 사용)"""
+    return 'train' if int(digest[:8], 16) / 2 ** 32 < train_ratio else 'val'
+
+
+def load_manifest(path: Path) -> Dict:
+    if not path.exists():
+        return {'version': MANIFEST_VERSION, 'objects': {}, 'hashes': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError(f"지원하지 않는 매니페스트 버전: {manifest.get('version')} ({path})")
+    return manifest
+
+
+def save_manifest(manifest: Dict, path: Path):
+    """임시 파일 + rename 으로 원자적으로 저장 (중간에 중단돼도 이전 매니페스트 유지)"""
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def list_feedback_objects(
+    s3_client,
+    bucket: str,
+    classes: Iterable[str],
+    prefix: str = 'feedback',
+    workers: int = 8
+) -> List[Tuple[str, str, str]]:
+    """클래스별 prefix를 병렬로 페이지네이션 조회 → [(클래스, 키, ETag)]"""
+    def _list(cls: str) -> List[Tuple[str, str, str]]:
+        paginator = s3_client.get_paginator('list_objects_v2')
+        objects = []
+        for page in paginator.paginate(Bucket=bucket, Prefix=f"{prefix}/{cls}/"):
+            for obj in page.get('Contents', []):
+                if not obj['Key'].endswith('/'):
+                    objects.append((cls, obj['Key'], obj['ETag'].strip('"')))
+        return objects
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [obj for listing in pool.map(_list, classes) for obj in listing]
+
+
+def _forget(manifest: Dict, output_path: Path, key: str):
+    """키 기록 삭제; 그 파일을 참조하는 다른 키가 없으면 파일도 삭제 (S3 객체가 덮어써진 경우)"""
+    record = manifest['objects'].pop(key)
+    digest = record['sha256']
+    if any(r['sha256'] == digest for r in manifest['objects'].values()):
+        return
+    rel_path = manifest['hashes'].pop(digest, None)
+    if rel_path:
+        (output_path / rel_path).unlink(missing_ok=True)
+
+
+class DatasetIndex:
+    """
+    데이터셋에 이미 있는 이미지
+
+    - prepared: prepare_classification_dataset 이미지 (split_manifest.csv) 내용 해시 → (분할, 클래스, 상대 경로)
+    - near: 데이터셋 이미지 + 가져온 피드백의 dHash → 분할 (유사 사진이 같은 분할로 가도록)
+    해시는 output_dir 의 이미지 해시 색인(image_hashes.json)을 재사용하므로 바뀐 파일만 다시 계산
+    """
+
+    def __init__(self, output_path: Path, feedback_paths: Iterable[str], threshold: int, workers: int):
+        self.prepared: Dict[str, Tuple[str, str, str]] = {}
+        self.near = NearDuplicateIndex(threshold)
+
+        split_manifest = load_split_manifest(output_path / SPLIT_MANIFEST_NAME)
+        rows = [
+            (sp, cls, f"{sp}/{cls}/{dest}")
+            for sp, cls, dest in zip(split_manifest['split'], split_manifest['class'], split_manifest['dest'])
+        ]
+        rows = [row for row in rows if (output_path / row[2]).is_file()]
+        feedback = [p for p in feedback_paths if (output_path / p).is_file()]
+        if not rows and not feedback:
+            return
+
+        paths = [str(output_path / rel) for _, _, rel in rows] + [str(output_path / rel) for rel in feedback]
+        sha, dhashes = HashIndex(str(output_path / HASH_INDEX_NAME)).compute(paths, workers)
+        for (sp, cls, rel), digest, dh in zip(rows, sha, dhashes):
+            self.prepared.setdefault(digest, (sp, cls, rel))
+            self.near.add(dh, sp)
+        for rel, dh in zip(feedback, dhashes[len(rows):]):
+            self.near.add(dh, rel.split('/', 1)[0])
+        print(f"데이터셋 이미지: {len(rows)}개, 가져온 피드백: {len(feedback)}개")
+
+
+def write_conflicts(manifest: Dict, path: Path) -> int:
+    """메타데이터 이미지와 클래스가 다른 피드백 목록 (없으면 파일 삭제)"""
+    conflicts = [(key, r) for key, r in manifest['objects'].items() if r.get('conflict')]
+    if not conflicts:
+        path.unlink(missing_ok=True)
+        return 0
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['key', 'sha256', 'feedback_class', 'dataset_class', 'dataset_path'])
+        for key, r in sorted(conflicts):
+            writer.writerow([key, r['sha256'], r['class'], r['conflict'], r['path']])
+    return len(conflicts)
+
+
+def build_delta_dataset(output_path: Path, added: List[str], delta_dir: Path):
+    """
+    delta만 담은 데이터셋 구성 (하드링크, 불가하면 복사)
+
+    train/ 에는 이번에 추가된 학습 이미지만, val/ 에는 전체 검증 이미지를 넣어
+    기존 모델을 delta로 이어서 학습하면서 전체 검증셋으로 평가할 수 있게 함
+    """
+    if delta_dir.exists():
+        shutil.rmtree(delta_dir)
+    val_files = [p.relative_to(output_path).as_posix() for p in (output_path / 'val').glob('*/*') if p.is_file()]
+    for rel_path in [p for p in added if p.startswith('train/')] + val_files:
+        dest = delta_dir / rel_path
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(output_path / rel_path, dest)
+        except OSError:
+            shutil.copy2(output_path / rel_path, dest)
+    for split in ['train', 'val']:
+        for cls in CLASSES:
+            (delta_dir / split / cls).mkdir(parents=True, exist_ok=True)
+
+
+def ingest_feedback(
+    bucket: str,
+    output_dir: str = 'data',
+    manifest_path: Optional[str] = None,
+    train_ratio: float = 0.8,
+    prefix: str = 'feedback',
+    workers: int = 8,
+    delta_dir: Optional[str] = None,
+    region: Optional[str] = None,
+    endpoint_url: Optional[str] = None,
+    near_dup_threshold: int = DEFAULT_THRESHOLD
+) -> Dict:
+    """
+    S3 피드백 이미지를 데이터셋에 증분 반영
+
+    Args:
+        bucket: 피드백 S3 버킷
+        output_dir: 데이터셋 루트 (train/<클래스>/, val/<클래스>/)
+        manifest_path: 매니페스트 경로 (기본: output_dir/feedback_manifest.json)
+        train_ratio: 학습 데이터 비율 (데이터셋에 같은 / 유사 사진이 없을 때 내용 해시 기준 고정 분할)
+        workers: 병렬 조회/다운로드 수
+        delta_dir: 지정하면 이번 delta로 구성한 데이터셋 생성
+        near_dup_threshold: 유사 사진 기준 dHash 해밍 거리 (음수면 유사 사진 분할 따르기 생략)
+
+    Returns:
+        실행 요약 (added, duplicates, relabeled, conflicts, skipped, delta 목록 경로 등)
+    """
+    import boto3
+
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    manifest_file = Path(manifest_path) if manifest_path else output_path / MANIFEST_NAME
+    manifest = load_manifest(manifest_file)
+    s3_client = boto3.client('s3', region_name=region, endpoint_url=endpoint_url or None)
+
+    objects = list_feedback_objects(s3_client, bucket, CLASSES, prefix, workers)
+    pending = [
+        (cls, key, etag) for cls, key, etag in objects
+        if manifest['objects'].get(key, {}).get('etag') != etag
+    ]
+    # 파일명이 제출 시각(YYYYmmdd_HHMMSS_)으로 시작하므로 오래된 순으로 처리해 최신 수정이 마지막에 반영
+    pending.sort(key=lambda obj: obj[1].rsplit('/', 1)[-1])
+    print(f"S3 피드백 객체: {len(objects)}개, 새로 가져올 객체: {len(pending)}개")
+    dataset = DatasetIndex(output_path, manifest['hashes'].values(), near_dup_threshold, workers)
+
+    def _download(obj: Tuple[str, str, str]) -> Tuple[str, str, str, bytes, str, Optional[int]]:
+        cls, key, etag = obj
+        data = s3_client.get_object(Bucket=bucket, Key=key)['Body'].read()
+        return (cls, key, etag, data, *hash_bytes(data))
+
+    added: List[str] = []
+    duplicates, relabeled, conflicts = 0, 0, 0
+    now = datetime.now().isoformat(timespec='seconds')
+
+    with ThreadPoolExecutor(max_workers=workers) as pool, tqdm(total=len(pending), desc='피드백 반영') as pbar:
+        # 메모리에 올라가는 이미지 수를 제한하기 위해 묶음 단위로 다운로드
+        for start in range(0, len(pending), DOWNLOAD_CHUNK):
+            for cls, key, etag, data, digest, dh in pool.map(_download, pending[start:start + DOWNLOAD_CHUNK]):
+                if key in manifest['objects']:
+                    _forget(manifest, output_path, key)
+                record = {'etag': etag, 'sha256': digest, 'class': cls}
+
+                prepared = dataset.prepared.get(digest)
+                rel_path = manifest['hashes'].get(digest)
+                if prepared is not None:
+                    # 메타데이터로 만든 이미지: 라벨은 메타데이터가 정하므로 다르면 기록만
+                    rel_path = prepared[2]
+                    if prepared[1] != cls:
+                        record['conflict'] = prepared[1]
+                        conflicts += 1
+                    else:
+                        duplicates += 1
+                elif rel_path is None:
+                    split = dataset.near.find(dh) or stable_split(digest, train_ratio)
+                    ext = Path(key).suffix.lower() or '.jpg'
+                    rel_path = f"{split}/{cls}/fb_{digest[:16]}{ext}"
+                    _write_atomic(output_path / rel_path, data)
+                    manifest['hashes'][digest] = rel_path
+                    dataset.near.add(dh, split)
+                    added.append(rel_path)
+                elif rel_path.split('/')[1] != cls:
+                    # 같은 피드백 사진을 다른 클래스로 다시 수정: 최신 수정이 우선 (분할은 유지)
+                    new_path = f"{rel_path.split('/')[0]}/{cls}/{Path(rel_path).name}"
+                    _write_atomic(output_path / new_path, data)
+                    (output_path / rel_path).unlink(missing_ok=True)
+                    for other in manifest['objects'].values():
+                        if other['sha256'] == digest:
+                            other['path'] = new_path
+                    if rel_path in added:
+                        added.remove(rel_path)
+                    manifest['hashes'][digest] = rel_path = new_path
+                    added.append(new_path)
+                    relabeled += 1
+                else:
+                    duplicates += 1
+
+                manifest['objects'][key] = {**record, 'path': rel_path, 'ingested_at': now}
+                pbar.update(1)
+            # 묶음마다 저장해 중단돼도 다음 실행이 이어서 진행
+            save_manifest(manifest, manifest_file)
+
+    save_manifest(manifest, manifest_file)
+    conflicts_file = output_path / CONFLICTS_NAME
+    total_conflicts = write_conflicts(manifest, conflicts_file)
+
+    delta_file = output_path / f"feedback_delta_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+    delta_file.write_text(''.join(f"{p}\n" for p in added), encoding='utf-8')
+    shutil.copyfile(delta_file, output_path / 'feedback_delta_latest.txt')
+
+    if delta_dir:
+        build_delta_dataset(output_path, added, Path(delta_dir))
+        print(f"delta 데이터셋: {delta_dir}")
+
+    summary = {
+        'listed': len(objects),
+        'added': len(added),
+        'added_train': sum(p.startswith('train/') for p in added),
+        'added_val': sum(p.startswith('val/') for p in added),
+        'duplicates': duplicates,
+        'relabeled': relabeled,
+        'conflicts': conflicts,
+        'skipped': len(objects) - len(pending),
+        'delta_file': str(delta_file),
+        'manifest': str(manifest_file),
+        'conflicts_file': str(conflicts_file) if total_conflicts else None,
+    }
+    print(f"\n추가: {summary['added']}개 (train={summary['added_train']}, val={summary['added_val']}), "
+          f"중복: {duplicates}개, 클래스 재수정: {relabeled}개, 이미 반영됨: {summary['skipped']}개")
+    if total_conflicts:
+        print(f"라벨 충돌 (메타데이터와 클래스가 다름, 추가 안 함): 이번 {conflicts}개, 전체 {total_conflicts}개 → {conflicts_file}")
+    print(f"delta 목록: {delta_file}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='S3 피드백 이미지를 학습 데이터셋에 증분 반영')
+    parser.add_argument('--bucket', type=str,
+                        default=os.getenv('FEEDBACK_S3_BUCKET', 'tower-classification-feedback'),
+                        help='피드백 S3 버킷 (기본: FEEDBACK_S3_BUCKET 또는 tower-classification-feedback)')
+    parser.add_argument('--output', type=str, default='data',
+                        help='데이터셋 루트 (기본: data)')
+    parser.add_argument('--manifest', type=str, default=None,
+                        help=f'매니페스트 경로 (기본: <output>/{MANIFEST_NAME})')
+    parser.add_argument('--train-ratio', type=float, default=0.8,
+                        help='학습 데이터 비율 (기본: 0.8)')
+    parser.add_argument('--prefix', type=str, default='feedback',
+                        help='S3 키 prefix (기본: feedback)')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='병렬 조회/다운로드 수 (기본: 8)')
+    parser.add_argument('--near-dup-threshold', type=int, default=DEFAULT_THRESHOLD,
+                        help=f'데이터셋의 유사 사진 분할을 따를 dHash 해밍 거리 (기본: {DEFAULT_THRESHOLD}, 음수면 사용 안 함)')
+    parser.add_argument('--delta-dir', type=str, default=None,
+                        help='이번에 추가된 이미지로 delta 데이터셋 구성 (train.py --data 로 이어서 학습)')
+    parser.add_argument('--region', type=str, default=os.getenv('AWS_REGION', 'ap-northeast-2'),
+                        help='AWS 리전 (기본: AWS_REGION 또는 ap-northeast-2)')
+    parser.add_argument('--endpoint-url', type=str, default=os.getenv('S3_ENDPOINT_URL', ''),
+                        help='S3 호환 엔드포인트 (MinIO / moto 등)')
+
+    args = parser.parse_args()
+    ingest_feedback(
+        bucket=args.bucket,
+        output_dir=args.output,
+        manifest_path=args.manifest,
+        train_ratio=args.train_ratio,
+        prefix=args.prefix,
+        workers=args.workers,
+        delta_dir=args.delta_dir,
+        region=args.region,
+        endpoint_url=args.endpoint_url,
+        near_dup_threshold=args.near_dup_threshold
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+학습 데이터 샤드 형식
+미리 리사이즈한 이미지를 메모리 매핑 가능한 샤드 파일로 묶어 에폭마다 JPEG/PNG 디코딩을 생략
+
+구조:
+shards/
+├── meta.json                 # 형식 버전, 클래스 이름, max_side, 분할별 이미지 수
+├── train/
+│   ├── <클래스>/             # 빈 폴더 (ultralytics 데이터셋 검사용: 클래스 수 / 이름)
+│   ├── shard_00000.bin       # BGR uint8 [H, W, 3] 이미지를 이어 붙인 원시 바이트
+│   ├── index.npy             # 이미지별 (shard, offset, height, width, label, hash)
+│   └── files.txt             # 이미지별 원본 상대 경로 (index 순서)
+└── val/
+    └── ...
+
+- label 은 정렬된 클래스 이름의 인덱스 (ultralytics ImageFolder 와 같은 순서)
+- hash 는 원본 파일 SHA-256 앞 16바이트
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+SHARD_FORMAT_VERSION = 1
+META_NAME = 'meta.json'
+INDEX_NAME = 'index.npy'
+FILES_NAME = 'files.txt'
+DEFAULT_SHARD_BYTES = 1 << 30
+
+INDEX_DTYPE = np.dtype([
+    ('shard', '<u4'),
+    ('offset', '<u8'),
+    ('height', '<u2'),
+    ('width', '<u2'),
+    ('label', '<u2'),
+    ('hash', 'S16'),
+])
+
+
+def is_shard_dataset(path: str) -> bool:
+    return (Path(path) / META_NAME).is_file()
+
+
+def load_shard_meta(root: str) -> Dict:
+    with open(Path(root) / META_NAME, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('version') != SHARD_FORMAT_VERSION:
+        raise ValueError(f"지원하지 않는 샤드 형식 버전: {meta.get('version')} ({root})")
+    return meta
+
+
+class ShardWriter:
+    """한 분할(train/val)의 샤드 파일과 인덱스 작성 (이미지는 호출 순서대로 기록)"""
+
+    def __init__(self, split_dir: Path, shard_bytes: int = DEFAULT_SHARD_BYTES):
+        self.split_dir = Path(split_dir)
+        self.split_dir.mkdir(parents=True, exist_ok=True)
+        for old in self.split_dir.glob('shard_*.bin'):
+            old.unlink()
+        self.shard_bytes = shard_bytes
+        self.records: List[tuple] = []
+        self.files: List[str] = []
+        self._shard = -1
+        self._file = None
+        self._offset = 0
+
+    def _next_shard(self):
+        if self._file is not None:
+            self._file.close()
+        self._shard += 1
+        self._file = open(self.split_dir / f"shard_{self._shard:05d}.bin", 'wb')
+        self._offset = 0
+
+    def add(self, image: np.ndarray, label: int, digest: bytes, rel_path: str):
+        data = np.ascontiguousarray(image, dtype=np.uint8)
+        if self._file is None or (self._offset and self._offset + data.nbytes > self.shard_bytes):
+            self._next_shard()
+        self._file.write(data.tobytes())
+        h, w = data.shape[:2]
+        self.records.append((self._shard, self._offset, h, w, label, digest[:16]))
+        self.files.append(rel_path)
+        self._offset += data.nbytes
+
+    def close(self) -> int:
+        if self._file is not None:
+            self._file.close()
+        np.save(self.split_dir / INDEX_NAME, np.array(self.records, dtype=INDEX_DTYPE))
+        (self.split_dir / FILES_NAME).write_text(''.join(f"{p}\n" for p in self.files), encoding='utf-8')
+        return len(self.records)
+
+
+class ShardReader:
+    """
+    샤드 분할 읽기 (랜덤 접근)
+
+    샤드 파일은 처음 접근할 때 np.memmap 으로 열므로, DataLoader 워커 프로세스에서도
+    페이지 캐시를 공유하며 디코딩 없이 이미지 배열을 바로 얻음
+    """
+
+    def __init__(self, split_dir: str):
+        self.split_dir = Path(split_dir)
+        self.meta = load_shard_meta(self.split_dir.parent)
+        self.names: List[str] = self.meta['names']
+        self.index = np.load(self.split_dir / INDEX_NAME)
+        self._files: Optional[List[str]] = None
+        self._shards: Dict[int, np.memmap] = {}
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def labels(self) -> np.ndarray:
+        return self.index['label'].astype(np.int64)
+
+    @property
+    def files(self) -> List[str]:
+        if self._files is None:
+            self._files = (self.split_dir / FILES_NAME).read_text(encoding='utf-8').splitlines()
+        return self._files
+
+    def _shard(self, shard: int) -> np.memmap:
+        mm = self._shards.get(shard)
+        if mm is None:
+            mm = self._shards[shard] = np.memmap(self.split_dir / f"shard_{shard:05d}.bin", dtype=np.uint8, mode='r')
+        return mm
+
+    def image(self, i: int) -> np.ndarray:
+        """i번째 이미지 (BGR uint8 [H, W, 3], 샤드 파일의 읽기 전용 뷰)"""
+        rec = self.index[i]
+        h, w = int(rec['height']), int(rec['width'])
+        start = int(rec['offset'])
+        return self._shard(int(rec['shard']))[start:start + h * w * 3].reshape(h, w, 3)
+
+    def __getstate__(self):
+        # DataLoader 워커로 전달될 때 memmap 은 각 프로세스에서 다시 열기
+        state = self.__dict__.copy()
+        state['_shards'] = {}
+        return state
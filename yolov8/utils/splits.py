@@ -0,0 +1,151 @@
+"""
+데이터 분할 엔진
+국소 / 유사 사진 묶음 단위, 클래스 층화, 결정적(해시 기반) train/val 분할과 k-fold 배정
+
+- 묶음 키(국소ID 등)의 안정 해시 순서로 배정하므로 행 순서나 실행 환경과 무관하게 같은 결과
+- 한 번 배정한 결과는 분할 매니페스트(split_manifest.csv)에 기록하고, 다시 만들 때는
+  매니페스트에 없는 새 행만 배정 (기존 파일은 옮기지 않음)
+- 새 묶음은 클래스별 목표 비율에 모자란 쪽(val / 가장 적은 fold)으로 배정해 층화 유지
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+MANIFEST_NAME = 'split_manifest.csv'
+MANIFEST_COLUMNS = ['item', 'station', 'group', 'class', 'split', 'fold', 'dest']
+
+
+def stable_hash(key: str, seed: int = 42) -> float:
+    """문자열 → [0, 1) (seed 가 같으면 항상 같은 값)"""
+    digest = hashlib.sha256(f"{seed}:{key}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+
+def group_keys(clusters: Sequence[int], stations: Optional[Sequence[str]], fallback: Sequence[str]) -> List[str]:
+    """
+    묶음 번호 → 안정적인 묶음 키
+    묶음 안의 가장 작은 국소ID (없으면 가장 작은 fallback 값, 예: 이미지 해시)
+    """
+    keys: Dict[int, str] = {}
+    for i, c in enumerate(clusters):
+        station = stations[i] if stations else ''
+        key = f"station:{station}" if station else f"item:{fallback[i]}"
+        if c not in keys or key < keys[c]:
+            keys[c] = key
+    return [keys[c] for c in clusters]
+
+
+def load_split_manifest(path: Path) -> pd.DataFrame:
+    if not path.exists():
+        return pd.DataFrame(columns=MANIFEST_COLUMNS)
+    df = pd.read_csv(path, encoding='utf-8-sig', dtype={'item': str, 'station': str, 'group': str, 'dest': str},
+                     keep_default_na=False)
+    df['fold'] = df['fold'].astype(int)
+    return df
+
+
+def save_split_manifest(df: pd.DataFrame, path: Path):
+    tmp = path.with_name(f".{path.name}.tmp")
+    df[MANIFEST_COLUMNS].to_csv(tmp, index=False, encoding='utf-8-sig')
+    tmp.replace(path)
+
+
+class SplitEngine:
+    """
+    분할 배정
+
+    Args:
+        train_ratio: 학습 비율 (folds 를 쓰면 무시)
+        folds: k-fold 수 (0 이면 사용 안 함)
+        val_fold: folds 사용 시 val 로 쓸 fold 번호
+        seed: 해시 seed (바꾸면 다른 분할)
+    """
+
+    def __init__(self, train_ratio: float = 0.8, folds: int = 0, val_fold: int = 0, seed: int = 42):
+        if folds and not 0 <= val_fold < folds:
+            raise ValueError(f"val_fold 는 0 ~ {folds - 1} 사이여야 합니다: {val_fold}")
+        self.train_ratio = train_ratio
+        self.folds = folds
+        self.val_fold = val_fold
+        self.seed = seed
+
+    def assign(self, items: pd.DataFrame, manifest: pd.DataFrame) -> pd.DataFrame:
+        """
+        items: item, station, group, class, dest 컬럼 (이번 빌드의 전체 행)
+        manifest: 이전 빌드의 배정 (load_split_manifest)
+
+        Returns:
+            items 에 split, fold 를 채운 DataFrame (기존 행은 매니페스트 값 유지)
+        """
+        items = items.copy()
+        previous = manifest.drop_duplicates('item').set_index('item')
+        known = items['item'].isin(previous.index)
+        items['split'] = items['item'].map(previous['split']).where(known, '')
+        items['fold'] = items['item'].map(previous['fold']).where(known, -1).astype(int)
+        items.loc[known, 'dest'] = items.loc[known, 'item'].map(previous['dest'])
+
+        if self.folds:
+            if items['fold'].max() >= self.folds:
+                raise ValueError(f"매니페스트의 fold 수({items['fold'].max() + 1})가 folds={self.folds} 보다 많습니다")
+            self._assign_folds(items)
+            items['split'] = (items['fold'] == self.val_fold).map({True: 'val', False: 'train'})
+        else:
+            self._assign_holdout(items)
+        return items
+
+    def _new_groups(self, items: pd.DataFrame, column: str, empty) -> List[str]:
+        """배정이 비어 있는 묶음 키 (해시 순서). 기존 행이 있는 묶음은 그 값을 따라감"""
+        unassigned = items[column] == empty
+        existing = items[~unassigned].groupby('group')[column].agg(lambda v: v.mode().iloc[0])
+        follow = unassigned & items['group'].isin(existing.index)
+        items.loc[follow, column] = items.loc[follow, 'group'].map(existing)
+        groups = items.loc[items[column] == empty, 'group'].unique()
+        return sorted(groups, key=lambda g: stable_hash(g, self.seed))
+
+    def _assign_holdout(self, items: pd.DataFrame):
+        new_groups = self._new_groups(items, 'split', '')
+        if not new_groups:
+            return
+        target_val = (items['class'].value_counts() * (1 - self.train_ratio)).round()
+        val_count = items.loc[items['split'] == 'val', 'class'].value_counts().reindex(target_val.index, fill_value=0)
+        members = items[items['group'].isin(new_groups)].groupby('group')['class']
+
+        assigned = {}
+        for group in new_groups:
+            classes = members.get_group(group)
+            main = classes.mode().iloc[0]
+            size = int((classes == main).sum())
+            if val_count[main] + size <= target_val[main]:
+                assigned[group] = 'val'
+                val_count = val_count.add(classes.value_counts(), fill_value=0)
+            else:
+                assigned[group] = 'train'
+        new_rows = items['split'] == ''
+        items.loc[new_rows, 'split'] = items.loc[new_rows, 'group'].map(assigned)
+
+    def _assign_folds(self, items: pd.DataFrame):
+        new_groups = self._new_groups(items, 'fold', -1)
+        if not new_groups:
+            return
+        counts: Dict[str, List[int]] = {}
+        for cls, fold in zip(items['class'], items['fold']):
+            counts.setdefault(cls, [0] * self.folds)
+            if fold >= 0:
+                counts[cls][fold] += 1
+        members = items[items['group'].isin(new_groups)].groupby('group')['class']
+
+        assigned = {}
+        for group in new_groups:
+            classes = members.get_group(group)
+            main = classes.mode().iloc[0]
+            offset = int(stable_hash(group, self.seed) * self.folds)
+            # 주 클래스가 가장 적은 fold, 같으면 묶음 해시로 정한 순서
+            fold = min(range(self.folds), key=lambda f: (counts[main][f], (f - offset) % self.folds))
+            assigned[group] = fold
+            for cls in classes:
+                counts[cls][fold] += 1
+        new_rows = items['fold'] == -1
+        items.loc[new_rows, 'fold'] = items.loc[new_rows, 'group'].map(assigned)